@@ -0,0 +1,16 @@
+import { revalidatePath, revalidateTag } from "next/cache";
+import { NextRequest, NextResponse } from "next/server";
+import { SNAPSHOT_TAG } from "@/lib/snapshot";
+
+// Called by the backend (snapshot.notify_frontend) whenever the dataset version changes.
+export async function POST(request: NextRequest) {
+  const secret = process.env.REVALIDATE_SECRET;
+  if (!secret || request.headers.get("x-revalidate-secret") !== secret) {
+    return NextResponse.json({ revalidated: false, message: "Invalid secret" }, { status: 401 });
+  }
+
+  const body = await request.json().catch(() => ({}));
+  revalidateTag(SNAPSHOT_TAG);
+  revalidatePath("/");
+  return NextResponse.json({ revalidated: true, dataset_version: body.dataset_version ?? null });
+}
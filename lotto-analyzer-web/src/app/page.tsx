@@ -1,6 +1,3 @@
-"use client";
-
-import { useState, useEffect } from "react";
 import { Tabs, TabsContent, TabsList, TabsTrigger } from "@/components/ui/tabs";
 import { FrequencyAnalysis } from "@/components/analysis/FrequencyAnalysis";
 import { PatternAnalysis } from "@/components/analysis/PatternAnalysis";
@@ -10,24 +7,12 @@ import { CoOccurrenceAnalysis } from "@/components/analysis/CoOccurrenceAnalysis
 import { IntegratedRecommendation } from "@/components/analysis/IntegratedRecommendation";
 import { SumBasedRecommendations } from "@/components/analysis/SumBasedRecommendations";
 import { SavedNumbers } from "@/components/analysis/SavedNumbers";
+import { getDashboardSnapshot } from "@/lib/snapshot";
 
-export default function Home() {
-  const [lastUpdate, setLastUpdate] = useState("");
-
-  useEffect(() => {
-        const fetchLastUpdate = async () => {
-      try {
-        const res = await fetch(`http://127.0.0.1:8000/api/last-update`);
-        if (!res.ok) throw new Error(`HTTP error! status: ${res.status}`);
-        const data = await res.json();
-        setLastUpdate(data.last_update);
-      } catch (e) {
-        console.error("Failed to fetch last update time:", e);
-      }
-    };
-
-    fetchLastUpdate();
-  }, []);
+// Prerendered from the backend's dashboard snapshot; see src/lib/snapshot.ts for revalidation.
+export default async function Home() {
+  const snapshot = await getDashboardSnapshot();
+  const lastUpdate = snapshot?.last_update ?? "";
 
   return (
     <main className="flex min-h-screen flex-col items-center p-4 md:p-8 lg:p-12">
@@ -52,25 +37,25 @@ export default function Home() {
             <TabsTrigger value="saved">저장된 번호</TabsTrigger>
           </TabsList>
           <TabsContent value="frequency">
-            <FrequencyAnalysis />
+            <FrequencyAnalysis initialFrequency={snapshot?.frequency} initialMlPrediction={snapshot?.ml} />
           </TabsContent>
           <TabsContent value="patterns">
-            <PatternAnalysis />
+            <PatternAnalysis initialPatterns={snapshot?.patterns} initialPhase1={snapshot?.phase1} />
           </TabsContent>
           <TabsContent value="timeseries">
-            <TimeSeriesAnalysis />
+            <TimeSeriesAnalysis initialData={snapshot?.timeseries} />
           </TabsContent>
           <TabsContent value="ml">
-            <MachineLearningPrediction />
+            <MachineLearningPrediction initialData={snapshot?.ml} />
           </TabsContent>
           <TabsContent value="co-occurrence">
-            <CoOccurrenceAnalysis />
+            <CoOccurrenceAnalysis initialCoOccurrence={snapshot?.cooccurrence} initialPhase1={snapshot?.phase1} />
           </TabsContent>
           <TabsContent value="integrated">
-            <IntegratedRecommendation />
+            <IntegratedRecommendation initialData={snapshot?.integrated} />
           </TabsContent>
           <TabsContent value="sum-based">
-            <SumBasedRecommendations />
+            <SumBasedRecommendations initialRanges={snapshot?.sum_based} />
           </TabsContent>
           <TabsContent value="saved">
             <SavedNumbers />
@@ -19,24 +19,31 @@ import {
 import { PredictionCard } from "./PredictionCard";
 
 // Define types for fetched data
-type CoOccurrenceDataPoint = {
+export type CoOccurrenceDataPoint = {
   pair: string;
   count: number;
 };
 
-type Phase1Recommendations = {
+export type Phase1Recommendations = {
   pattern: number[];
   co_occurrence: number[];
 };
 
-export function CoOccurrenceAnalysis() {
-  const [coOccurrenceData, setCoOccurrenceData] = useState<CoOccurrenceDataPoint[] | null>(null);
-  const [phase1RecData, setPhase1RecData] = useState<Phase1Recommendations | null>(null);
+type CoOccurrenceAnalysisProps = {
+  initialCoOccurrence?: CoOccurrenceDataPoint[];
+  initialPhase1?: Phase1Recommendations;
+};
+
+export function CoOccurrenceAnalysis({ initialCoOccurrence, initialPhase1 }: CoOccurrenceAnalysisProps = {}) {
+  const prerendered = Boolean(initialCoOccurrence && initialPhase1);
+  const [coOccurrenceData, setCoOccurrenceData] = useState<CoOccurrenceDataPoint[] | null>(initialCoOccurrence ?? null);
+  const [phase1RecData, setPhase1RecData] = useState<Phase1Recommendations | null>(initialPhase1 ?? null);
   const [hitRate, setHitRate] = useState<number>(0);
-  const [loading, setLoading] = useState(true);
+  const [loading, setLoading] = useState(!prerendered);
   const [error, setError] = useState<string | null>(null);
 
   useEffect(() => {
+    if (prerendered) return;
     const API_BASE_URL = process.env.NEXT_PUBLIC_API_BASE_URL || 'http://127.0.0.1:8000';
     const fetchData = async () => {
       try {
@@ -62,7 +69,7 @@ export function CoOccurrenceAnalysis() {
     };
 
     fetchData();
-  }, []);
+  }, [prerendered]);
 
   useEffect(() => {
     if (!phase1RecData) return;
@@ -53,14 +53,14 @@ type AnalysisResult = {
   count: number;
 };
 
-type FrequencyData = {
+export type FrequencyData = {
   hotNumbers: AnalysisResult[];
   coldNumbers: AnalysisResult[];
   hotBonusNumbers: AnalysisResult[];
   coldBonusNumbers: AnalysisResult[];
 };
 
-type MlPredictionData = {
+export type MlPredictionData = {
   hot_numbers_prediction: number[];
   overdue_numbers_prediction: number[];
 };
@@ -161,13 +161,21 @@ function FrequencyChart({ data }: FrequencyChartProps) {
 }
 
 // --- Main Component ---
-export function FrequencyAnalysis() {
-  const [frequencyData, setFrequencyData] = useState<FrequencyData | null>(null);
-  const [mlPredictionData, setMlPredictionData] = useState<MlPredictionData | null>(null);
-  const [loading, setLoading] = useState(true);
+type FrequencyAnalysisProps = {
+  initialFrequency?: FrequencyData;
+  initialMlPrediction?: MlPredictionData;
+};
+
+export function FrequencyAnalysis({ initialFrequency, initialMlPrediction }: FrequencyAnalysisProps = {}) {
+  const prerendered = Boolean(initialFrequency && initialMlPrediction);
+  const [frequencyData, setFrequencyData] = useState<FrequencyData | null>(initialFrequency ?? null);
+  const [mlPredictionData, setMlPredictionData] = useState<MlPredictionData | null>(initialMlPrediction ?? null);
+  const [loading, setLoading] = useState(!prerendered);
   const [error, setError] = useState<string | null>(null);
 
   useEffect(() => {
+    // Prerendered from the dashboard snapshot; only fetch when it was unavailable.
+    if (prerendered) return;
     const API_BASE_URL = process.env.NEXT_PUBLIC_API_BASE_URL || "http://127.0.0.1:8000";
     const fetchData = async () => {
       try {
@@ -193,7 +201,7 @@ export function FrequencyAnalysis() {
     };
 
     fetchData();
-  }, []);
+  }, [prerendered]);
 
 
 
@@ -4,17 +4,18 @@ import { useState, useEffect } from "react";
 import { PredictionCard } from "./PredictionCard";
 
 // Define types for fetched data
-type IntegratedRecommendationData = {
+export type IntegratedRecommendationData = {
   integrated_recommendation: number[];
 };
 
-export function IntegratedRecommendation() {
-  const [integratedRecData, setIntegratedRecData] = useState<IntegratedRecommendationData | null>(null);
+export function IntegratedRecommendation({ initialData }: { initialData?: IntegratedRecommendationData } = {}) {
+  const [integratedRecData, setIntegratedRecData] = useState<IntegratedRecommendationData | null>(initialData ?? null);
   const [hitRate, setHitRate] = useState<number>(0);
-  const [loading, setLoading] = useState(true);
+  const [loading, setLoading] = useState(!initialData);
   const [error, setError] = useState<string | null>(null);
 
   useEffect(() => {
+    if (initialData) return;
     const API_BASE_URL = process.env.NEXT_PUBLIC_API_BASE_URL || 'http://127.0.0.1:8000';
     const fetchData = async () => {
       try {
@@ -30,7 +31,7 @@ export function IntegratedRecommendation() {
     };
 
     fetchData();
-  }, []);
+  }, [initialData]);
 
   useEffect(() => {
     if (!integratedRecData) return;
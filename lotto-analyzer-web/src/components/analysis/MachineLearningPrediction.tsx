@@ -4,17 +4,18 @@ import { useState, useEffect } from "react";
 import { PredictionCard } from "./PredictionCard";
 
 // Define types for fetched data
-type MlPredictionData = {
+export type MlPredictionData = {
   hot_numbers_prediction: number[];
   overdue_numbers_prediction: number[];
 };
 
-export function MachineLearningPrediction() {
-  const [mlPredictionData, setMlPredictionData] = useState<MlPredictionData | null>(null);
-  const [loading, setLoading] = useState(true);
+export function MachineLearningPrediction({ initialData }: { initialData?: MlPredictionData } = {}) {
+  const [mlPredictionData, setMlPredictionData] = useState<MlPredictionData | null>(initialData ?? null);
+  const [loading, setLoading] = useState(!initialData);
   const [error, setError] = useState<string | null>(null);
 
   useEffect(() => {
+    if (initialData) return;
     const API_BASE_URL = process.env.NEXT_PUBLIC_API_BASE_URL || 'http://127.0.0.1:8000';
     const fetchData = async () => {
       try {
@@ -30,7 +31,7 @@ export function MachineLearningPrediction() {
     };
 
     fetchData();
-  }, []);
+  }, [initialData]);
 
   if (loading) return <div className="text-center py-8">데이터를 불러오는 중...</div>;
   if (error) return <div className="text-center py-8 text-red-500">오류 발생: {error}</div>;
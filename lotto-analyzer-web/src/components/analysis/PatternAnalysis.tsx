@@ -19,7 +19,7 @@ import {
 import { PredictionCard } from "./PredictionCard";
 
 // Define types for fetched data
-type PatternStats = {
+export type PatternStats = {
   total_draws: number;
   odd_even_ratios: Record<string, number>;
   high_low_ratios: Record<string, number>;
@@ -36,7 +36,7 @@ type PatternStats = {
   };
 };
 
-type Phase1Recommendations = {
+export type Phase1Recommendations = {
   pattern: number[];
   co_occurrence: number[];
 };
@@ -49,13 +49,20 @@ const objectToAnalysisArray = (obj: Record<string, number>) => {
   }));
 };
 
-export function PatternAnalysis() {
-  const [patternData, setPatternData] = useState<PatternStats | null>(null);
-  const [phase1RecData, setPhase1RecData] = useState<Phase1Recommendations | null>(null);
-  const [loading, setLoading] = useState(true);
+type PatternAnalysisProps = {
+  initialPatterns?: PatternStats;
+  initialPhase1?: Phase1Recommendations;
+};
+
+export function PatternAnalysis({ initialPatterns, initialPhase1 }: PatternAnalysisProps = {}) {
+  const prerendered = Boolean(initialPatterns && initialPhase1);
+  const [patternData, setPatternData] = useState<PatternStats | null>(initialPatterns ?? null);
+  const [phase1RecData, setPhase1RecData] = useState<Phase1Recommendations | null>(initialPhase1 ?? null);
+  const [loading, setLoading] = useState(!prerendered);
   const [error, setError] = useState<string | null>(null);
 
   useEffect(() => {
+    if (prerendered) return;
     const API_BASE_URL = process.env.NEXT_PUBLIC_API_BASE_URL || 'http://127.0.0.1:8000';
     const fetchData = async () => {
       try {
@@ -80,7 +87,7 @@ export function PatternAnalysis() {
     };
 
     fetchData();
-  }, []);
+  }, [prerendered]);
 
   if (loading) return <div className="text-center py-8">데이터를 불러오는 중...</div>;
   if (error) return <div className="text-center py-8 text-red-500">오류 발생: {error}</div>;
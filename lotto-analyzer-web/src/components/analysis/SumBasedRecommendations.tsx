@@ -31,7 +31,7 @@ type FixedSumRecommendation = {
   recommendation: number[];
 };
 
-type SumRecommendations = {
+export type SumRecommendations = {
   top_5_frequent_sums: SumRecommendationData[];
   fixed_sum_recommendations: {
     low_sum: FixedSumRecommendation;
@@ -40,10 +40,27 @@ type SumRecommendations = {
   };
 };
 
+// The snapshot part, shared by every visitor: sums and ranges only, since tickets are issued per client.
+export type SumRanges = {
+  top_5_frequent_sums: { sum: number; count: number }[];
+  fixed_sum_ranges: Record<keyof SumRecommendations["fixed_sum_recommendations"], { range: string }>;
+};
+
+function pendingRecommendations(ranges: SumRanges): SumRecommendations {
+  return {
+    top_5_frequent_sums: ranges.top_5_frequent_sums.map((item) => ({ ...item, recommendation: "불러오는 중..." })),
+    fixed_sum_recommendations: Object.fromEntries(
+      Object.entries(ranges.fixed_sum_ranges).map(([key, { range }]) => [key, { range, recommendation: [] }])
+    ) as SumRecommendations["fixed_sum_recommendations"],
+  };
+}
+
 // --- Main Component ---
-export function SumBasedRecommendations() {
+export function SumBasedRecommendations({ initialRanges }: { initialRanges?: SumRanges } = {}) {
   // --- States ---
-  const [sumRecData, setSumRecData] = useState<SumRecommendations | null>(null);
+  const [sumRecData, setSumRecData] = useState<SumRecommendations | null>(
+    initialRanges ? pendingRecommendations(initialRanges) : null
+  );
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState<string | null>(null);
 
@@ -86,6 +103,7 @@ export function SumBasedRecommendations() {
     }
   }, []);
 
+  // The prerendered snapshot only lays out the sums and ranges; the tickets are always fetched for this visitor.
   useEffect(() => {
     fetchInitialData();
   }, [fetchInitialData]);
@@ -160,7 +178,7 @@ export function SumBasedRecommendations() {
 
   // --- Render Logic ---
 
-  if (loading) return <div className="text-center py-8">데이터를 불러오는 중...</div>;
+  if (loading && !sumRecData) return <div className="text-center py-8">데이터를 불러오는 중...</div>;
   if (error) return <div className="text-center py-8 text-red-500">오류 발생: {error}</div>;
   if (!sumRecData) return null;
 
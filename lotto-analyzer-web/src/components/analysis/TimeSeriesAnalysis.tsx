@@ -20,18 +20,19 @@ import {
 } from "recharts";
 
 // Define types for fetched data
-type TimeSeriesDataPoint = {
+export type TimeSeriesDataPoint = {
   name: string;
   sum: number;
   moving_average: number | null;
 };
 
-export function TimeSeriesAnalysis() {
-  const [timeSeriesData, setTimeSeriesData] = useState<TimeSeriesDataPoint[] | null>(null);
-  const [loading, setLoading] = useState(true);
+export function TimeSeriesAnalysis({ initialData }: { initialData?: TimeSeriesDataPoint[] } = {}) {
+  const [timeSeriesData, setTimeSeriesData] = useState<TimeSeriesDataPoint[] | null>(initialData ?? null);
+  const [loading, setLoading] = useState(!initialData);
   const [error, setError] = useState<string | null>(null);
 
   useEffect(() => {
+    if (initialData) return;
     const API_BASE_URL = process.env.NEXT_PUBLIC_API_BASE_URL || 'http://127.0.0.1:8000';
     const fetchData = async () => {
       try {
@@ -47,7 +48,7 @@ export function TimeSeriesAnalysis() {
     };
 
     fetchData();
-  }, []);
+  }, [initialData]);
 
   if (loading) return <div className="text-center py-8">데이터를 불러오는 중...</div>;
   if (error) return <div className="text-center py-8 text-red-500">오류 발생: {error}</div>;
@@ -0,0 +1,52 @@
+import { readFile } from "fs/promises";
+import path from "path";
+import type { FrequencyData, MlPredictionData } from "@/components/analysis/FrequencyAnalysis";
+import type { PatternStats, Phase1Recommendations } from "@/components/analysis/PatternAnalysis";
+import type { TimeSeriesDataPoint } from "@/components/analysis/TimeSeriesAnalysis";
+import type { CoOccurrenceDataPoint } from "@/components/analysis/CoOccurrenceAnalysis";
+import type { IntegratedRecommendationData } from "@/components/analysis/IntegratedRecommendation";
+import type { SumRanges } from "@/components/analysis/SumBasedRecommendations";
+
+// Mirrors lotto-backend-api/snapshot.py
+export type DashboardSnapshot = {
+  schema_version: number;
+  dataset_version: string;
+  generated_at: string;
+  last_update: string;
+  frequency: FrequencyData;
+  ml: MlPredictionData;
+  patterns: PatternStats;
+  timeseries: TimeSeriesDataPoint[];
+  cooccurrence: CoOccurrenceDataPoint[];
+  phase1: Phase1Recommendations;
+  integrated: IntegratedRecommendationData;
+  sum_based: SumRanges;
+};
+
+export const SNAPSHOT_TAG = "dashboard-snapshot";
+
+// Written at build time by `python lotto-backend-api/snapshot.py --out lotto-analyzer-web/data/dashboard-snapshot.json`
+const SNAPSHOT_FILE = path.join(process.cwd(), "data", "dashboard-snapshot.json");
+
+// Cached by Next.js until the backend triggers /api/revalidate for a new dataset version.
+const SNAPSHOT_REVALIDATE_SECONDS = 60 * 60 * 24;
+
+export async function getDashboardSnapshot(): Promise<DashboardSnapshot | null> {
+  const API_BASE_URL = process.env.NEXT_PUBLIC_API_BASE_URL || "http://127.0.0.1:8000";
+  try {
+    const res = await fetch(`${API_BASE_URL}/api/snapshot`, {
+      next: { tags: [SNAPSHOT_TAG], revalidate: SNAPSHOT_REVALIDATE_SECONDS },
+    });
+    if (!res.ok) throw new Error(`HTTP error! status: ${res.status}`);
+    return (await res.json()) as DashboardSnapshot;
+  } catch (e) {
+    console.error("Failed to fetch dashboard snapshot, falling back to the build-time file:", e);
+  }
+
+  try {
+    return JSON.parse(await readFile(SNAPSHOT_FILE, "utf-8")) as DashboardSnapshot;
+  } catch {
+    // No snapshot at all: the analysis components fetch their own data client-side.
+    return null;
+  }
+}
@@ -0,0 +1,118 @@
+"""
+Inverted number -> draws index.
+
+Every number 1..45 owns one bitmap per role (main / bonus) in which bit i is set
+when the draw at position i contained that number. Bitmaps are plain Python
+ints, so an intersection is a single `&` over len(draws)/64 machine words and a
+k-number containment query costs k-1 ANDs plus one popcount.
+"""
+
+NUMBER_RANGE = range(1, 46)
+
+
+def _popcount(bitmap):
+    # int.bit_count() is 3.10+, the container runs 3.9.
+    return bin(bitmap).count("1")
+
+
+def _iter_positions(bitmap, newest_first=True):
+    if newest_first:
+        while bitmap:
+            pos = bitmap.bit_length() - 1
+            yield pos
+            bitmap ^= 1 << pos
+    else:
+        while bitmap:
+            low = bitmap & -bitmap
+            yield low.bit_length() - 1
+            bitmap ^= low
+
+
+class DrawBitmapIndex:
+    def __init__(self, draw_numbers, main_numbers, bonus_numbers):
+        """
+        draw_numbers[i] is the draw number at position i, main_numbers[i] its six
+        numbers and bonus_numbers[i] its bonus number (or None).
+        """
+        self.draw_numbers = list(draw_numbers)
+        self.size = len(self.draw_numbers)
+        self.all_draws = (1 << self.size) - 1
+
+        main = [0] * 46
+        bonus = [0] * 46
+        for pos, (nums, bonus_num) in enumerate(zip(main_numbers, bonus_numbers)):
+            bit = 1 << pos
+            for num in nums:
+                main[num] |= bit
+            if bonus_num:
+                bonus[bonus_num] |= bit
+        self.main = main
+        self.bonus = bonus
+
+    @classmethod
+    def from_table(cls, table):
+        return cls(table.draw_numbers.tolist(), table.numbers.tolist(), table.bonus.tolist())
+
+    def match(self, numbers, bonus=None, include_bonus=False):
+        """
+        Bitmap of draws containing every number in `numbers` among the main
+        numbers (or main + bonus when include_bonus). `bonus` additionally pins
+        the bonus number. Out-of-range numbers match nothing.
+        """
+        bitmap = self.all_draws
+        for num in set(numbers):
+            if num not in NUMBER_RANGE:
+                return 0
+            bitmap &= (self.main[num] | self.bonus[num]) if include_bonus else self.main[num]
+            if not bitmap:
+                return 0
+        if bonus is not None:
+            if bonus not in NUMBER_RANGE:
+                return 0
+            bitmap &= self.bonus[bonus]
+        return bitmap
+
+    def count(self, numbers, **kwargs):
+        return _popcount(self.match(numbers, **kwargs))
+
+    def query(self, numbers, bonus=None, include_bonus=False, limit=None):
+        bitmap = self.match(numbers, bonus=bonus, include_bonus=include_bonus)
+        count = _popcount(bitmap)
+        draws = []
+        for pos in _iter_positions(bitmap):
+            if limit is not None and len(draws) >= limit:
+                break
+            draws.append(self.draw_numbers[pos])
+        last_draw = self.draw_numbers[bitmap.bit_length() - 1] if bitmap else None
+        return {
+            "count": count,
+            "percentage": round(count / self.size * 100, 2) if self.size else 0,
+            "last_draw": last_draw,
+            "draws": draws,
+        }
+
+    def pair_counts(self):
+        """
+        Counter-compatible {(a, b): count} for every pair that appeared together,
+        in first-seen order (oldest draw first, then lexicographic within a draw)
+        so most_common() breaks ties the same way as counting draw by draw.
+        """
+        seen = []
+        for a in NUMBER_RANGE:
+            bitmap_a = self.main[a]
+            if not bitmap_a:
+                continue
+            for b in range(a + 1, 46):
+                both = bitmap_a & self.main[b]
+                if both:
+                    first = (both & -both).bit_length() - 1
+                    seen.append((first, a, b, _popcount(both)))
+        seen.sort()
+        return {(a, b): count for _, a, b, count in seen}
+
+    def partner_counts(self, number):
+        """How often each other number appeared in the same draw as `number`."""
+        if number not in NUMBER_RANGE:
+            return {}
+        bitmap = self.main[number]
+        return {other: _popcount(bitmap & self.main[other]) for other in NUMBER_RANGE if other != number}
@@ -0,0 +1,205 @@
+"""
+Shared exclusion layer for every ticket generator.
+
+Tickets are packed into 64-bit integers with bit n set for number n (46 bits
+used), so a ticket, a draw or any subset of one is a single int and set
+lookups are O(1).
+
+- HistoryFilter keeps the exact set of packed historical winning combinations
+  and, with `near_matches=k`, the packed k-subsets of every draw: a ticket
+  sharing k or more numbers with some past draw contains one of them, so the
+  check is C(6, k) lookups instead of a scan over the history. k is limited to
+  MIN_NEAR_MATCHES..5: below that nearly every ticket shares k numbers with
+  some past draw.
+- IssuedTickets remembers handed-out tickets in Bloom filters of fixed size,
+  globally or per client (LRU of clients). A Bloom filter has no false
+  negatives, so a ticket is never issued twice while it is remembered; a false
+  positive (rate `error_rate`) only makes the generator draw another ticket.
+  Two generations of `capacity` tickets are kept and the older one is dropped
+  when the current one fills up, so memory stays constant and the guarantee
+  covers at least the last `capacity` issued tickets.
+"""
+import os
+import math
+import threading
+import itertools
+from collections import OrderedDict
+
+import numpy as np
+
+MIN_NEAR_MATCHES = 4
+NEAR_MATCHES = int(os.environ.get("LOTTO_EXCLUDE_NEAR_MATCHES", 0)) or None
+if NEAR_MATCHES is not None and not MIN_NEAR_MATCHES <= NEAR_MATCHES <= 5:
+    print(f"CRITICAL: LOTTO_EXCLUDE_NEAR_MATCHES={NEAR_MATCHES} is outside {MIN_NEAR_MATCHES}..5; near-match exclusion is off.")
+    NEAR_MATCHES = None
+# first_allowed() checks at most this many combinations before falling back.
+MAX_CANDIDATES = 10_000
+ISSUED_SCOPE = os.environ.get("LOTTO_ISSUED_SCOPE", "global")  # "global" or "client"
+ISSUED_CAPACITY = int(os.environ.get("LOTTO_ISSUED_CAPACITY", 2_000_000))
+CLIENT_CAPACITY = int(os.environ.get("LOTTO_ISSUED_CLIENT_CAPACITY", 1000))
+MAX_CLIENTS = int(os.environ.get("LOTTO_ISSUED_MAX_CLIENTS", 5000))
+ERROR_RATE = 0.001
+
+_MASK64 = (1 << 64) - 1
+
+
+def pack(numbers):
+    key = 0
+    for num in numbers:
+        key |= 1 << int(num)
+    return key
+
+
+def pack_rows(matrix):
+    """Packed keys (uint64) of every row of an (N, k) number matrix."""
+    matrix = np.asarray(matrix, dtype=np.uint64)
+    return np.bitwise_or.reduce(np.left_shift(np.uint64(1), matrix), axis=1)
+
+
+def unpack(key):
+    return [num for num in range(1, 46) if key >> num & 1]
+
+
+def _mix(value):
+    """splitmix64 finalizer."""
+    value = (value + 0x9E3779B97F4A7C15) & _MASK64
+    value = ((value ^ (value >> 30)) * 0xBF58476D1CE4E5B9) & _MASK64
+    value = ((value ^ (value >> 27)) * 0x94D049BB133111EB) & _MASK64
+    return value ^ (value >> 31)
+
+
+class HistoryFilter:
+    def __init__(self, table, near_matches=NEAR_MATCHES, max_candidates=MAX_CANDIDATES):
+        if near_matches is not None and not MIN_NEAR_MATCHES <= near_matches <= 5:
+            raise ValueError(f"near_matches must be None or {MIN_NEAR_MATCHES}..5, got {near_matches}")
+        self.near_matches = near_matches
+        self.max_candidates = max_candidates
+        self.fallbacks = 0
+        self.winners = set(pack_rows(table.numbers).tolist()) if len(table) else set()
+        self.near = set()
+        if near_matches:
+            for row in table.numbers.tolist():
+                self.near.update(pack(subset) for subset in itertools.combinations(row, near_matches))
+
+    def allows(self, ticket):
+        if pack(ticket) in self.winners:
+            return False
+        if self.near_matches:
+            return not any(pack(subset) in self.near for subset in itertools.combinations(ticket, self.near_matches))
+        return True
+
+    def first_allowed(self, ranked, size=6):
+        """
+        Best allowed ticket from numbers ordered best first: the top `size` unless
+        excluded, otherwise the next combination replacing the lowest-ranked picks first.
+        If none of the first `max_candidates` combinations is allowed, the top
+        `size` is returned anyway and counted in `fallbacks`.
+        """
+        ranked = [int(num) for num in ranked]
+        for ticket in itertools.islice(itertools.combinations(ranked, size), self.max_candidates):
+            if self.allows(ticket):
+                return sorted(ticket)
+        self.fallbacks += 1
+        return sorted(ranked[:size])
+
+    def stats(self):
+        return {
+            "winning_combinations": len(self.winners),
+            "near_matches": self.near_matches,
+            "near_subsets": len(self.near),
+            "fallbacks": self.fallbacks,
+        }
+
+
+class BloomFilter:
+    def __init__(self, capacity, error_rate=ERROR_RATE):
+        self.capacity = capacity
+        self.size = max(64, int(math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key):
+        first = _mix(key)
+        second = _mix(first) | 1
+        return [(first + i * second) % self.size for i in range(self.hashes)]
+
+    def __contains__(self, key):
+        return all(self.bits[position >> 3] >> (position & 7) & 1 for position in self._positions(key))
+
+    def add(self, key):
+        for position in self._positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+
+class _Generations:
+    """Current and previous Bloom filter; the previous one is dropped when the current fills up."""
+
+    def __init__(self, capacity, error_rate):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.current = BloomFilter(capacity, error_rate)
+        self.previous = None
+
+    def __contains__(self, key):
+        return key in self.current or (self.previous is not None and key in self.previous)
+
+    def add(self, key):
+        if self.current.count >= self.capacity:
+            self.previous, self.current = self.current, BloomFilter(self.capacity, self.error_rate)
+        self.current.add(key)
+
+    @property
+    def bytes(self):
+        return len(self.current.bits) + (len(self.previous.bits) if self.previous is not None else 0)
+
+
+class IssuedTickets:
+    def __init__(self, scope=ISSUED_SCOPE, capacity=ISSUED_CAPACITY, client_capacity=CLIENT_CAPACITY,
+                 max_clients=MAX_CLIENTS, error_rate=ERROR_RATE):
+        self.scope = scope
+        self.client_capacity = client_capacity
+        self.max_clients = max_clients
+        self.error_rate = error_rate
+        self._global = _Generations(capacity, error_rate) if scope == "global" else None
+        self._clients = OrderedDict()
+        self._lock = threading.Lock()
+        self.issued = 0
+        self.rejected = 0
+
+    def _filter(self, client):
+        if self._global is not None:
+            return self._global
+        client = client or "anonymous"
+        generations = self._clients.get(client)
+        if generations is None:
+            generations = self._clients[client] = _Generations(self.client_capacity, self.error_rate)
+            if len(self._clients) > self.max_clients:
+                self._clients.popitem(last=False)
+        else:
+            self._clients.move_to_end(client)
+        return generations
+
+    def claim(self, ticket, client=None):
+        """Records the ticket as issued; False if it (probably) was already."""
+        key = pack(ticket)
+        with self._lock:
+            generations = self._filter(client)
+            if key in generations:
+                self.rejected += 1
+                return False
+            generations.add(key)
+            self.issued += 1
+            return True
+
+    def stats(self):
+        with self._lock:
+            filters = [self._global] if self._global is not None else list(self._clients.values())
+            return {
+                "scope": self.scope,
+                "issued": self.issued,
+                "rejected": self.rejected,
+                "clients": len(self._clients),
+                "bytes": sum(generations.bytes for generations in filters),
+            }
@@ -0,0 +1,435 @@
+"""
+Single-pass validating ingest of lotto_history.csv.
+
+The file is streamed line by line into the C csv reader. On the way in, a
+physical line that holds more than one draw (a lost newline, as with draws
+1192/1193) is split at the start of the second record, and a record that the
+reader returns short is joined with the following line. Every record is then
+validated (six distinct numbers in 1..45, a bonus in 1..45 that is not one of
+them, a real calendar date, a positive draw number) and its dates and money
+columns are normalized.
+
+Accepted draws go straight into flat column buffers that become a `DrawTable`,
+the column arrays every analysis reads, so no per-row dicts are built. Anything
+that was repaired, rejected or is missing from the draw sequence is collected
+in an `IngestReport`.
+"""
+import re
+import csv
+import time
+import hashlib
+from collections import deque
+from operator import itemgetter
+from datetime import date
+
+import numpy as np
+
+# Report lists keep the first REPORT_LIMIT entries; the counts are always exact.
+REPORT_LIMIT = 200
+
+DATE_COLUMN = "추첨일"
+DRAW_COLUMN = "회차"
+NUMBERS_COLUMN = "당첨번호"
+BONUS_COLUMN = "보너스번호"
+
+# (table column, CSV column) for every money/count column, in export order.
+MONEY_COLUMNS = [
+    column
+    for tier in range(1, 6)
+    for column in (
+        (f"prize{tier}_total", f"{tier}등_총당첨금액"),
+        (f"prize{tier}_winners", f"{tier}등_당첨게임수"),
+        (f"prize{tier}_each", f"{tier}등_1게임당당첨금액"),
+    )
+] + [("total_sales", "총판매금액")]
+MONEY_COLUMN_NAMES = [name for name, _ in MONEY_COLUMNS]
+
+_DATE = re.compile(r"\(?\s*(\d{4})\s*-\s*(\d{1,2})\s*-\s*(\d{1,2})\s*\)?")
+# A record starts with its "(YYYY-" date field; one that doesn't follow a comma
+# mid-line is a second record fused onto the line.
+_FUSED_RECORD = re.compile(r"(?<=[^,])(?=\(\s*\d{4}\s*-)")
+_LEADING_MONEY = re.compile(r"\s*([\d,]+)")
+
+
+def parse_draw_date(value):
+    """'(2002- 12- 07)' or '(2025-10-11)' -> '2002-12-07'. Returns None if unparseable."""
+    match = _DATE.fullmatch((value or "").strip())
+    if not match:
+        return None
+    try:
+        return date(*(int(part) for part in match.groups())).isoformat()
+    except ValueError:
+        return None
+
+
+def parse_money(value):
+    """'143,934,100원' -> 143934100, '2,537' -> 2537. Empty values become None."""
+    if not value:
+        return None
+    try:
+        return int(value[:-1].replace(",", "") if value[-1] == "원" else value.replace(",", ""))
+    except ValueError:
+        match = _LEADING_MONEY.match(value)
+        digits = match.group(1).replace(",", "") if match else ""
+        return int(digits) if digits else None
+
+
+def parse_money_column(values):
+    """
+    parse_money over a whole column. The common shapes ('1,234원', '2,537', '')
+    are cleaned with a few whole-column string operations and converted by
+    int() in one map; a column holding anything else falls back to parse_money
+    per value.
+    """
+    if not values:
+        return []
+    # Each value gets a leading "0" so empty strings still convert.
+    cleaned = "0" + "\x000".join(values).replace(",", "").replace("원", "").replace(" ", "")
+    try:
+        parsed = list(map(int, cleaned.split("\x00")))
+    except ValueError:
+        return [parse_money(value.strip()) for value in values]
+    if "" in values:
+        for i, value in enumerate(values):
+            if not value:
+                parsed[i] = None
+    return parsed
+
+
+def _count_rows_with_empty(columns, size):
+    empty = np.zeros(size, dtype=bool)
+    for values in columns:
+        if "" in values:
+            empty[[i for i, value in enumerate(values) if not value]] = True
+    return int(empty.sum())
+
+
+class DrawTable:
+    """
+    Validated draws as draw-ordered column arrays (one entry per draw).
+
+    Money columns are kept as the raw CSV strings and normalized on first use
+    of `money`: none of the analyses read them, so the parse is only paid for
+    by the storage export.
+    """
+
+    def __init__(self, draw_numbers, draw_dates, numbers, bonus, raw_money):
+        draw_numbers = np.asarray(draw_numbers, dtype=np.int64)
+        numbers = np.asarray(numbers, dtype=np.int64).reshape(-1, 6)
+        bonus = np.asarray(bonus, dtype=np.int64)
+        draw_dates = list(draw_dates)
+        if len(draw_numbers) > 1 and (np.diff(draw_numbers) < 0).any():
+            order = np.argsort(draw_numbers, kind="stable")
+            draw_numbers, numbers, bonus = draw_numbers[order], numbers[order], bonus[order]
+            order = order.tolist()
+            draw_dates = [draw_dates[i] for i in order]
+            raw_money = {name: [values[i] for i in order] for name, values in raw_money.items()}
+        self.draw_numbers = draw_numbers
+        self.draw_dates = draw_dates
+        self.numbers = np.sort(numbers, axis=1)
+        self.bonus = bonus
+        self.raw_money = raw_money
+        self._money = None
+
+        self.sums = self.numbers.sum(axis=1)
+        self.odd_counts = (self.numbers % 2 == 1).sum(axis=1)
+        self.low_counts = (self.numbers <= 22).sum(axis=1)
+
+    @classmethod
+    def empty(cls):
+        return cls([], [], [], [], {name: [] for name in MONEY_COLUMN_NAMES})
+
+    @property
+    def money(self):
+        """Money columns as lists of ints (None where the CSV cell is empty)."""
+        if self._money is None:
+            self._money = {name: parse_money_column(values) for name, values in self.raw_money.items()}
+        return self._money
+
+    def __len__(self):
+        return len(self.draw_numbers)
+
+    @property
+    def last_draw(self):
+        return int(self.draw_numbers[-1])
+
+    def onehot(self, dtype=np.int32):
+        """(N, 46) indicator matrix of main numbers; column 0 is always 0."""
+        n = len(self)
+        onehot = np.zeros((n, 46), dtype=dtype)
+        onehot[np.arange(n)[:, None], self.numbers] = 1
+        return onehot
+
+    def column(self, name):
+        """Plain Python list for one exported column (see storage.DRAW_COLUMNS)."""
+        if name in self.raw_money:
+            return self.money[name]
+        if name == "draw_date":
+            return self.draw_dates
+        if name[0] == "n" and name[1:].isdigit():
+            return self.numbers[:, int(name[1:]) - 1].tolist()
+        return {
+            "draw_no": self.draw_numbers,
+            "bonus": self.bonus,
+            "sum": self.sums,
+            "odd_count": self.odd_counts,
+            "low_count": self.low_counts,
+        }[name].tolist()
+
+    def content_hash(self):
+        digest = hashlib.sha1()
+        for array in (self.draw_numbers, self.numbers, self.bonus):
+            digest.update(array.tobytes())
+        digest.update("\n".join(self.draw_dates).encode())
+        for name in MONEY_COLUMN_NAMES:
+            digest.update("\x00".join(self.raw_money[name]).encode())
+        return digest.hexdigest()
+
+
+class IngestReport:
+    def __init__(self, source):
+        self.source = source
+        self.lines = 0
+        self.records = 0
+        self.accepted = 0
+        self.normalized_dates = 0
+        self.empty_money_rows = 0
+        self.fixed_count = 0
+        self.rejected_count = 0
+        self.fixed = []
+        self.rejected = []
+        self.missing = []
+        self.elapsed_ms = None
+
+    def fix(self, line, draw_no, fixes):
+        self.fixed_count += 1
+        if len(self.fixed) < REPORT_LIMIT:
+            self.fixed.append({"line": line, "draw_no": draw_no, "fixes": fixes})
+
+    def reject(self, line, draw_no, reason, row):
+        self.rejected_count += 1
+        if len(self.rejected) < REPORT_LIMIT:
+            self.rejected.append({"line": line, "draw_no": draw_no, "reason": reason, "raw": ",".join(row)[:200]})
+
+    def to_dict(self):
+        return {
+            "source": self.source,
+            "lines": self.lines,
+            "records": self.records,
+            "accepted": self.accepted,
+            "fixed_count": self.fixed_count,
+            "rejected_count": self.rejected_count,
+            "missing_count": sum(end - start + 1 for start, end in self.missing),
+            "normalized_dates": self.normalized_dates,
+            "rows_with_empty_money_columns": self.empty_money_rows,
+            "fixed": self.fixed,
+            "rejected": self.rejected,
+            "missing_draws": [list(span) for span in self.missing],
+            "elapsed_ms": self.elapsed_ms,
+        }
+
+
+class _LineSource:
+    """Feeds csv.reader, splitting fused records and tracking physical line numbers."""
+
+    def __init__(self, f):
+        self._lines = iter(f)
+        self._queue = deque()   # (physical line, text) pieces not handed out yet
+        self.lines_read = 0
+        self.line = 0           # physical line of the last piece handed out
+        self.fused_lines = set()
+
+    def __iter__(self):
+        return self
+
+    def _fill(self):
+        text = next(self._lines)
+        self.lines_read += 1
+        if text.find("(", 1) != -1:
+            pieces = _FUSED_RECORD.split(text)
+            if len(pieces) > 1:
+                self.fused_lines.add(self.lines_read)
+                self._queue.extend((self.lines_read, piece if piece.endswith("\n") else piece + "\n") for piece in pieces)
+                return
+        self._queue.append((self.lines_read, text))
+
+    def __next__(self):
+        if not self._queue:
+            self._fill()
+        self.line, text = self._queue.popleft()
+        return text
+
+    def peek(self):
+        """The next piece without consuming it, or None at the end of the file."""
+        if not self._queue:
+            try:
+                self._fill()
+            except StopIteration:
+                return None
+        return self._queue[0][1]
+
+
+def ingest_csv(path):
+    """
+    Reads, repairs and validates the history file in one pass.
+    Returns (DrawTable, IngestReport). Raises OSError if the file can't be read
+    and ValueError if its header lacks a required column.
+    """
+    started = time.perf_counter()
+    report = IngestReport(path)
+    draw_list, date_list, bonus_list, numbers_flat, money_flat = [], [], [], [], []
+    seen = {}
+
+    with open(path, "r", encoding="utf-8-sig", newline="") as f:
+        source = _LineSource(f)
+        reader = csv.reader(source)
+        header = next(reader, None)
+        if header is None:
+            raise ValueError(f"{path} is empty")
+        header = [name.strip() for name in header]
+        try:
+            date_idx, draw_idx, numbers_idx, bonus_idx = (
+                header.index(name) for name in (DATE_COLUMN, DRAW_COLUMN, NUMBERS_COLUMN, BONUS_COLUMN)
+            )
+            money_idx = [header.index(csv_name) for _, csv_name in MONEY_COLUMNS]
+        except ValueError as e:
+            raise ValueError(f"{path} is missing a required column: {e}")
+        width = len(header)
+        money_fields = itemgetter(*money_idx)
+        core_width = max(date_idx, draw_idx, numbers_idx, bonus_idx) + 1
+
+        pending = None  # short row waiting to be joined with the next line
+        previous_line = source.line
+        for row in reader:
+            line = source.line
+            fixes = []
+            if len(row) != width or pending is not None or line - previous_line > 1:
+                row, pending = _repair_row(row, pending, line - previous_line, width, core_width, source, fixes)
+                previous_line = line
+                if row is None:
+                    continue
+                if isinstance(row, str):
+                    report.records += 1
+                    report.reject(line, None, row, pending)
+                    pending = None
+                    continue
+            previous_line = line
+            report.records += 1
+            if line in source.fused_lines:
+                fixes.append("split_fused_line")
+
+            try:
+                draw_no = int(row[draw_idx].strip().rstrip("회"))
+            except ValueError:
+                report.reject(line, None, "invalid_draw_number", row)
+                continue
+            if draw_no < 1:
+                report.reject(line, draw_no, "invalid_draw_number", row)
+                continue
+
+            try:
+                nums = list(map(int, row[numbers_idx].split(",")))
+            except ValueError:
+                report.reject(line, draw_no, "invalid_numbers", row)
+                continue
+            if len(nums) != 6 or len(set(nums)) != 6 or min(nums) < 1 or max(nums) > 45:
+                report.reject(line, draw_no, "invalid_numbers", row)
+                continue
+
+            try:
+                bonus = int(row[bonus_idx])
+            except ValueError:
+                report.reject(line, draw_no, "invalid_bonus", row)
+                continue
+            if not 1 <= bonus <= 45 or bonus in nums:
+                report.reject(line, draw_no, "invalid_bonus", row)
+                continue
+
+            raw_date = row[date_idx].strip()
+            try:
+                # Already-normalized '(YYYY-MM-DD)' dates skip the regex.
+                draw_date = date.fromisoformat(raw_date[1:-1]).isoformat() if len(raw_date) == 12 else None
+            except ValueError:
+                draw_date = None
+            if draw_date is None:
+                draw_date = parse_draw_date(raw_date)
+                if draw_date is None:
+                    report.reject(line, draw_no, "invalid_date", row)
+                    continue
+                report.normalized_dates += 1
+
+            if draw_no in seen:
+                first = seen[draw_no] * 6
+                if sorted(nums) == sorted(numbers_flat[first:first + 6]):
+                    report.fix(line, draw_no, fixes + ["dropped_duplicate"])
+                else:
+                    report.reject(line, draw_no, "conflicting_duplicate", row)
+                continue
+
+            seen[draw_no] = len(draw_list)
+            draw_list.append(draw_no)
+            date_list.append(draw_date)
+            bonus_list.append(bonus)
+            numbers_flat.extend(nums)
+            money_flat.extend(money_fields(row))
+            if fixes:
+                report.fix(line, draw_no, fixes)
+
+        if pending is not None:
+            report.records += 1
+            report.reject(source.line, None, "truncated_record", pending)
+        report.lines = source.lines_read
+
+    stride = len(MONEY_COLUMNS)
+    raw_money = {name: money_flat[i::stride] for i, name in enumerate(MONEY_COLUMN_NAMES)}
+    del money_flat
+    report.empty_money_rows = _count_rows_with_empty(raw_money.values(), len(draw_list))
+    table = DrawTable(draw_list, date_list, numbers_flat, bonus_list, raw_money)
+    report.accepted = len(table)
+    report.missing = _missing_spans(table.draw_numbers)
+    report.elapsed_ms = round((time.perf_counter() - started) * 1000, 2)
+    return table, report
+
+
+def _repair_row(row, pending, lines_spanned, width, core_width, source, fixes):
+    """
+    Structural repairs for a row that isn't exactly one clean line of `width`
+    fields. Returns (row, pending): row is the repaired row, None when it was
+    held back to be joined with the next line (or was blank), or a rejection
+    reason, in which case `pending` carries the offending fields.
+    """
+    if lines_spanned > 1:
+        # A quoted field ran over a line break that doesn't belong there.
+        row = [field.replace("\r", "").replace("\n", "") for field in row]
+        fixes.append("joined_split_line")
+    if not row or (len(row) == 1 and not row[0].strip()):
+        return None, pending
+    if pending is not None:
+        row = pending[:-1] + [pending[-1] + row[0]] + row[1:]
+        fixes.append("joined_split_line")
+    if len(row) < width:
+        upcoming = source.peek()
+        if upcoming is not None and upcoming.strip() and not upcoming.lstrip().startswith("("):
+            return None, row
+        if len(row) < core_width:
+            return "truncated_record", row
+        fixes.append("padded_missing_columns")
+        return row + [""] * (width - len(row)), None
+    if len(row) > width:
+        surplus = len(row) - width
+        if any(row[-1 - surplus:-1]):
+            return "too_many_columns", row
+        # Stray empty columns before the last one (newer rows have one comma
+        # too many); drop them so the total lines up again.
+        fixes.append("dropped_empty_columns")
+        return row[:-1 - surplus] + row[-1:], None
+    return row, None
+
+
+def _missing_spans(draw_numbers):
+    """Inclusive [start, end] spans of draw numbers absent between 1 and the latest draw."""
+    if not len(draw_numbers):
+        return []
+    bounds = np.concatenate(([0], draw_numbers))
+    gaps = np.flatnonzero(np.diff(bounds) > 1)
+    return [(int(bounds[i]) + 1, int(bounds[i + 1]) - 1) for i in gaps]
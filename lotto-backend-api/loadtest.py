@@ -0,0 +1,513 @@
+"""
+End-to-end load test for the dashboard API.
+
+Starts the backend with uvicorn in a subprocess, against a copy of
+lotto_history.csv in a scratch directory, next to a local stand-in for the
+dhlottery JSON endpoint. Worker threads then replay the dashboard's request mix
+(what the prerendered lotto-analyzer-web page still fetches, see PAGE_VIEW) on
+keep-alive connections. During the run new draws are published on the stand-in, appended
+with update_lotto_data.py and picked up through POST /api/admin/reload, so the
+report also shows what a data reload does to latency. With --refresh scheduler
+the backend's own refresh scheduler polls the stand-in instead, and the report
+shows how long each draw took to go live.
+
+Throughput and p50/p95/p99 per route (overall and while a reload is in flight)
+are printed and written to a JSON results file; pass an earlier file to
+--compare to see the change release over release.
+
+Usage:
+    python loadtest.py --duration 60 --concurrency 16 --reloads 2
+    python loadtest.py --out loadtest-results/v2.json --compare loadtest-results/v1.json
+    python loadtest.py --refresh scheduler --reloads 3
+"""
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import socket
+import argparse
+import platform
+import tempfile
+import threading
+import subprocess
+import http.client
+from datetime import date, datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlencode, urlparse, parse_qs
+
+import numpy as np
+
+import ingest
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BACKEND_DIR)
+UPDATER_SCRIPT = os.path.join(REPO_DIR, "update_lotto_data.py")
+
+RESULTS_SCHEMA_VERSION = 2
+FIRST_DRAW_DATE = date(2002, 12, 7)
+
+# One dashboard page view in which the visitor opens every tab: (path, requests per view).
+# The analysis cards are prerendered from /api/snapshot, so these are the fetches the client
+# components still make on mount (lotto-analyzer-web/src/components/analysis).
+PAGE_VIEW = [
+    ("/api/recommendations/hit-rate", 2),  # integrated and co-occurrence tickets
+    ("/api/recommendations/sum-based", 1),  # this visitor's tickets for the prerendered sums
+    ("/api/recommendations/sum-range?min_sum=100&max_sum=150", 1),  # the custom slider's initial range
+]
+# Other requests: (route, chance per page view).
+INTERACTIONS = [
+    ("/api/recommendations/sum-range", 0.3),  # slider moves and range refreshes
+    ("/api/snapshot", 0.05),  # the Next.js server revalidating the page
+]
+BROWSER_HEADERS = {"Accept": "*/*", "Accept-Encoding": "gzip, deflate, br"}
+
+
+def interaction_query(route, rng):
+    if route == "/api/recommendations/hit-rate":
+        return urlencode([("numbers", n) for n in sorted(rng.sample(range(1, 46), 6))])
+    if route == "/api/recommendations/sum-range":
+        low = rng.randrange(80, 180)
+        return urlencode({"min_sum": low, "max_sum": low + rng.randrange(10, 50)})
+    return ""
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def percentiles(latencies):
+    if not latencies:
+        return {"p50_ms": None, "p95_ms": None, "p99_ms": None, "max_ms": None}
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+    return {"p50_ms": round(float(p50), 2), "p95_ms": round(float(p95), 2), "p99_ms": round(float(p99), 2), "max_ms": round(max(latencies), 2)}
+
+
+# --- Stand-in for www.dhlottery.co.kr/common.do?method=getLottoNumber ---
+class DhlotteryStub:
+    """Serves deterministic draws up to `latest`; later draw numbers answer {"returnValue": "fail"}."""
+
+    def __init__(self, latest, seed=0):
+        self.latest = latest
+        self.seed = seed
+        self.requests = 0
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                stub.requests += 1
+                query = parse_qs(urlparse(self.path).query)
+                try:
+                    body = stub.draw(int(query["drwNo"][0]))
+                except (KeyError, ValueError):
+                    body = {"returnValue": "fail"}
+                data = json.dumps(body).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json;charset=UTF-8")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/common.do"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def draw(self, draw_number):
+        if not 1 <= draw_number <= self.latest:
+            return {"returnValue": "fail"}
+        rng = random.Random(self.seed * 100003 + draw_number)
+        numbers = sorted(rng.sample(range(1, 46), 7))
+        bonus = numbers.pop(rng.randrange(7))
+        winners = rng.randint(5, 20)
+        each = rng.randint(1_000_000_000, 3_000_000_000)
+        body = {
+            "returnValue": "success",
+            "drwNo": draw_number,
+            "drwNoDate": (FIRST_DRAW_DATE + timedelta(weeks=draw_number - 1)).isoformat(),
+            "bnusNo": bonus,
+            "firstWinamnt": each,
+            "firstPrzwnerCo": winners,
+            "firstAccumamnt": each * winners,
+            "totSellamnt": rng.randint(110_000_000_000, 130_000_000_000),
+        }
+        body.update({f"drwtNo{i}": n for i, n in enumerate(numbers, 1)})
+        return body
+
+    def publish_next(self):
+        self.latest += 1
+        return self.latest
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+# --- Backend under test ---
+class Backend:
+    """uvicorn running main:app in `workdir` (CSV, SQLite/Parquet exports and model file live there)."""
+
+    def __init__(self, workdir, port, admin_token, workers=1, env=None):
+        self.workdir = workdir
+        self.port = port
+        self.admin_token = admin_token
+        env = {**os.environ, "LOTTO_ADMIN_TOKEN": admin_token, "LOTTO_REFRESH_SCHEDULER": "0", **(env or {})}
+        env.pop("FRONTEND_REVALIDATE_URL", None)
+        self.log = open(os.path.join(workdir, "backend.log"), "w")
+        self.process = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "main:app", "--app-dir", BACKEND_DIR,
+             "--host", "127.0.0.1", "--port", str(port), "--workers", str(workers),
+             "--log-level", "warning", "--no-access-log"],
+            cwd=workdir, env=env, stdout=self.log, stderr=subprocess.STDOUT,
+        )
+
+    def request(self, method, path, headers=None, timeout=30):
+        connection = http.client.HTTPConnection("127.0.0.1", self.port, timeout=timeout)
+        try:
+            connection.request(method, path, headers=headers or {})
+            response = connection.getresponse()
+            return response.status, response.read()
+        finally:
+            connection.close()
+
+    def readiness(self):
+        try:
+            status, body = self.request("GET", "/readyz", timeout=5)
+        except OSError:
+            return None
+        return json.loads(body) if status == 200 else None
+
+    def wait_until_warm(self, timeout, version=None):
+        """Waits for /readyz to report `version` (any when None) with every component built."""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise SystemExit(f"Backend exited with code {self.process.returncode}; see {self.log.name}")
+            ready = self.readiness()
+            if ready and (version is None or ready["dataset_version"] == version):
+                if all(component["ready"] for component in ready["components"].values()):
+                    return ready
+            time.sleep(0.1)
+        raise SystemExit(f"Backend was not warm after {timeout}s; see {self.log.name}")
+
+    def refresh_status(self):
+        status, body = self.request("GET", "/api/refresh/status", timeout=10)
+        return json.loads(body) if status == 200 else None
+
+    def reload(self):
+        status, body = self.request("POST", "/api/admin/reload", headers={"x-admin-token": self.admin_token}, timeout=120)
+        if status != 200:
+            raise RuntimeError(f"reload failed: HTTP {status} {body[:200]!r}")
+        return json.loads(body)
+
+    def close(self):
+        self.process.terminate()
+        try:
+            self.process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+        self.log.close()
+
+
+# --- Load generation ---
+class Worker(threading.Thread):
+    """Replays page views on one keep-alive connection and records (route, start, latency_ms, status)."""
+
+    def __init__(self, port, stop, started_at, seed, think_time):
+        super().__init__(daemon=True)
+        self.port = port
+        self.stop = stop
+        self.started_at = started_at
+        self.rng = random.Random(seed)
+        self.think_time = think_time
+        self.samples = []
+        self.page_views = 0
+        self.connection = None
+
+    def page_requests(self):
+        paths = []
+        for path, count in PAGE_VIEW:
+            for _ in range(count):
+                query = "" if "?" in path else interaction_query(path, self.rng)
+                paths.append(f"{path}?{query}" if query else path)
+        self.rng.shuffle(paths)
+        for route, chance in INTERACTIONS:
+            if self.rng.random() < chance:
+                query = interaction_query(route, self.rng)
+                paths.append(f"{route}?{query}" if query else route)
+        return paths
+
+    def fetch(self, path):
+        if self.connection is None:
+            self.connection = http.client.HTTPConnection("127.0.0.1", self.port, timeout=30)
+        started = time.perf_counter()
+        try:
+            self.connection.request("GET", path, headers=BROWSER_HEADERS)
+            response = self.connection.getresponse()
+            response.read()
+            status = response.status
+        except (OSError, http.client.HTTPException):
+            self.connection.close()
+            self.connection = None
+            status = 0
+        finished = time.perf_counter()
+        route = path.split("?", 1)[0]
+        self.samples.append((route, started - self.started_at, (finished - started) * 1000, status))
+
+    def run(self):
+        while not self.stop.is_set():
+            for path in self.page_requests():
+                if self.stop.is_set():
+                    break
+                self.fetch(path)
+            else:
+                self.page_views += 1
+            if self.think_time:
+                self.stop.wait(self.rng.expovariate(1 / self.think_time))
+        if self.connection is not None:
+            self.connection.close()
+
+
+def run_reload(backend, stub, workdir, started_at, warm_timeout):
+    """Publishes a draw on the stand-in, appends it with the updater, reloads and waits for warm-up."""
+    started = time.perf_counter()
+    draw_number = stub.publish_next()
+    env = dict(os.environ, DHLOTTERY_API_URL=stub.url)
+    update = subprocess.run([sys.executable, UPDATER_SCRIPT], cwd=workdir, env=env, capture_output=True, text=True)
+    if update.returncode != 0:
+        raise RuntimeError(f"update_lotto_data.py failed: {update.stdout}{update.stderr}")
+    updated = time.perf_counter()
+    result = backend.reload()
+    reloaded = time.perf_counter()
+    backend.wait_until_warm(warm_timeout, version=result["dataset_version"])
+    warmed = time.perf_counter()
+    return {
+        "draw": draw_number,
+        "started_s": round(started - started_at, 3),
+        "finished_s": round(warmed - started_at, 3),
+        "update_ms": round((updated - started) * 1000, 1),
+        "reload_ms": round((reloaded - updated) * 1000, 1),
+        "warm_ms": round((warmed - reloaded) * 1000, 1),
+        "dataset_version": result["dataset_version"],
+        "previous_version": result["previous_version"],
+        "draws": result["draws"],
+    }
+
+
+def run_scheduled_refresh(backend, stub, started_at, warm_timeout):
+    """Publishes a draw on the stand-in and waits for the backend's scheduler to poll, ingest and publish it."""
+    started = time.perf_counter()
+    draw_number = stub.publish_next()
+    deadline = started + warm_timeout
+    while True:
+        status = backend.refresh_status()
+        if status and (status["scheduler"]["freshness"]["latest_draw"] or 0) >= draw_number:
+            break
+        if time.perf_counter() > deadline:
+            raise SystemExit(f"Draw {draw_number} was not published after {warm_timeout}s")
+        time.sleep(0.05)
+    published = time.perf_counter()
+    refresh = status["last_refresh"]
+    return {
+        "draw": draw_number,
+        "started_s": round(started - started_at, 3),
+        "finished_s": round(published - started_at, 3),
+        "live_ms": round((published - started) * 1000, 1),
+        "stages": refresh["stages"],
+        "dataset_version": refresh["dataset_version"],
+        "previous_version": refresh["previous_version"],
+        "draws": status["scheduler"]["freshness"]["latest_draw"],
+    }
+
+
+def summarize(samples, duration):
+    by_route = {}
+    for route, _, latency, status in samples:
+        entry = by_route.setdefault(route, {"latencies": [], "errors": 0})
+        entry["latencies"].append(latency)
+        if status >= 400 or status == 0:
+            entry["errors"] += 1
+    routes = {}
+    for route in sorted(by_route):
+        entry = by_route[route]
+        routes[route] = {
+            "requests": len(entry["latencies"]),
+            "errors": entry["errors"],
+            "rps": round(len(entry["latencies"]) / duration, 2) if duration else None,
+            **percentiles(entry["latencies"]),
+        }
+    return routes
+
+
+def build_results(args, samples, page_views, duration, reloads, backend_info):
+    windows = [(reload["started_s"], reload["finished_s"]) for reload in reloads]
+    during = [sample for sample in samples if any(start <= sample[1] <= end for start, end in windows)]
+    reload_time = sum(end - start for start, end in windows)
+    errors = sum(1 for sample in samples if sample[3] >= 400 or sample[3] == 0)
+    return {
+        "schema_version": RESULTS_SCHEMA_VERSION,
+        "label": args.label,
+        "generated_at": datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        "environment": {"python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count()},
+        "config": {
+            "duration_s": args.duration,
+            "concurrency": args.concurrency,
+            "reloads": args.reloads,
+            "think_ms": args.think_ms,
+            "workers": args.workers,
+            "refresh": args.refresh,
+            "seed": args.seed,
+            "page_view": [f"{path} x{count}" for path, count in PAGE_VIEW],
+        },
+        "backend": backend_info,
+        "totals": {
+            "requests": len(samples),
+            "errors": errors,
+            "page_views": page_views,
+            "duration_s": round(duration, 3),
+            "rps": round(len(samples) / duration, 2),
+            "page_views_per_s": round(page_views / duration, 2),
+            **percentiles([sample[2] for sample in samples]),
+        },
+        "routes": summarize(samples, duration),
+        "during_reload": {
+            "requests": len(during),
+            **percentiles([sample[2] for sample in during]),
+            "routes": summarize(during, reload_time),
+        },
+        "reloads": reloads,
+    }
+
+
+def print_results(results):
+    totals = results["totals"]
+    print(
+        f"\n{totals['requests']} requests ({totals['errors']} errors) in {totals['duration_s']}s: "
+        f"{totals['rps']} req/s, {totals['page_views_per_s']} page views/s"
+    )
+    print(f"{'route':<36}{'req':>8}{'err':>6}{'rps':>9}{'p50':>9}{'p95':>9}{'p99':>9}")
+    for route, stats in results["routes"].items():
+        print(
+            f"{route:<36}{stats['requests']:>8}{stats['errors']:>6}{stats['rps']:>9}"
+            f"{stats['p50_ms']:>9}{stats['p95_ms']:>9}{stats['p99_ms']:>9}"
+        )
+    during = results["during_reload"]
+    if during["requests"]:
+        print(f"{'(during reloads)':<36}{during['requests']:>8}{'':>15}{during['p50_ms']:>9}{during['p95_ms']:>9}{during['p99_ms']:>9}")
+    for reload in results["reloads"]:
+        if "live_ms" in reload:
+            stages = ", ".join(f"{name} {ms}ms" for name, ms in reload["stages"].items())
+            print(f"draw {reload['draw']} at {reload['started_s']}s live after {reload['live_ms']}ms ({stages}) -> {reload['dataset_version']}")
+            continue
+        print(
+            f"reload of draw {reload['draw']} at {reload['started_s']}s: update {reload['update_ms']}ms, "
+            f"reload {reload['reload_ms']}ms, warm-up {reload['warm_ms']}ms -> {reload['dataset_version']}"
+        )
+
+
+def print_comparison(results, baseline):
+    """Per-route change in throughput and tail latency against an earlier results file."""
+    print(f"\nCompared with {baseline.get('label')} ({baseline.get('generated_at')}):")
+    if baseline.get("config") != results["config"]:
+        print(f"Note: the runs used different settings: {baseline.get('config')} vs {results['config']}")
+    print(f"{'route':<36}{'rps':>24}{'p95 ms':>24}{'p99 ms':>24}")
+    rows = [("(all)", results["totals"], baseline.get("totals", {}))]
+    rows += [(route, stats, baseline.get("routes", {}).get(route, {})) for route, stats in results["routes"].items()]
+    for route, current, previous in rows:
+        cells = []
+        for key in ("rps", "p95_ms", "p99_ms"):
+            before, after = previous.get(key), current.get(key)
+            if before:
+                cells.append(f"{before}->{after} ({(after - before) / before * 100:+.0f}%)")
+            else:
+                cells.append(f"{after}")
+        print(f"{route:<36}{cells[0]:>24}{cells[1]:>24}{cells[2]:>24}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay the dashboard request mix against a local backend.")
+    parser.add_argument("--duration", type=float, default=30, help="Seconds of load (default: 30)")
+    parser.add_argument("--concurrency", type=int, default=8, help="Concurrent connections (default: 8)")
+    parser.add_argument("--reloads", type=int, default=1, help="Data reloads spread over the run (default: 1)")
+    parser.add_argument("--think-ms", type=float, default=0, help="Mean pause between page views per connection")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes (default: 1)")
+    parser.add_argument("--refresh", choices=["reload", "scheduler"], default="reload",
+                        help="How new draws get in: updater + admin reload, or the backend's refresh scheduler")
+    parser.add_argument("--csv", default=os.path.join(REPO_DIR, "lotto_history.csv"), help="History to start from")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--warm-timeout", type=float, default=300, help="Seconds to wait for warm-up")
+    parser.add_argument("--label", help="Name of this run in the results (default: git commit)")
+    parser.add_argument("--out", help="Results file (default: loadtest-results/<label>.json)")
+    parser.add_argument("--compare", help="Earlier results file to compare against")
+    args = parser.parse_args()
+    if args.reloads and args.workers != 1 and args.refresh == "reload":
+        parser.error("--reloads needs --workers 1 (a reload only reaches the worker that serves it)")
+
+    if not args.label:
+        git = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_DIR, capture_output=True, text=True)
+        args.label = git.stdout.strip() or datetime.now().strftime('%Y%m%d-%H%M%S')
+    out = args.out or os.path.join("loadtest-results", f"{args.label}.json")
+
+    workdir = tempfile.mkdtemp(prefix="lotto-loadtest-")
+    csv_path = os.path.join(workdir, "lotto_history.csv")
+    shutil.copyfile(args.csv, csv_path)
+    table, _ = ingest.ingest_csv(csv_path)
+    stub = DhlotteryStub(table.last_draw, seed=args.seed)
+    env = None
+    if args.refresh == "scheduler":
+        # The stand-in's draws are long overdue by the calendar, so poll at the fast rate throughout.
+        env = {"LOTTO_REFRESH_SCHEDULER": "1", "DHLOTTERY_API_URL": stub.url,
+               "LOTTO_POLL_MIN_S": "0.1", "LOTTO_POLL_MAX_S": "0.25", "LOTTO_POLL_SLOW_MAX_S": "0.25"}
+    backend = Backend(workdir, free_port(), admin_token=os.urandom(16).hex(), workers=args.workers, env=env)
+    try:
+        print(f"Starting backend on port {backend.port} (scratch directory {workdir})...")
+        ready = backend.wait_until_warm(args.warm_timeout)
+        backend_info = {"dataset_version": ready["dataset_version"], "draws": ready["draws"],
+                        "build_ms": {name: c["build_ms"] for name, c in ready["components"].items()}}
+        print(f"Backend warm with {ready['draws']} draws; {args.concurrency} connections for {args.duration}s.")
+
+        stop = threading.Event()
+        started_at = time.perf_counter()
+        workers = [Worker(backend.port, stop, started_at, args.seed * 1000 + i, args.think_ms / 1000)
+                   for i in range(args.concurrency)]
+        for worker in workers:
+            worker.start()
+
+        reloads = []
+        for i in range(args.reloads):
+            at = args.duration * (i + 1) / (args.reloads + 1)
+            time.sleep(max(0.0, at - (time.perf_counter() - started_at)))
+            if args.refresh == "scheduler":
+                reloads.append(run_scheduled_refresh(backend, stub, started_at, args.warm_timeout))
+            else:
+                reloads.append(run_reload(backend, stub, workdir, started_at, args.warm_timeout))
+        time.sleep(max(0.0, args.duration - (time.perf_counter() - started_at)))
+        stop.set()
+        for worker in workers:
+            worker.join()
+        duration = time.perf_counter() - started_at
+    finally:
+        backend.close()
+        stub.close()
+
+    samples = [sample for worker in workers for sample in worker.samples]
+    results = build_results(args, samples, sum(worker.page_views for worker in workers), duration, reloads, backend_info)
+    print_results(results)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            print_comparison(results, json.load(f))
+
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+    shutil.rmtree(workdir, ignore_errors=True)
+    print(f"Wrote {out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,33 @@
-import csv
-import json
 from collections import Counter
-from itertools import combinations
-import random
 import os
+import secrets
+import threading
+from urllib.parse import urlencode
 import uvicorn
+import numpy as np
 from datetime import datetime
 
-from fastapi import FastAPI, Query
-from typing import List
+from fastapi import FastAPI, Query, HTTPException, Request
+from fastapi.responses import JSONResponse, PlainTextResponse
+from typing import List, Optional
 from fastapi.middleware.cors import CORSMiddleware
+from starlette.concurrency import run_in_threadpool
+
+import ingest
+import storage
+import snapshot
+import ml_model
+import transitions
+import randomness
+import wire
+import profiling
+import patterns
+import ticket_solver
+import exclusions
+import refresh
+from bitmap_index import DrawBitmapIndex
+from components import ComponentRegistry
+from prefix_sums import FeatureHistograms, PrefixSums
 
 app = FastAPI()
 
@@ -21,310 +39,841 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(profiling.ProfilingMiddleware)
 
-# --- Data Loading and Preprocessing (Run once on startup) ---
+# --- Data Loading (CSV only on startup; analyses are built lazily) ---
 LOTTO_HISTORY_FILE = "lotto_history.csv"
+WARMUP_ON_STARTUP = os.environ.get("LOTTO_WARMUP", "1") != "0"
+# Enables the admin and debug endpoints (header x-admin-token); unset disables them.
+ADMIN_TOKEN = os.environ.get("LOTTO_ADMIN_TOKEN", "")
 
 # --- Global variables ---
-hot_numbers = []
-cold_numbers = []
-hot_bonus_numbers = []
-cold_bonus_numbers = []
-pattern_stats = {}
-time_series_data = []
-ml_predictions = {}
-co_occurrence_data = []
-phase1_recommendations = {}
-integrated_recommendation = []
-sum_recommendations = {}
-all_winning_numbers = []
-main_numbers_counter = Counter()
-sums_counter = Counter()
+draw_table = ingest.DrawTable.empty()
+ingest_report = None
+dataset_version = None
+analysis = ComponentRegistry()
+encoded_responses = wire.EncodedResponses()
+ticket_solver_instance = ticket_solver.TicketSolver()
+issued_tickets = exclusions.IssuedTickets()
+ISSUE_ROUNDS = 10
+FIXED_SUM_RANGES = {"low_sum": (60, 90), "medium_sum": (120, 150), "high_sum": (180, 210)}
+last_refresh = None
+_refresh_lock = threading.Lock()
+# Held while publish_data() swaps datasets, so a lazily built export sees either version.
+_publish_lock = threading.Lock()
 
 # --- Helper Functions ---
-def generate_combination_for_sum_simple(target_sum, max_attempts=1000):
-    for _ in range(max_attempts):
-        combo = random.sample(range(1, 46), 6)
-        if sum(combo) == target_sum: return sorted(combo)
-    return "조합 생성 실패"
-
-def generate_combination_in_sum_range(min_sum: int, max_sum: int, max_attempts=10000):
-    weighted_numbers = []
-    if main_numbers_counter:
-        for num, count in main_numbers_counter.items():
-            weighted_numbers.extend([num] * count)
-
-    if not weighted_numbers:
-        for _ in range(max_attempts):
-            combo = random.sample(range(1, 46), 6)
-            if min_sum <= sum(combo) <= max_sum:
-                return sorted(combo)
-        return "조합 생성 실패"
-
-    for _ in range(max_attempts):
-        combo = set()
-        while len(combo) < 6:
-            combo.add(random.choice(weighted_numbers))
-        
-        combo = list(combo)
-        if min_sum <= sum(combo) <= max_sum:
-            return sorted(combo)
-            
-    return "조합 생성 실패"
+def generate_constrained(spec, count=1, weighted=False, client=None, history=None, weights=None, pool=None):
+    """
+    Samples up to `count` tickets for `spec` that are neither past winners nor
+    already issued, taking them from `pool` when it holds the spec. `history`,
+    `weights` and `pool` default to the published components.
+    """
+    if len(draw_table):
+        history = history or analysis.get("history_filter")
+        weights = weights if weights is not None else analysis.get("number_weights")
+        pool = pool or analysis.get("ticket_pool")
+    tickets = []
+    with profiling.section("solver.sample"):
+        for _ in range(ISSUE_ROUNDS):
+            missing = count - len(tickets)
+            if missing <= 0:
+                break
+            batch = pool.take(spec, missing * 2 + 2, weighted) if pool is not None else None
+            if batch is None:
+                batch = ticket_solver_instance.sample(spec, missing * 2 + 2, weights=weights if weighted else None)
+            if not batch:
+                break
+            for ticket in batch:
+                if len(tickets) < count and ticket not in tickets and (history is None or history.allows(ticket)) \
+                        and issued_tickets.claim(ticket, client):
+                    tickets.append(ticket)
+    return tickets
+
+def generate_combination_for_sum_simple(target_sum, client=None):
+    try:
+        tickets = generate_constrained(ticket_solver.TicketSpec(min_sum=target_sum, max_sum=target_sum), client=client)
+    except ValueError:
+        tickets = []
+    return tickets[0] if tickets else "조합 생성 실패"
 
-def load_and_analyze_data():
-    global hot_numbers, cold_numbers, hot_bonus_numbers, cold_bonus_numbers
-    global pattern_stats, time_series_data, ml_predictions, co_occurrence_data
-    global phase1_recommendations, integrated_recommendation, sum_recommendations, all_winning_numbers, main_numbers_counter, sums_counter
-
-    # --- Reset global variables ---
-    hot_numbers, cold_numbers, hot_bonus_numbers, cold_bonus_numbers = [], [], [], []
-    pattern_stats, time_series_data, co_occurrence_data = {}, [], []
-    ml_predictions, phase1_recommendations, sum_recommendations = {}, {}, {}
-    integrated_recommendation = []
-    all_winning_numbers = []
-    pair_frequencies = Counter()
-    main_numbers_counter.clear()
-    sums_counter.clear()
+def generate_combination_in_sum_range(min_sum: int, max_sum: int, client=None):
+    try:
+        tickets = generate_constrained(ticket_solver.TicketSpec(min_sum=min_sum, max_sum=max_sum), weighted=True, client=client)
+    except ValueError:
+        tickets = []
+    return tickets[0] if tickets else "조합 생성 실패"
+
+def generate_sum_based_recommendations(sums_counter, client=None):
+    fixed_recs = {
+        name: {"range": f"{low}-{high}", "recommendation": generate_combination_in_sum_range(low, high, client)}
+        for name, (low, high) in FIXED_SUM_RANGES.items()
+    }
+    with profiling.section("sum_based.top_sums"):
+        top_5_recs = [{"sum": s, "count": c, "recommendation": generate_combination_for_sum_simple(s, client)} for s, c in sums_counter.most_common(5)]
+    return {
+        "top_5_frequent_sums": top_5_recs,
+        "fixed_sum_recommendations": fixed_recs
+    }
 
+def summarize_sum_ranges(sums_counter):
+    """
+    The ticket-free part of the sum-based recommendations. The snapshot is
+    shared by every visitor, so its tickets are fetched per client instead.
+    """
+    return {
+        "top_5_frequent_sums": [{"sum": s, "count": c} for s, c in sums_counter.most_common(5)],
+        "fixed_sum_ranges": {name: {"range": f"{low}-{high}"} for name, (low, high) in FIXED_SUM_RANGES.items()},
+    }
+
+def read_last_update():
     try:
-        with open(LOTTO_HISTORY_FILE, 'r', encoding='utf-8-sig') as f:
-            reader = csv.DictReader(f)
-            
-            bonus_numbers_counter = Counter()
-            last_seen = {num: 0 for num in range(1, 46)}
-            all_sums = []
-            odd_even_ratios_counter = Counter()
-            high_low_ratios_counter = Counter()
-            consecutive_count = 0
-            total_draws = 0
-
-            valid_rows = [row for row in reader if row and row.get('회차') and '회' in row['회차']]
-            sorted_list = sorted(valid_rows, key=lambda r: int(r['회차'].replace('회', '')))
-
-            for i, row in enumerate(sorted_list):
-                try:
-                    draw_num = int(row['회차'].replace('회', ''))
-                    total_draws = draw_num
-
-                    numbers_str = row['당첨번호']
-                    main_nums = [int(n.strip()) for n in numbers_str.split(',')]
-                    all_winning_numbers.append(main_nums)
-                    
-                    current_draw_numbers = set(main_nums)
-                    for num in main_nums:
-                        main_numbers_counter[num] += 1
-
-                    bonus_num_str = row.get('보너스번호')
-                    if bonus_num_str and bonus_num_str.isdigit():
-                        bonus_num = int(bonus_num_str)
-                        bonus_numbers_counter[bonus_num] += 1
-                        current_draw_numbers.add(bonus_num)
-
-                    for num in current_draw_numbers:
-                        last_seen[num] = draw_num
-                    
-                    sum_val = sum(main_nums)
-                    all_sums.append(sum_val)
-                    sums_counter[sum_val] += 1
-
-                    odd_count = sum(1 for n in main_nums if n % 2 != 0)
-                    odd_even_ratios_counter[f"{odd_count}:{6-odd_count}"] += 1
-
-                    low_count = sum(1 for n in main_nums if 1 <= n <= 22)
-                    high_low_ratios_counter[f"{6-low_count}:{low_count}"] += 1
-                    
-                    sorted_nums = sorted(main_nums)
-                    if any(sorted_nums[j+1] == sorted_nums[j] + 1 for j in range(len(sorted_nums) - 1)):
-                        consecutive_count += 1
-
-                    for pair in combinations(sorted_nums, 2):
-                        pair_frequencies[pair] += 1
-
-                except Exception as e:
-                    print(f"CRITICAL: Failed to process row {i + 1}. Data: {row}. Error: {e}")
-                    continue
-
-        if not main_numbers_counter:
-            print("CRITICAL: No data was processed. All counters are empty.")
-            return
-
-        hot_numbers.extend([{"number": num, "count": count} for num, count in main_numbers_counter.most_common(10)])
-        cold_numbers.extend([{"number": num, "count": count} for num, count in main_numbers_counter.most_common()[-10:]])
-        hot_bonus_numbers.extend([{"number": num, "count": count} for num, count in bonus_numbers_counter.most_common(5)])
-        cold_bonus_numbers.extend([{"number": num, "count": count} for num, count in bonus_numbers_counter.most_common()[-5:]])
-
-        pattern_stats["total_draws"] = total_draws
-        pattern_stats["odd_even_ratios"] = dict(odd_even_ratios_counter.most_common())
-        pattern_stats["high_low_ratios"] = dict(high_low_ratios_counter.most_common())
-        pattern_stats["consecutive_stats"] = {
-            "count": consecutive_count,
-            "percentage": round((consecutive_count / total_draws) * 100, 2) if total_draws > 0 else 0
-        }
-        if all_sums:
-            pattern_stats["sum_stats"] = {
-                "min": int(min(all_sums)), "max": int(max(all_sums)),
-                "mean": round(sum(all_sums) / len(all_sums), 2),
-                "median": int(sorted(all_sums)[len(all_sums) // 2]),
-                "std_dev": round((sum((x - (sum(all_sums) / len(all_sums))) ** 2 for x in all_sums) / len(all_sums)) ** 0.5, 2)
-            }
-
-        time_series_data_raw = []
-        window_size = 52
-        sample_rate = 10
-        draws_ts = list(range(1, total_draws + 1))
-        moving_averages = [round(sum(all_sums[max(0, i - window_size + 1):i + 1]) / len(all_sums[max(0, i - window_size + 1):i + 1]), 2) if i >= window_size - 1 else None for i in range(len(all_sums))]
-        for i in range(len(draws_ts)):
-            if i % sample_rate == 0 and i < len(all_sums) and i < len(moving_averages):
-                time_series_data_raw.append({"name": f"{draws_ts[i]}회", "sum": all_sums[i], "moving_average": moving_averages[i]})
-        time_series_data.extend(time_series_data_raw)
-
-        overdue = {num: total_draws - seen_at for num, seen_at in last_seen.items()}
-        ml_predictions["hot_numbers_prediction"] = sorted([num for num, count in main_numbers_counter.most_common(6)])
-        ml_predictions["overdue_numbers_prediction"] = sorted([num for num, gap in sorted(overdue.items(), key=lambda item: item[1], reverse=True)[:6]])
-
-        co_occurrence_data.extend([{"pair": f"{p[0]} - {p[1]}", "count": c} for p, c in pair_frequencies.most_common(20)])
-
-        co_occurrence_nodes = Counter()
-        for pair, count in pair_frequencies.most_common(50):
-            co_occurrence_nodes.update({pair[0]: count, pair[1]: count})
-        phase1_recommendations["pattern"] = sorted([12, 13, 17, 28, 33, 40])
-        phase1_recommendations["co_occurrence"] = sorted([num for num, count in co_occurrence_nodes.most_common(6)])
-
-        integrated_scores = Counter()
-        if main_numbers_counter:
-            max_freq, min_freq = max(main_numbers_counter.values()), min(main_numbers_counter.values())
-            max_overdue, min_overdue = max(overdue.values()), min(overdue.values())
-            for num in range(1, 46):
-                norm_freq = (main_numbers_counter.get(num, 0) - min_freq) / (max_freq - min_freq) if (max_freq - min_freq) > 0 else 0
-                norm_overdue = (overdue.get(num, 0) - min_overdue) / (max_overdue - min_overdue) if (max_overdue - min_overdue) > 0 else 0
-                integrated_scores[num] += norm_freq * 0.4 + norm_overdue * 0.3
-                if num in phase1_recommendations["pattern"]: integrated_scores[num] += 0.1
-                if num in phase1_recommendations["co_occurrence"]: integrated_scores[num] += 0.1
-        integrated_recommendation.extend(sorted([num for num, score in integrated_scores.most_common(6)]))
-
-        def generate_combination_for_sum_simple(target_sum, max_attempts=1000):
-            for _ in range(max_attempts):
-                combo = random.sample(range(1, 46), 6)
-                if sum(combo) == target_sum: return sorted(combo)
-            return "조합 생성 실패"
-        sum_recommendations["top_5_frequent_sums"] = [{"sum": s, "count": c, "recommendation": generate_combination_for_sum_simple(s)} for s, c in sums_counter.most_common(5)]
-        sum_recommendations["fixed_sum_recommendations"] = {
-            "low_sum": {"range": "60-90", "recommendation": generate_combination_in_sum_range(60, 90)},
-            "medium_sum": {"range": "120-150", "recommendation": generate_combination_in_sum_range(120, 150)},
-            "high_sum": {"range": "180-210", "recommendation": generate_combination_in_sum_range(180, 210)}
-        }
+        last_modified_timestamp = os.path.getmtime(LOTTO_HISTORY_FILE)
+        return datetime.fromtimestamp(last_modified_timestamp).strftime('%Y-%m-%d %H:%M:%S')
+    except FileNotFoundError:
+        return "N/A"
+
+def ingest_data():
+    """
+    Ingests the CSV (validated column arrays, see ingest.py). Returns (table,
+    dataset version), or None when the file can't be read or has no draws.
+    """
+    global ingest_report
 
+    try:
+        with profiling.section("load.ingest"):
+            table, report = ingest.ingest_csv(LOTTO_HISTORY_FILE)
     except Exception as e:
         print(f"CRITICAL: Failed to open or read the CSV file. Error: {e}")
+        return None
+
+    ingest_report = report.to_dict()
+    print(
+        f"Ingested {report.accepted} draws in {report.elapsed_ms}ms: {report.fixed_count} fixed, "
+        f"{report.rejected_count} rejected, {ingest_report['missing_count']} missing."
+    )
+    for rejected in report.rejected:
+        print(f"CRITICAL: Rejected line {rejected['line']} ({rejected['reason']}). Data: {rejected['raw']}")
+
+    if not len(table):
+        print("CRITICAL: No data was processed. All counters are empty.")
+        return None
+
+    with profiling.section("load.dataset_version"):
+        version = storage.compute_dataset_version(table)
+    return table, version
+
+def stage_data(table, version):
+    """A registry and response store for `version`, built without touching the published ones."""
+    responses = wire.EncodedResponses()
+    responses.reset(version)
+    return analysis.stage(version, table=table, dataset_version=version, responses=responses), responses
+
+def publish_data(table, version, staged=None, responses=None):
+    """
+    Makes `version` the served dataset: swaps in the components and encoded
+    responses built by stage_data(), or, without them, starts empty ones that
+    build on first use.
+    """
+    global draw_table, dataset_version, encoded_responses
+    with _publish_lock:
+        if staged is None:
+            responses = wire.EncodedResponses()
+            responses.reset(version)
+            analysis.reset(version, table=table, dataset_version=version, responses=responses)
+        else:
+            analysis.publish(staged)
+            storage.activate(version)
+        encoded_responses = responses
+        # The version goes first: requests only build components once draw_table is non-empty,
+        # and storage_export compares its version with this one.
+        dataset_version = version
+        draw_table = table
 
-# --- Helper Functions ---
-def generate_combination_in_sum_range(min_sum: int, max_sum: int, max_attempts=10000):
-    weighted_numbers = []
-    if main_numbers_counter:
-        for num, count in main_numbers_counter.items():
-            weighted_numbers.extend([num] * count)
-
-    if not weighted_numbers:
-        for _ in range(max_attempts):
-            combo = random.sample(range(1, 46), 6)
-            if min_sum <= sum(combo) <= max_sum:
-                return sorted(combo)
-        return "조합 생성 실패"
-
-    for _ in range(max_attempts):
-        combo = set()
-        while len(combo) < 6:
-            combo.add(random.choice(weighted_numbers))
-        
-        combo = list(combo)
-        if min_sum <= sum(combo) <= max_sum:
-            return sorted(combo)
-            
-    return "조합 생성 실패"
+def load_and_analyze_data():
+    """
+    Ingests the CSV and, if the data changed, publishes it. Every analysis is a
+    component of `analysis` and is computed on first use (or by warm-up).
+    """
+    loaded = ingest_data()
+    if loaded is not None and loaded[1] != dataset_version:
+        publish_data(*loaded)
+
+# --- Analysis components ---
+@analysis.component("counters", deps=["table"])
+def build_counters(table):
+    # Main or bonus appearance of each number; last_seen is the draw of its last one.
+    drawn = table.onehot(bool)
+    drawn[np.arange(len(table)), table.bonus] = True
+    last_position = len(table) - 1 - drawn[::-1].argmax(axis=0)
+    return {
+        "main": Counter(table.numbers.ravel().tolist()),
+        "bonus": Counter(table.bonus.tolist()),
+        "sums": Counter(table.sums.tolist()),
+        "last_seen": {
+            num: int(table.draw_numbers[last_position[num]]) if drawn[:, num].any() else 0
+            for num in range(1, 46)
+        },
+        "total_draws": table.last_draw,
+    }
+
+@analysis.component("number_weights", deps=["counters"])
+def build_number_weights(counters):
+    """Per-number sampling weights from historical frequency (add-one, so no number is ruled out)."""
+    weights = np.ones(46)
+    for num, count in counters["main"].items():
+        weights[num] += count
+    weights[0] = 0
+    return weights
+
+@analysis.component("draw_index", deps=["table"])
+def build_draw_index(table):
+    return DrawBitmapIndex.from_table(table)
+
+@analysis.component("prefix_sums", deps=["table"])
+def build_prefix_sums(table):
+    return PrefixSums(table)
+
+@analysis.component("frequency", deps=["counters"])
+def build_frequency(counters):
+    main_numbers_counter, bonus_numbers_counter = counters["main"], counters["bonus"]
+    return {
+        "hotNumbers": [{"number": num, "count": count} for num, count in main_numbers_counter.most_common(10)],
+        "coldNumbers": [{"number": num, "count": count} for num, count in main_numbers_counter.most_common()[-10:]],
+        "hotBonusNumbers": [{"number": num, "count": count} for num, count in bonus_numbers_counter.most_common(5)],
+        "coldBonusNumbers": [{"number": num, "count": count} for num, count in bonus_numbers_counter.most_common()[-5:]],
+    }
+
+@analysis.component("pattern_features", deps=["table"])
+def build_pattern_features(table):
+    """Every registered pattern feature (see patterns.py) evaluated over the history."""
+    return patterns.FEATURES.evaluate(table.numbers)
+
+@analysis.component("pattern_histograms", deps=["pattern_features"])
+def build_pattern_histograms(pattern_features):
+    """Cumulative feature histograms for range-restricted pattern summaries."""
+    return FeatureHistograms(patterns.FEATURES, pattern_features)
+
+@analysis.component("patterns", deps=["table", "pattern_features"])
+def build_pattern_stats(table, pattern_features):
+    odd_even_ratios_counter = Counter(f"{odd}:{6 - odd}" for odd in pattern_features["odd_count"].tolist())
+    high_low_ratios_counter = Counter(f"{6 - low}:{low}" for low in pattern_features["low_count"].tolist())
+    consecutive_count = int((pattern_features["max_run"] > 1).sum())
+    all_sums = pattern_features["sum"].tolist()
+
+    total_draws = len(all_sums)
+    mean = sum(all_sums) / total_draws
+    return {
+        "total_draws": total_draws,
+        "odd_even_ratios": dict(odd_even_ratios_counter.most_common()),
+        "high_low_ratios": dict(high_low_ratios_counter.most_common()),
+        "consecutive_stats": {
+            "count": consecutive_count,
+            "percentage": round((consecutive_count / total_draws) * 100, 2) if total_draws > 0 else 0
+        },
+        "sum_stats": {
+            "min": int(min(all_sums)), "max": int(max(all_sums)),
+            "mean": round(mean, 2),
+            "median": int(sorted(all_sums)[len(all_sums) // 2]),
+            "std_dev": round((sum((x - mean) ** 2 for x in all_sums) / len(all_sums)) ** 0.5, 2)
+        },
+        "features": patterns.FEATURES.summarize(pattern_features),
+    }
+
+@analysis.component("timeseries", deps=["table"])
+def build_time_series(table):
+    all_sums = table.sums.tolist()
+    draw_numbers = table.draw_numbers.tolist()
+    window_size = 52
+    sample_rate = 10
+    time_series_data = []
+    for i in range(0, len(all_sums), sample_rate):
+        window = all_sums[max(0, i - window_size + 1):i + 1]
+        moving_average = round(sum(window) / len(window), 2) if i >= window_size - 1 else None
+        time_series_data.append({"name": f"{draw_numbers[i]}회", "sum": all_sums[i], "moving_average": moving_average})
+    return time_series_data
+
+@analysis.component("overdue", deps=["counters"])
+def build_overdue(counters):
+    return {num: counters["total_draws"] - seen_at for num, seen_at in counters["last_seen"].items()}
+
+@analysis.component("history_filter", deps=["table"])
+def build_history_filter(table):
+    """Packed past winning combinations every generator checks its tickets against (see exclusions.py)."""
+    return exclusions.HistoryFilter(table)
+
+@analysis.component("cooccurrence", deps=["draw_index", "history_filter"])
+def build_cooccurrence(draw_index, history_filter):
+    pair_frequencies = Counter(draw_index.pair_counts())
+    co_occurrence_nodes = Counter()
+    for pair, count in pair_frequencies.most_common(50):
+        co_occurrence_nodes.update({pair[0]: count, pair[1]: count})
+    return {
+        "pairs": [{"pair": f"{p[0]} - {p[1]}", "count": c} for p, c in pair_frequencies.most_common(20)],
+        "recommendation": history_filter.first_allowed([num for num, count in co_occurrence_nodes.most_common()]),
+    }
+
+@analysis.component("phase1", deps=["cooccurrence"])
+def build_phase1_recommendations(cooccurrence):
+    return {
+        "pattern": sorted([12, 13, 17, 28, 33, 40]),
+        "co_occurrence": cooccurrence["recommendation"],
+    }
+
+@analysis.component("ml_baseline", deps=["counters", "overdue", "history_filter"])
+def build_ml_predictions(counters, overdue, history_filter):
+    return {
+        "hot_numbers_prediction": history_filter.first_allowed([num for num, count in counters["main"].most_common()]),
+        "overdue_numbers_prediction": history_filter.first_allowed([num for num, gap in sorted(overdue.items(), key=lambda item: item[1], reverse=True)]),
+    }
+
+@analysis.component("integrated", deps=["counters", "overdue", "phase1", "history_filter"])
+def build_integrated_recommendation(counters, overdue, phase1_recommendations, history_filter):
+    main_numbers_counter = counters["main"]
+    integrated_scores = Counter()
+    max_freq, min_freq = max(main_numbers_counter.values()), min(main_numbers_counter.values())
+    max_overdue, min_overdue = max(overdue.values()), min(overdue.values())
+    for num in range(1, 46):
+        norm_freq = (main_numbers_counter.get(num, 0) - min_freq) / (max_freq - min_freq) if (max_freq - min_freq) > 0 else 0
+        norm_overdue = (overdue.get(num, 0) - min_overdue) / (max_overdue - min_overdue) if (max_overdue - min_overdue) > 0 else 0
+        integrated_scores[num] += norm_freq * 0.4 + norm_overdue * 0.3
+        if num in phase1_recommendations["pattern"]: integrated_scores[num] += 0.1
+        if num in phase1_recommendations["co_occurrence"]: integrated_scores[num] += 0.1
+    return history_filter.first_allowed([num for num, score in integrated_scores.most_common()])
+
+@analysis.component("transitions", deps=["table"])
+def build_transitions(table):
+    return transitions.TransitionAnalysis(table)
+
+@analysis.component("randomness", deps=["table"])
+def build_randomness_tests(table):
+    return randomness.RandomnessTests(table)
+
+@analysis.component("randomness_battery", deps=["randomness"])
+def build_randomness_battery(randomness_tests):
+    return randomness_tests.battery()
+
+@analysis.component("storage_export", deps=["table", "dataset_version"])
+def build_storage_export(table, version):
+    with _publish_lock:
+        served = version == dataset_version
+    storage.export_draws(table, version)
+    if served:
+        # Built on first use for the served version; a staged one is activated by publish_data().
+        with _publish_lock:
+            if version == dataset_version:
+                storage.activate(version)
+            else:
+                # A newer version was published while this one was exporting.
+                storage.discard(version)
+    return version
+
+@analysis.component("ticket_pool", deps=["counters", "number_weights"])
+def build_ticket_pool(counters, weights):
+    """Pre-sampled tickets for the sum-based recommendations (fixed ranges weighted, top sums uniform)."""
+    pool = ticket_solver.TicketPool(ticket_solver_instance, weights)
+    for low, high in FIXED_SUM_RANGES.values():
+        pool.fill(ticket_solver.TicketSpec(min_sum=low, max_sum=high), weighted=True)
+    for s, _ in counters["sums"].most_common(5):
+        pool.fill(ticket_solver.TicketSpec(min_sum=s, max_sum=s))
+    return pool
+
+@analysis.component("snapshot", deps=["dataset_version", "frequency", "ml_baseline", "patterns", "timeseries", "cooccurrence", "phase1", "integrated", "counters"])
+def build_dashboard_snapshot(version, frequency, ml_predictions, pattern_stats, time_series_data, cooccurrence, phase1_recommendations, integrated_recommendation, counters):
+    return snapshot.build_snapshot(version, read_last_update(), {
+        "frequency": frequency,
+        "ml": ml_predictions,
+        "patterns": pattern_stats,
+        "timeseries": time_series_data,
+        "cooccurrence": cooccurrence["pairs"],
+        "phase1": phase1_recommendations,
+        "integrated": {"integrated_recommendation": integrated_recommendation},
+        "sum_based": summarize_sum_ranges(counters["sums"]),
+    })
+
+@analysis.component("encoded_responses", deps=["responses", "dataset_version", "snapshot", "frequency", "patterns", "timeseries", "cooccurrence", "randomness_battery"])
+def build_encoded_responses(responses, version, dashboard_snapshot, frequency, pattern_stats, time_series_data, cooccurrence, randomness_battery):
+    """Pre-encodes the parameterless responses in every representation."""
+    payloads = {
+        "/api/snapshot": dashboard_snapshot,
+        "/api/analysis/frequency": frequency,
+        "/api/analysis/patterns": pattern_stats,
+        "/api/analysis/timeseries": time_series_data,
+        "/api/analysis/cooccurrence": cooccurrence["pairs"],
+        "/api/analysis/randomness": {"dataset_version": version, **randomness_battery},
+    }
+    for path, payload in payloads.items():
+        responses.preencode(path, payload)
+    return responses.stats()
+
+def client_id(request: Request):
+    """Client key for per-client issued-ticket tracking (LOTTO_ISSUED_SCOPE=client)."""
+    return request.headers.get("x-client-id") or (request.client.host if request.client else None)
+
+def get_component(name):
+    if not len(draw_table):
+        raise HTTPException(status_code=503, detail="데이터가 아직 준비되지 않았습니다.")
+    return analysis.get(name)
+
+async def respond_encoded(request: Request, payload_factory):
+    """
+    Negotiated response (JSON / columnar JSON / MessagePack, br / gzip) for a
+    deterministic analysis payload, encoded once per dataset version and query.
+    payload_factory runs in the threadpool, and only for a variant not encoded yet.
+    """
+    key = request.url.path
+    if request.query_params:
+        key += "?" + urlencode(sorted(request.query_params.multi_items()))
+    return await encoded_responses.respond(request, key, payload_factory)
+
+def parse_query_date(name: str, value: Optional[str]) -> Optional[str]:
+    """Normalizes a YYYY-MM-DD query parameter; anything else is a 400, not an empty result."""
+    if value is None:
+        return None
+    try:
+        return datetime.strptime(value, "%Y-%m-%d").strftime("%Y-%m-%d")
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"{name}는 YYYY-MM-DD 형식이어야 합니다: {value}")
+
+def resolve_draw_window(from_draw: Optional[int], to_draw: Optional[int], since: Optional[str]):
+    """
+    Returns (lo, hi) draw positions for range-restricted analysis, or None when
+    no range parameter was given and the full-history component applies.
+    """
+    if from_draw is None and to_draw is None and since is None:
+        return None
+    since = parse_query_date("since", since)
+    window = get_component("prefix_sums").resolve(from_draw=from_draw, to_draw=to_draw, since=since)
+    if window is None:
+        raise HTTPException(status_code=404, detail="해당 범위에 회차가 없습니다.")
+    return window
 
 # --- API Endpoints ---
 
 @app.get("/api/last-update")
 async def get_last_update():
-    try:
-        last_modified_timestamp = os.path.getmtime(LOTTO_HISTORY_FILE)
-        last_modified_date = datetime.fromtimestamp(last_modified_timestamp).strftime('%Y-%m-%d %H:%M:%S')
-        return {"last_update": last_modified_date}
-    except FileNotFoundError:
-        return {"last_update": "N/A"}
+    return {"last_update": read_last_update()}
+
+@app.get("/api/ingest/report")
+async def get_ingest_report():
+    if ingest_report is None:
+        raise HTTPException(status_code=503, detail="데이터가 아직 준비되지 않았습니다.")
+    return {"dataset_version": dataset_version, **ingest_report}
+
+@app.get("/api/snapshot")
+async def get_dashboard_snapshot(request: Request):
+    return await respond_encoded(request, lambda: get_component("snapshot"))
+
+@app.get("/api/snapshot/version")
+async def get_dashboard_snapshot_version():
+    return {"dataset_version": dataset_version}
 
 @app.get("/api/analysis/frequency")
-async def get_frequency_analysis():
-    return {
-        "hotNumbers": hot_numbers,
-        "coldNumbers": cold_numbers,
-        "hotBonusNumbers": hot_bonus_numbers,
-        "coldBonusNumbers": cold_bonus_numbers
-    }
+async def get_frequency_analysis(
+    request: Request,
+    from_draw: Optional[int] = Query(None),
+    to_draw: Optional[int] = Query(None),
+    since: Optional[str] = Query(None, description="YYYY-MM-DD"),
+):
+    window = resolve_draw_window(from_draw, to_draw, since)
+    if window:
+        return await respond_encoded(request, lambda: analysis.get("prefix_sums").frequency(*window))
+    return await respond_encoded(request, lambda: get_component("frequency"))
 
 @app.get("/api/analysis/patterns")
-async def get_pattern_analysis():
-    return pattern_stats
+async def get_pattern_analysis(
+    request: Request,
+    from_draw: Optional[int] = Query(None),
+    to_draw: Optional[int] = Query(None),
+    since: Optional[str] = Query(None, description="YYYY-MM-DD"),
+):
+    window = resolve_draw_window(from_draw, to_draw, since)
+    if window:
+        return await respond_encoded(request, lambda: {
+            **analysis.get("prefix_sums").patterns(*window),
+            "features": analysis.get("pattern_histograms").summarize(*window, top=patterns.TOP_PATTERNS),
+        })
+    return await respond_encoded(request, lambda: get_component("patterns"))
+
+@app.get("/api/analysis/patterns/score")
+async def score_ticket_patterns(numbers: List[int] = Query(...)):
+    """Feature values of a ticket and how common each value is in the history."""
+    if len(set(numbers)) != 6 or any(not 1 <= num <= 45 for num in numbers):
+        raise HTTPException(status_code=400, detail="1에서 45 사이의 서로 다른 번호 6개가 필요합니다.")
+    history = get_component("pattern_features")
+    ticket = sorted(set(numbers))
+    values = patterns.FEATURES.evaluate([ticket])
+    shares, typicality = patterns.FEATURES.historical_shares([ticket], history)
+    return {
+        "numbers": ticket,
+        "features": {
+            name: {"value": column[0].tolist(), **({"historical_share": round(float(shares[name][0]), 4)} if name in shares else {})}
+            for name, column in values.items()
+        },
+        "typicality": round(float(typicality[0]), 4),
+    }
 
 @app.get("/api/analysis/timeseries")
-async def get_timeseries_analysis():
-    return time_series_data
+async def get_timeseries_analysis(
+    request: Request,
+    from_draw: Optional[int] = Query(None),
+    to_draw: Optional[int] = Query(None),
+    since: Optional[str] = Query(None, description="YYYY-MM-DD"),
+):
+    window = resolve_draw_window(from_draw, to_draw, since)
+    if window:
+        return await respond_encoded(request, lambda: analysis.get("prefix_sums").timeseries(*window))
+    return await respond_encoded(request, lambda: get_component("timeseries"))
 
 @app.get("/api/recommendations/ml")
 async def get_ml_predictions():
-    return ml_predictions
+    ml_predictions = get_component("ml_baseline")
+    model = ml_model.current_model(dataset_version)
+    if model is None:
+        return {**ml_predictions, "model_status": ml_model.status()}
+    return {**ml_predictions, **ml_model.summarize(model), "model_status": "ready"}
 
 @app.get("/api/analysis/cooccurrence")
-async def get_cooccurrence_analysis():
-    return co_occurrence_data
+async def get_cooccurrence_analysis(
+    request: Request,
+    number: Optional[int] = Query(None, ge=1, le=45),
+    from_draw: Optional[int] = Query(None),
+    to_draw: Optional[int] = Query(None),
+    since: Optional[str] = Query(None, description="YYYY-MM-DD"),
+):
+    window = resolve_draw_window(from_draw, to_draw, since)
+
+    def build():
+        if number is None:
+            return analysis.get("prefix_sums").cooccurrence(*window) if window else get_component("cooccurrence")["pairs"]
+        if window:
+            partners = Counter(analysis.get("prefix_sums").partner_counts(*window, number))
+        else:
+            partners = Counter(get_component("draw_index").partner_counts(number))
+        return [{"pair": f"{min(number, other)} - {max(number, other)}", "count": c} for other, c in partners.most_common(20)]
+
+    return await respond_encoded(request, build)
 
 @app.get("/api/recommendations/phase1")
 async def get_phase1_recommendations():
-    return phase1_recommendations
+    return get_component("phase1")
 
 @app.get("/api/recommendations/integrated")
 async def get_integrated_recommendation():
-    return {"integrated_recommendation": integrated_recommendation}
+    return {"integrated_recommendation": get_component("integrated")}
 
 @app.get("/api/recommendations/sum-based")
-async def get_sum_based_recommendations():
-    # Re-generate fixed recommendations on each call
-    fixed_recs = {
-        "low_sum": {"range": "60-90", "recommendation": generate_combination_in_sum_range(60, 90)},
-        "medium_sum": {"range": "120-150", "recommendation": generate_combination_in_sum_range(120, 150)},
-        "high_sum": {"range": "180-210", "recommendation": generate_combination_in_sum_range(180, 210)}
-    }
-    
-    # Re-generate top 5 frequent sums recommendations on each call
-    top_5_recs = [{"sum": s, "count": c, "recommendation": generate_combination_for_sum_simple(s)} for s, c in sums_counter.most_common(5)]
-
-    return {
-        "top_5_frequent_sums": top_5_recs,
-        "fixed_sum_recommendations": fixed_recs
-    }
+async def get_sum_based_recommendations(request: Request):
+    # Re-generate fixed and top 5 frequent sums recommendations on each call
+    sums_counter = get_component("counters")["sums"]
+    return await run_in_threadpool(profiling.bind(generate_sum_based_recommendations), sums_counter, client_id(request))
 
 @app.get("/api/recommendations/sum-range")
-async def get_sum_range_recommendation(min_sum: int = Query(100), max_sum: int = Query(150)):
-    recommendation = generate_combination_in_sum_range(min_sum, max_sum)
+async def get_sum_range_recommendation(request: Request, min_sum: int = Query(100), max_sum: int = Query(150)):
+    recommendation = await run_in_threadpool(profiling.bind(generate_combination_in_sum_range), min_sum, max_sum, client_id(request))
     return {"recommendation": recommendation}
 
+@app.get("/api/recommendations/constrained")
+async def get_constrained_recommendations(
+    request: Request,
+    min_sum: Optional[int] = Query(None),
+    max_sum: Optional[int] = Query(None),
+    min_odd: Optional[int] = Query(None, ge=0, le=6),
+    max_odd: Optional[int] = Query(None, ge=0, le=6),
+    min_low: Optional[int] = Query(None, ge=0, le=6),
+    max_low: Optional[int] = Query(None, ge=0, le=6),
+    include: Optional[List[int]] = Query(None),
+    exclude: Optional[List[int]] = Query(None),
+    no_consecutive: bool = Query(False),
+    min_span: Optional[int] = Query(None, ge=0, le=44),
+    max_span: Optional[int] = Query(None, ge=0, le=44),
+    count: int = Query(5, ge=1, le=20),
+    weighted: bool = Query(False, description="Weight numbers by historical frequency"),
+):
+    """
+    Tickets meeting every given constraint (low = 1-22), sampled uniformly or
+    frequency-weighted among all qualifying combinations, whose exact number is
+    reported as feasible_count. Past winning and already issued tickets are
+    never returned, so fewer than `count` tickets may come back.
+    """
+    try:
+        spec = ticket_solver.TicketSpec.from_ranges(
+            min_odd=min_odd, max_odd=max_odd, min_low=min_low, max_low=max_low,
+            min_sum=min_sum, max_sum=max_sum, include=include or (), exclude=exclude or (),
+            no_consecutive=no_consecutive, min_span=min_span, max_span=max_span,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    def solve():
+        with profiling.section("solver.count"):
+            feasible = ticket_solver_instance.count(spec)
+        tickets = generate_constrained(spec, count, weighted=weighted, client=client_id(request)) if feasible else []
+        features = patterns.FEATURES.evaluate(tickets, ["sum", "odd_count", "low_count", "max_run", "span"]) if tickets else {}
+        return {
+            "spec": spec.to_dict(),
+            "feasible_count": feasible,
+            "sampling": "weighted" if weighted else "uniform",
+            "tickets": [
+                {"numbers": ticket, **{name: int(values[i]) for name, values in features.items()}}
+                for i, ticket in enumerate(tickets)
+            ],
+        }
+
+    return await run_in_threadpool(profiling.bind(solve))
+
 @app.get("/api/recommendations/hit-rate")
 async def get_hit_rate(numbers: List[int] = Query(...)):
-    if not all_winning_numbers:
+    if not len(draw_table):
         return {"hit_rate": 0}
 
-    hit_count = 0
-    for winning_numbers in all_winning_numbers:
-        if set(numbers).issubset(set(winning_numbers)):
-            hit_count += 1
-
-    hit_rate = (hit_count / len(all_winning_numbers)) * 100
+    draw_index = analysis.get("draw_index")
+    with profiling.section("hit_rate.count"):
+        hit_count = draw_index.count(numbers)
+    hit_rate = (hit_count / draw_index.size) * 100
     return {"hit_rate": round(hit_rate, 2)}
 
+@app.get("/api/query/draws")
+async def query_draws(
+    request: Request,
+    date_from: Optional[str] = Query(None, description="YYYY-MM-DD"),
+    date_to: Optional[str] = Query(None, description="YYYY-MM-DD"),
+    draw_from: Optional[int] = Query(None),
+    draw_to: Optional[int] = Query(None),
+    sum_min: Optional[int] = Query(None),
+    sum_max: Optional[int] = Query(None),
+    odd_count: Optional[int] = Query(None, ge=0, le=6),
+    low_count: Optional[int] = Query(None, ge=0, le=6),
+    contains: Optional[List[int]] = Query(None),
+    sort_by: str = Query("draw_no"),
+    order: str = Query("desc"),
+    limit: int = Query(50, ge=1, le=1000),
+    offset: int = Query(0, ge=0),
+):
+    date_from = parse_query_date("date_from", date_from)
+    date_to = parse_query_date("date_to", date_to)
+    get_component("storage_export")
+
+    def build():
+        try:
+            result = storage.query_draws(
+                date_from=date_from, date_to=date_to,
+                draw_from=draw_from, draw_to=draw_to,
+                sum_min=sum_min, sum_max=sum_max,
+                odd_count=odd_count, low_count=low_count,
+                contains=contains,
+                sort_by=sort_by, order=order,
+                limit=limit, offset=offset,
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        except FileNotFoundError:
+            raise HTTPException(status_code=503, detail="데이터베이스가 아직 준비되지 않았습니다.")
+        return {"dataset_version": dataset_version, "limit": limit, "offset": offset, **result}
+
+    return await respond_encoded(request, build)
+
+@app.get("/api/analysis/transitions")
+async def get_transitions_analysis(
+    request: Request,
+    lag: int = Query(1, ge=1, le=transitions.MAX_LAG),
+    number: Optional[int] = Query(None, ge=1, le=45),
+    top: int = Query(20, ge=1, le=200),
+):
+    transition_analysis = get_component("transitions")
+    if lag not in transition_analysis.counts:
+        raise HTTPException(status_code=404, detail="해당 간격의 전이 데이터가 없습니다.")
+
+    def build():
+        result = {
+            "dataset_version": dataset_version,
+            "lag": lag,
+            "carry_over": [transition_analysis.carry_over_stats(k) for k in sorted(transition_analysis.counts)],
+            "top_transitions": transition_analysis.top_transitions(lag, top),
+        }
+        if number is not None:
+            result["next_given"] = {"number": number, "candidates": transition_analysis.next_given(number, lag)[:top]}
+        return result
+
+    return await respond_encoded(request, build)
+
+@app.get("/api/recommendations/transition")
+async def get_transition_recommendation(
+    lags: List[int] = Query([1]),
+    given: Optional[List[int]] = Query(None),
+):
+    if any(not 1 <= lag <= transitions.MAX_LAG for lag in lags):
+        raise HTTPException(status_code=400, detail=f"lag는 1에서 {transitions.MAX_LAG} 사이여야 합니다.")
+    if given and any(not 1 <= num <= 45 for num in given):
+        raise HTTPException(status_code=400, detail="번호는 1에서 45 사이여야 합니다.")
+    return get_component("transitions").recommend(given=given, lags=lags, pick=analysis.get("history_filter").first_allowed)
+
+@app.get("/api/analysis/randomness")
+async def get_randomness_analysis(
+    request: Request,
+    window: int = Query(randomness.DEFAULT_WINDOW, ge=randomness.MIN_WINDOW),
+    step: int = Query(randomness.DEFAULT_STEP, ge=1),
+):
+    if window == randomness.DEFAULT_WINDOW and step == randomness.DEFAULT_STEP:
+        return await respond_encoded(request, lambda: {"dataset_version": dataset_version, **get_component("randomness_battery")})
+    randomness_tests = get_component("randomness")
+    if len(randomness_tests.window_starts(window, step)) > randomness.MAX_WINDOWS:
+        raise HTTPException(status_code=400, detail=f"구간은 최대 {randomness.MAX_WINDOWS}개까지 계산할 수 있습니다. step을 늘려 주세요.")
+    return await respond_encoded(request, lambda: {"dataset_version": dataset_version, **randomness_tests.battery(window, step)})
+
+@app.get("/api/query/contains")
+async def query_draws_containing(
+    numbers: List[int] = Query(...),
+    bonus: Optional[int] = Query(None, ge=1, le=45),
+    include_bonus: bool = Query(False),
+    limit: int = Query(100, ge=0, le=5000),
+):
+    result = get_component("draw_index").query(numbers, bonus=bonus, include_bonus=include_bonus, limit=limit)
+    return {"numbers": sorted(set(numbers)), **result}
+
+@app.get("/healthz")
+async def healthz():
+    return {"status": "ok"}
+
+@app.get("/readyz")
+async def readyz():
+    body = {
+        "status": "ready" if len(draw_table) else "loading",
+        "dataset_version": dataset_version,
+        "draws": len(draw_table),
+        "components": analysis.status(),
+        "model_status": ml_model.status(),
+        "encoded_responses": encoded_responses.stats(),
+        "issued_tickets": issued_tickets.stats(),
+        "history_filter": analysis.get("history_filter").stats() if len(draw_table) else None,
+        "freshness": refresh_scheduler.freshness(),
+    }
+    return JSONResponse(body, status_code=200 if len(draw_table) else 503)
+
+def require_admin(request: Request):
+    token = request.headers.get("x-admin-token", "")
+    if not ADMIN_TOKEN or not secrets.compare_digest(token, ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="권한이 없습니다.")
+
+@app.post("/api/admin/reload")
+async def reload_data(request: Request):
+    """Re-ingests the CSV (e.g. after update_lotto_data.py appended draws) without a restart."""
+    require_admin(request)
+    report = await run_in_threadpool(profiling.bind(refresh_data))
+    return {**report, "draws": len(draw_table)}
+
+@app.post("/api/admin/refresh")
+async def poll_draws(request: Request):
+    """Polls the results source right away and publishes any new draws (as the scheduler does after a draw)."""
+    require_admin(request)
+    result = await run_in_threadpool(profiling.bind(refresh_scheduler.poll_once))
+    return {**result, "freshness": refresh_scheduler.freshness()}
+
+@app.get("/api/refresh/status")
+async def get_refresh_status():
+    """Draw schedule, polling state, draw-to-dashboard freshness and the stage timings of the last refresh."""
+    return {"dataset_version": dataset_version, "last_refresh": last_refresh, "scheduler": refresh_scheduler.status()}
+
+@app.get("/api/debug/profiling")
+async def get_profiling_status(request: Request):
+    require_admin(request)
+    return {
+        "settings": profiling.settings(),
+        "sections": profiling.section_stats(),
+        "slow_requests": profiling.slow_profiles(),
+    }
+
+@app.post("/api/debug/profiling")
+async def configure_profiling(
+    request: Request,
+    enabled: Optional[bool] = Query(None),
+    sample_rate: Optional[float] = Query(None, ge=0, le=1),
+    slow_ms: Optional[float] = Query(None, ge=0),
+    clear: bool = Query(False),
+):
+    """Switches profiling on/off and tunes it at runtime; `clear` drops recorded profiles and section totals."""
+    require_admin(request)
+    if clear:
+        profiling.clear()
+    return profiling.configure(enabled=enabled, sample_rate=sample_rate, slow_ms=slow_ms)
+
+@app.get("/api/debug/profiles/{profile_id}/flamegraph")
+async def get_profile_flamegraph(request: Request, profile_id: str):
+    """Folded stacks of one slow request, or of every kept one with profile_id=all (flamegraph.pl/speedscope input)."""
+    require_admin(request)
+    if profile_id == "all":
+        profiles = profiling.all_profiles()
+    else:
+        profile = profiling.find_profile(int(profile_id)) if profile_id.isdigit() else None
+        if profile is None:
+            raise HTTPException(status_code=404, detail="프로파일을 찾을 수 없습니다.")
+        profiles = [profile]
+    return PlainTextResponse(profiling.folded(profiles))
+
+# Components built by their own refresh stage; "rebuild" builds every other one.
+STAGED_COMPONENTS = {"tickets": ["ticket_pool"], "preencode": ["snapshot", "encoded_responses"]}
+
+def refresh_data():
+    """
+    Ingests the CSV and publishes a changed dataset, timing each stage. The first
+    load is published right away and warmed in the background. A new version
+    replacing served data is built off to the side while requests keep getting
+    the current one: analyses (rebuild), ticket pools (tickets), the snapshot
+    and encoded responses (preencode) and the model, and is then swapped in at
+    once (publish), so it goes live with warm caches. The frontend is asked to
+    revalidate only when published data replaces an earlier version, not on the
+    first load of a process. Returns the stage report.
+    """
+    global last_refresh
+    with _refresh_lock:
+        timer = refresh.StageTimer()
+        previous_version = dataset_version
+        with timer.stage("ingest"):
+            loaded = ingest_data()
+        if loaded is None or loaded[1] == previous_version:
+            return timer.report(previous_version, previous_version)
+
+        table, version = loaded
+        if not len(draw_table) or not WARMUP_ON_STARTUP:
+            with timer.stage("publish"):
+                publish_data(table, version)
+            if WARMUP_ON_STARTUP:
+                analysis.warm_async()
+            ml_model.ensure_model_async(version, table)
+        else:
+            staged, responses = stage_data(table, version)
+            later = {name for names in STAGED_COMPONENTS.values() for name in names}
+            with timer.stage("rebuild"):
+                staged.warm([name for name in staged.names if name not in later])
+            for stage, names in STAGED_COMPONENTS.items():
+                with timer.stage(stage):
+                    staged.warm(names)
+            with timer.stage("model"):
+                ml_model.ensure_model(version, table)
+            with timer.stage("publish"):
+                publish_data(table, version, staged, responses)
+        if previous_version is not None:
+            snapshot.notify_frontend(version)
+        last_refresh = timer.report(previous_version, version)
+        print(f"Published dataset {version} ({len(table)} draws): {last_refresh['stages']}")
+        return last_refresh
+
+def published_draw():
+    """(draw number, date) of the last published draw; (0, None) before the first load."""
+    table = draw_table
+    return (table.last_draw, table.draw_dates[-1]) if len(table) else (0, None)
+
+refresh_scheduler = refresh.RefreshScheduler(LOTTO_HISTORY_FILE, latest=published_draw, publish=refresh_data)
+
 @app.on_event("startup")
 async def startup_event():
-    load_and_analyze_data()
+    refresh_data()
+    if refresh.SCHEDULER_ENABLED:
+        refresh_scheduler.start()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    refresh_scheduler.stop()
 
 if __name__ == "__main__":
     port = int(os.environ.get("PORT", 8000))
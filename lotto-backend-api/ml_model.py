@@ -0,0 +1,301 @@
+"""
+CPU-only prediction model behind /api/recommendations/ml.
+
+Each (draw t, number n) sample asks "does n appear in draw t+1?" using only what
+was known after draw t: rolling frequencies, gap since last appearance, pair
+affinity with draw t and lag-1 transition strength from draw t. A small L2
+logistic regression is fitted with Newton steps. Held-out log-loss comes from
+walk-forward folds trained in a process pool, and the out-of-fold scores also
+fit a Platt calibration. The fitted artifact is persisted with its dataset
+version, so a restart just loads it. When new draws arrive the model is scored
+on them first (true out-of-sample) and then warm-started on the full history.
+"""
+import os
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import profiling
+
+MODEL_FILE = os.environ.get("LOTTO_MODEL_FILE", "lotto_model.npz")
+MODEL_WORKERS = int(os.environ.get("LOTTO_ML_WORKERS", os.cpu_count() or 1))
+
+FEATURE_NAMES = [
+    "freq_10", "freq_30", "freq_100", "freq_all",
+    "log_gap", "in_last_draw", "pair_affinity", "transition",
+]
+ROLLING_WINDOWS = (10, 30, 100)
+BASE_RATE = 6 / 45
+L2 = 1.0
+WALK_FORWARD_FOLDS = 5
+MIN_TRAIN_DRAWS = 30
+
+_feature_cache = {}
+_model = None
+_status = "idle"
+_lock = threading.Lock()
+
+
+# --- Features ---
+def build_features(table):
+    """
+    Returns (features, labels, next_features):
+    features (N-1, 45, F) for draws 0..N-2, labels (N-1, 45) = appearance in the
+    following draw, next_features (45, F) describing the state after the latest draw.
+    """
+    n = len(table)
+    draw_numbers = table.draw_numbers
+    x = table.onehot(np.float64)[:, 1:]  # (n, 45), column j is number j + 1
+
+    seen = np.arange(1, n + 1, dtype=np.float64)[:, None]  # draws observed up to and including t
+    cum = np.cumsum(x, axis=0)
+    cum_pad = np.vstack([np.zeros((1, 45)), cum])
+
+    columns = []
+    for window in ROLLING_WINDOWS:
+        start = np.maximum(np.arange(n) + 1 - window, 0)
+        columns.append((cum - cum_pad[start]) / np.minimum(seen, window))
+    columns.append(cum / seen)
+
+    positions = np.where(x > 0, np.arange(n)[:, None], -1)
+    last_pos = np.maximum.accumulate(positions, axis=0)
+    gap = np.where(last_pos >= 0, np.arange(n)[:, None] - last_pos, seen)
+    columns.append(np.log1p(gap))
+    columns.append(x)
+
+    # Pair affinity: mean over numbers i in draw t of P(n drawn | i drawn) up to t.
+    cum_pairs = np.cumsum(x[:, :, None] * x[:, None, :], axis=0)
+    cooccur_rate = np.divide(cum_pairs, cum[:, :, None], out=np.zeros_like(cum_pairs), where=cum[:, :, None] > 0)
+    columns.append(np.einsum("ti,tij->tj", x, cooccur_rate) / 6)
+
+    # Transition: mean over i in draw t of P(n in next draw | i in this draw), from pairs before t.
+    consecutive = np.zeros(n)
+    consecutive[1:] = (np.diff(draw_numbers) == 1)
+    steps = x[:-1, :, None] * x[1:, None, :] * consecutive[1:, None, None]
+    cum_steps = np.zeros((n, 45, 45))
+    cum_steps[1:] = np.cumsum(steps, axis=0)
+    origins = np.zeros((n, 45))
+    origins[1:] = np.cumsum(x[:-1] * consecutive[1:, None], axis=0)
+    transition_rate = np.divide(cum_steps, origins[:, :, None], out=np.zeros_like(cum_steps), where=origins[:, :, None] > 0)
+    columns.append(np.einsum("ti,tij->tj", x, transition_rate) / 6)
+
+    all_features = np.stack(columns, axis=-1)  # (n, 45, F)
+    return all_features[:-1], x[1:], all_features[-1]
+
+
+def get_features(dataset_version, table):
+    cached = _feature_cache.get(dataset_version)
+    if cached is None:
+        cached = build_features(table)
+        _feature_cache.clear()
+        _feature_cache[dataset_version] = cached
+    return cached
+
+
+# --- Logistic regression ---
+def _sigmoid(z):
+    return 1.0 / (1.0 + np.exp(-z))
+
+
+def _design(features, mean, std):
+    flat = features.reshape(-1, features.shape[-1])
+    return np.hstack([np.ones((flat.shape[0], 1)), (flat - mean) / std])
+
+
+def fit_logistic(x, y, weights=None, iterations=25, l2=L2, tol=1e-8):
+    """Newton-Raphson for L2-regularized logistic regression (bias is not penalized)."""
+    weights = np.zeros(x.shape[1]) if weights is None else weights.copy()
+    penalty = np.full(x.shape[1], l2)
+    penalty[0] = 0.0
+    for _ in range(iterations):
+        p = _sigmoid(x @ weights)
+        gradient = x.T @ (p - y) + penalty * weights
+        hessian = (x * (p * (1 - p))[:, None]).T @ x + np.diag(penalty) + 1e-9 * np.eye(x.shape[1])
+        step = np.linalg.solve(hessian, gradient)
+        weights -= step
+        if np.abs(step).max() < tol:
+            break
+    return weights
+
+
+def log_loss(y, p):
+    p = np.clip(p, 1e-12, 1 - 1e-12)
+    return float(-np.mean(y * np.log(p) + (1 - y) * np.log(1 - p)))
+
+
+def _train_fold(args):
+    features, labels, train_end, test_end = args
+    train_x = features[:train_end].reshape(-1, features.shape[-1])
+    mean, std = train_x.mean(axis=0), train_x.std(axis=0) + 1e-9
+    weights = fit_logistic(_design(features[:train_end], mean, std), labels[:train_end].ravel())
+    return _design(features[train_end:test_end], mean, std) @ weights
+
+
+def walk_forward(features, labels, folds=WALK_FORWARD_FOLDS, workers=MODEL_WORKERS):
+    """Out-of-fold logits and labels from expanding-window folds trained in parallel."""
+    n = len(features)
+    if n <= MIN_TRAIN_DRAWS + folds:
+        return np.empty(0), np.empty(0)
+    bounds = np.linspace(max(MIN_TRAIN_DRAWS, n // 2), n, folds + 1).astype(int)
+    tasks = [(features, labels, int(start), int(end)) for start, end in zip(bounds[:-1], bounds[1:]) if end > start]
+    if workers > 1 and len(tasks) > 1:
+        # spawn: training runs on a background thread, and forking a threaded process is unsafe.
+        with ProcessPoolExecutor(max_workers=min(workers, len(tasks)), mp_context=multiprocessing.get_context("spawn")) as pool:
+            logits = list(pool.map(_train_fold, tasks))
+    else:
+        logits = [_train_fold(task) for task in tasks]
+    return np.concatenate(logits), labels[bounds[0]:bounds[-1]].ravel()
+
+
+def fit_calibration(logits, y):
+    """Platt scaling (a, b) so that sigmoid(a * logit + b) is calibrated on held-out scores."""
+    if not len(logits):
+        return np.array([1.0, 0.0])
+    a, b = fit_logistic(np.column_stack([np.ones_like(logits), logits]), y, l2=1e-6)[::-1]
+    return np.array([a, b])
+
+
+# --- Artifact ---
+def save_model(model, path=MODEL_FILE):
+    tmp_path = f"{path}.tmp.npz"
+    np.savez(tmp_path, **{key: np.asarray(value) for key, value in model.items()})
+    os.replace(tmp_path, path)
+
+
+def load_model(path=MODEL_FILE):
+    if not os.path.exists(path):
+        return None
+    with np.load(path, allow_pickle=False) as data:
+        model = {key: data[key] for key in data.files}
+    model["dataset_version"] = str(model["dataset_version"])
+    for key in ("trained_through", "n_samples", "n_heldout"):
+        model[key] = int(model[key])
+    for key in ("log_loss", "calibrated_log_loss", "baseline_log_loss"):
+        model[key] = float(model[key])
+    return model
+
+
+def train(dataset_version, table, previous=None):
+    """
+    Fits a model for this dataset version. With a previous artifact, the new
+    draws are scored out-of-sample before the warm-started refit.
+    """
+    features, labels, next_features = get_features(dataset_version, table)
+    last_draw = table.last_draw
+    flat_x = features.reshape(-1, features.shape[-1])
+    mean, std = flat_x.mean(axis=0), flat_x.std(axis=0) + 1e-9
+    full_x, full_y = _design(features, mean, std), labels.ravel()
+
+    draw_numbers = table.draw_numbers[:-1]
+    new_rows = draw_numbers >= previous["trained_through"] if previous is not None else None
+
+    if previous is not None and new_rows.any() and new_rows.sum() < len(new_rows):
+        old_x = _design(features[new_rows], previous["mean"], previous["std"])
+        new_y = labels[new_rows].ravel()
+        raw = _sigmoid(old_x @ previous["weights"])
+        calibrated = _sigmoid(previous["calibration"][0] * (old_x @ previous["weights"]) + previous["calibration"][1])
+        n_old, n_new = previous["n_heldout"], len(new_y)
+        total = n_old + n_new
+
+        def blend(old_value, new_value):
+            return (old_value * n_old + new_value * n_new) / total
+
+        weights = fit_logistic(full_x, full_y, weights=previous["weights"], iterations=5)
+        log_loss_value = blend(previous["log_loss"], log_loss(new_y, raw))
+        calibrated_value = blend(previous["calibrated_log_loss"], log_loss(new_y, calibrated))
+        baseline_value = blend(previous["baseline_log_loss"], log_loss(new_y, np.full_like(new_y, BASE_RATE)))
+        calibration, n_heldout = previous["calibration"], total
+    else:
+        oof_logits, oof_y = walk_forward(features, labels)
+        weights = fit_logistic(full_x, full_y)
+        calibration = fit_calibration(oof_logits, oof_y)
+        n_heldout = len(oof_y)
+        log_loss_value = log_loss(oof_y, _sigmoid(oof_logits)) if n_heldout else float("nan")
+        calibrated_value = log_loss(oof_y, _sigmoid(calibration[0] * oof_logits + calibration[1])) if n_heldout else float("nan")
+        baseline_value = log_loss(oof_y, np.full_like(oof_y, BASE_RATE)) if n_heldout else float("nan")
+
+    model = {
+        "dataset_version": dataset_version,
+        "trained_through": last_draw,
+        "weights": weights,
+        "mean": mean,
+        "std": std,
+        "calibration": calibration,
+        "n_samples": len(full_y),
+        "n_heldout": n_heldout,
+        "log_loss": log_loss_value,
+        "calibrated_log_loss": calibrated_value,
+        "baseline_log_loss": baseline_value,
+    }
+    model["next_probabilities"] = predict_proba(model, next_features)
+    return model
+
+
+def predict_proba(model, features):
+    """Calibrated per-number probabilities for a (45, F) feature block."""
+    logits = _design(features, model["mean"], model["std"]) @ model["weights"]
+    a, b = model["calibration"]
+    return _sigmoid(a * logits + b)
+
+
+# --- Lifecycle ---
+def ensure_model(dataset_version, table):
+    """Loads the persisted artifact for this version, or (re)trains and persists it."""
+    global _model, _status
+    with _lock:
+        if _model is not None and _model["dataset_version"] == dataset_version:
+            return _model
+        _status = "loading"
+        try:
+            previous = _model or load_model()
+            if previous is not None and previous["dataset_version"] == dataset_version:
+                _, _, next_features = get_features(dataset_version, table)
+                previous["next_probabilities"] = predict_proba(previous, next_features)
+                _model = previous
+            else:
+                _status = "training"
+                with profiling.section("ml.train"):
+                    _model = train(dataset_version, table, previous=previous)
+                save_model({key: value for key, value in _model.items() if key != "next_probabilities"})
+            _status = "ready"
+        except Exception as e:
+            _status = "failed"
+            print(f"CRITICAL: Failed to load or train the prediction model. Error: {e}")
+        return _model
+
+
+def ensure_model_async(dataset_version, table):
+    thread = threading.Thread(target=ensure_model, args=(dataset_version, table), daemon=True)
+    thread.start()
+    return thread
+
+
+def current_model(dataset_version):
+    if _model is not None and _model["dataset_version"] == dataset_version:
+        return _model
+    return None
+
+
+def status():
+    return _status
+
+
+def summarize(model, top=6):
+    probabilities = model["next_probabilities"]
+    order = np.argsort(-probabilities, kind="stable")
+    return {
+        "model_prediction": sorted(int(idx) + 1 for idx in order[:top]),
+        "probabilities": {int(idx) + 1: round(float(probabilities[idx]), 5) for idx in range(45)},
+        "metrics": {
+            "heldout_log_loss": round(model["log_loss"], 5),
+            "heldout_calibrated_log_loss": round(model["calibrated_log_loss"], 5),
+            "baseline_log_loss": round(model["baseline_log_loss"], 5),
+            "heldout_samples": model["n_heldout"],
+            "training_samples": model["n_samples"],
+        },
+        "features": FEATURE_NAMES,
+        "trained_through": model["trained_through"],
+        "dataset_version": model["dataset_version"],
+    }
@@ -0,0 +1,195 @@
+"""
+Declarative pattern features over 6-number tickets.
+
+A feature is a function registered on a PatternEngine that maps a
+FeatureContext (an (N, 6) matrix of sorted tickets plus lazily cached shared
+arrays such as the pairwise differences or the (N, 46) membership mask) to one
+value per ticket: an int array of shape (N,) for scalar features, or (N, k)
+counts for distribution features registered with `labels`. Every feature is
+vectorized over all rows, so evaluating the whole registry over the history is
+a handful of numpy operations per feature, and the same call scores candidate
+tickets in the generators.
+
+Adding a pattern is one registration:
+
+    @FEATURES.feature("sum_digit", description="합계의 끝자리")
+    def sum_digit(ctx):
+        return ctx.numbers.sum(axis=1) % 10
+"""
+from collections import Counter
+from functools import cached_property
+
+import numpy as np
+
+LOW_MAX = 22
+BANDS = [(1, 10), (11, 20), (21, 30), (31, 40), (41, 45)]
+PRIMES = [2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37, 41, 43]
+TOP_PATTERNS = 10
+
+
+class FeatureContext:
+    """Sorted (N, 6) tickets with shared intermediate arrays computed on first use."""
+
+    def __init__(self, numbers):
+        numbers = np.asarray(numbers, dtype=np.int64).reshape(-1, 6)
+        self.numbers = np.sort(numbers, axis=1)
+
+    def __len__(self):
+        return len(self.numbers)
+
+    @cached_property
+    def gaps(self):
+        """(N, 5) differences between neighbouring numbers."""
+        return np.diff(self.numbers, axis=1)
+
+    @cached_property
+    def pair_differences(self):
+        """(N, 15) differences of every pair i < j."""
+        i, j = np.triu_indices(6, k=1)
+        return self.numbers[:, j] - self.numbers[:, i]
+
+    @cached_property
+    def mask(self):
+        """(N, 46) membership mask; column 0 is unused."""
+        mask = np.zeros((len(self.numbers), 46), dtype=bool)
+        mask[np.arange(len(self.numbers))[:, None], self.numbers] = True
+        return mask
+
+    def count_in(self, members):
+        """Per-ticket count of numbers in `members`."""
+        return self.mask[:, members].sum(axis=1)
+
+
+class Feature:
+    def __init__(self, name, extractor, labels=None, description=""):
+        self.name = name
+        self.extractor = extractor
+        self.labels = labels
+        self.description = description
+
+    @property
+    def is_distribution(self):
+        return self.labels is not None
+
+
+class PatternEngine:
+    def __init__(self):
+        self.features = {}
+
+    def feature(self, name, labels=None, description=""):
+        """Decorator registering `extractor(ctx)`; distribution features pass their column `labels`."""
+        def register(extractor):
+            self.features[name] = Feature(name, extractor, labels, description)
+            return extractor
+        return register
+
+    def evaluate(self, numbers, names=None):
+        """{name: values} for the given (N, 6) tickets."""
+        ctx = numbers if isinstance(numbers, FeatureContext) else FeatureContext(numbers)
+        values = {}
+        for name in names or self.features:
+            values[name] = np.asarray(self.features[name].extractor(ctx), dtype=np.int64)
+        return values
+
+    def summarize(self, values):
+        """JSON summary of evaluated history: value distributions for scalars, totals and top patterns for distributions."""
+        summary = {}
+        for name, column in values.items():
+            feature = self.features[name]
+            if feature.is_distribution:
+                patterns = Counter("-".join(map(str, row)) for row in column.tolist())
+                summary[name] = {
+                    "description": feature.description,
+                    "labels": feature.labels,
+                    "totals": dict(zip(feature.labels, column.sum(axis=0).tolist())),
+                    "mean": dict(zip(feature.labels, np.round(column.mean(axis=0), 3).tolist())) if len(column) else {},
+                    "top_patterns": dict(patterns.most_common(TOP_PATTERNS)),
+                }
+            else:
+                distribution = Counter(column.tolist())
+                summary[name] = {
+                    "description": feature.description,
+                    "distribution": {str(value): count for value, count in sorted(distribution.items())},
+                    "mean": round(float(column.mean()), 3) if len(column) else None,
+                    "min": int(column.min()) if len(column) else None,
+                    "max": int(column.max()) if len(column) else None,
+                }
+        return summary
+
+    def historical_shares(self, candidates, history, names=None):
+        """
+        For every candidate ticket and scalar feature, the add-one smoothed share of
+        historical draws (`history` from evaluate()) with the same value. Returns
+        ({name: (M,) shares}, (M,) typicality), the geometric mean over the features.
+        """
+        names = [name for name in (names or self.features) if not self.features[name].is_distribution]
+        values = self.evaluate(candidates, names)
+        shares = {}
+        for name in names:
+            reference = history[name]
+            size = int(max(reference.max(initial=0), values[name].max(initial=0))) + 1
+            counts = np.bincount(reference, minlength=size)
+            shares[name] = (counts[values[name]] + 1) / (len(reference) + size)
+        typicality = np.exp(np.log(np.stack(list(shares.values()))).mean(axis=0))
+        return shares, typicality
+
+
+FEATURES = PatternEngine()
+
+
+@FEATURES.feature("sum", description="번호 합계")
+def total(ctx):
+    return ctx.numbers.sum(axis=1)
+
+
+@FEATURES.feature("odd_count", description="홀수 개수")
+def odd_count(ctx):
+    return (ctx.numbers % 2).sum(axis=1)
+
+
+@FEATURES.feature("low_count", description=f"저번호(1-{LOW_MAX}) 개수")
+def low_count(ctx):
+    return (ctx.numbers <= LOW_MAX).sum(axis=1)
+
+
+@FEATURES.feature("max_run", description="최장 연속번호 길이")
+def max_run(ctx):
+    consecutive = ctx.gaps == 1
+    run = np.zeros(len(ctx), dtype=np.int64)
+    longest = run.copy()
+    for column in consecutive.T:
+        run = np.where(column, run + 1, 0)
+        np.maximum(longest, run, out=longest)
+    return longest + 1
+
+
+@FEATURES.feature("ac_value", description="AC값 (서로 다른 차이의 수 - 5)")
+def ac_value(ctx):
+    differences = np.sort(ctx.pair_differences, axis=1)
+    distinct = 1 + (np.diff(differences, axis=1) != 0).sum(axis=1)
+    return distinct - 5
+
+
+@FEATURES.feature("span", description="최대값 - 최소값")
+def span(ctx):
+    return ctx.numbers[:, -1] - ctx.numbers[:, 0]
+
+
+@FEATURES.feature("prime_count", description="소수 개수")
+def prime_count(ctx):
+    return ctx.count_in(PRIMES)
+
+
+@FEATURES.feature("multiple_of_3_count", description="3의 배수 개수")
+def multiple_of_3_count(ctx):
+    return ctx.count_in(list(range(3, 46, 3)))
+
+
+@FEATURES.feature("decade_bands", labels=[f"{low}-{high}" for low, high in BANDS], description="번호대별 개수")
+def decade_bands(ctx):
+    return np.stack([ctx.count_in(list(range(low, high + 1))) for low, high in BANDS], axis=1)
+
+
+@FEATURES.feature("last_digits", labels=[str(digit) for digit in range(10)], description="끝자리별 개수")
+def last_digits(ctx):
+    return np.stack([ctx.count_in(list(range(digit or 10, 46, 10))) for digit in range(10)], axis=1)
@@ -0,0 +1,250 @@
+"""
+Cumulative per-draw arrays for answering analyses over any [from, to] window.
+
+Row k of every cumulative array holds the totals of the first k draws, so the
+totals of positions lo..hi (inclusive) are always `cum[hi + 1] - cum[lo]`. Each
+analysis below therefore costs O(45²) or less regardless of window length.
+"""
+import numpy as np
+
+MAX_SUM = 255  # 40 + 41 + ... + 45
+
+
+def cumulate(values):
+    """(n + 1, ...) running totals of per-draw values; row 0 is all zeros."""
+    out = np.zeros((len(values) + 1,) + values.shape[1:], dtype=np.int64 if values.dtype == np.int64 else np.int32)
+    np.cumsum(values, axis=0, out=out[1:])
+    return out
+
+
+def first_seen(column, lo):
+    """Position of the first draw from lo on counted in a cumulative column (which must count one there)."""
+    return int(np.searchsorted(column, column[lo] + 1, side="left")) - 1
+
+
+class PrefixSums:
+    def __init__(self, table):
+        n = len(table)
+        self.size = n
+        self.draw_numbers = table.draw_numbers
+        self.draw_dates = np.array(table.draw_dates, dtype="U10")
+
+        main = table.numbers
+        bonus = table.bonus
+        rows = np.arange(n)
+
+        onehot = table.onehot()
+        bonus_onehot = np.zeros((n, 46), dtype=np.int32)
+        bonus_onehot[rows, bonus] = 1
+        bonus_onehot[:, 0] = 0
+
+        sums, odd, low = table.sums, table.odd_counts, table.low_counts
+        consecutive = (np.diff(main, axis=1) == 1).any(axis=1)
+
+        self.cum_counts = cumulate(onehot)
+        self.cum_bonus = cumulate(bonus_onehot)
+        self.cum_sum = cumulate(sums)
+        self.cum_sum_sq = cumulate(sums * sums)
+        self.cum_sum_hist = cumulate(np.eye(MAX_SUM + 1, dtype=np.int32)[sums])
+        self.cum_odd = cumulate(np.eye(7, dtype=np.int32)[odd])
+        self.cum_low = cumulate(np.eye(7, dtype=np.int32)[low])
+        self.cum_consecutive = cumulate(consecutive.astype(np.int32))
+        # (n + 1, 46, 46): cum_pairs[k, a, b] = draws among the first k containing both a and b.
+        self.cum_pairs = cumulate(onehot[:, :, None] * onehot[:, None, :])
+
+    # --- Window resolution ---
+    def resolve(self, from_draw=None, to_draw=None, since=None):
+        """
+        Maps draw numbers / an ISO date lower bound to inclusive positions
+        (lo, hi). Returns None when the window holds no draws.
+        """
+        lo, hi = 0, self.size - 1
+        if from_draw is not None:
+            lo = max(lo, int(np.searchsorted(self.draw_numbers, from_draw, side="left")))
+        if since is not None:
+            lo = max(lo, int(np.searchsorted(self.draw_dates, since, side="left")))
+        if to_draw is not None:
+            hi = min(hi, int(np.searchsorted(self.draw_numbers, to_draw, side="right")) - 1)
+        if lo > hi:
+            return None
+        return lo, hi
+
+    def _window(self, cum, lo, hi):
+        return cum[hi + 1] - cum[lo]
+
+    def describe(self, lo, hi):
+        return {"from_draw": int(self.draw_numbers[lo]), "to_draw": int(self.draw_numbers[hi]), "draws": hi - lo + 1}
+
+    # --- Analyses ---
+    def number_counts(self, lo, hi):
+        return self._window(self.cum_counts, lo, hi)
+
+    def last_seen(self, lo, hi):
+        """Draw number of each number's last appearance inside the window (0 = not seen)."""
+        counts_at_hi = self.cum_counts[hi + 1]
+        seen = counts_at_hi > self.cum_counts[lo]
+        result = np.zeros(46, dtype=np.int64)
+        for num in np.nonzero(seen)[0]:
+            # The first prefix row reaching the final count is the row right after the last hit.
+            pos = int(np.searchsorted(self.cum_counts[:, num], counts_at_hi[num], side="left")) - 1
+            result[num] = self.draw_numbers[pos]
+        return result
+
+    def overdue(self, lo, hi):
+        """Draws since each number last appeared, counted like the full-history analysis."""
+        last = self.last_seen(lo, hi)
+        start = int(self.draw_numbers[lo]) - 1
+        end = int(self.draw_numbers[hi])
+        return {num: end - (int(last[num]) or start) for num in range(1, 46)}
+
+    def frequency(self, lo, hi):
+        def ranked(cum, top):
+            counts = self._window(cum, lo, hi)
+            # Like the full-history Counter: only numbers drawn in the window, ties in first-appearance order.
+            first = {num: first_seen(cum[:, num], lo) for num in range(1, 46) if counts[num]}
+            order = sorted(first, key=lambda num: (-counts[num], first[num], num))
+            items = [{"number": num, "count": int(counts[num])} for num in order]
+            return items[:top], items[-top:]
+
+        hot, cold = ranked(self.cum_counts, 10)
+        hot_bonus, cold_bonus = ranked(self.cum_bonus, 5)
+        return {
+            "hotNumbers": hot,
+            "coldNumbers": cold,
+            "hotBonusNumbers": hot_bonus,
+            "coldBonusNumbers": cold_bonus,
+            "range": self.describe(lo, hi),
+        }
+
+    def sum_histogram(self, lo, hi):
+        return self._window(self.cum_sum_hist, lo, hi)
+
+    def patterns(self, lo, hi):
+        n = hi - lo + 1
+        odd = self._window(self.cum_odd, lo, hi)
+        low = self._window(self.cum_low, lo, hi)
+        consecutive = int(self._window(self.cum_consecutive, lo, hi))
+        total = int(self._window(self.cum_sum, lo, hi))
+        total_sq = int(self._window(self.cum_sum_sq, lo, hi))
+        hist = self.sum_histogram(lo, hi)
+        present = np.nonzero(hist)[0]
+        mean = total / n
+        median = int(np.searchsorted(np.cumsum(hist), n // 2, side="right"))
+
+        def ratios(counts, label):
+            return {label(k): int(counts[k]) for k in sorted(range(7), key=lambda k: -counts[k]) if counts[k]}
+
+        return {
+            "total_draws": n,
+            "odd_even_ratios": ratios(odd, lambda k: f"{k}:{6 - k}"),
+            "high_low_ratios": ratios(low, lambda k: f"{6 - k}:{k}"),
+            "consecutive_stats": {"count": consecutive, "percentage": round(consecutive / n * 100, 2)},
+            "sum_stats": {
+                "min": int(present[0]), "max": int(present[-1]),
+                "mean": round(mean, 2),
+                "median": median,
+                "std_dev": round(max(total_sq / n - mean * mean, 0.0) ** 0.5, 2),
+            },
+            "range": self.describe(lo, hi),
+        }
+
+    def pair_counts(self, lo, hi):
+        """Upper-triangular 46x46 matrix of pair co-occurrences inside the window."""
+        return np.triu(self._window(self.cum_pairs, lo, hi), k=1)
+
+    def cooccurrence(self, lo, hi, top=20):
+        flat = self.pair_counts(lo, hi).ravel()
+        candidates = np.flatnonzero(flat)
+        if len(candidates) > top:
+            cutoff = np.partition(flat[candidates], -top)[-top]
+            candidates = candidates[flat[candidates] >= cutoff]
+        # Ties in first-seen order (oldest draw first, then by pair), like the full-history path.
+        order = sorted(
+            candidates.tolist(),
+            key=lambda idx: (-flat[idx], first_seen(self.cum_pairs[:, idx // 46, idx % 46], lo), idx),
+        )[:top]
+        return [{"pair": f"{idx // 46} - {idx % 46}", "count": int(flat[idx])} for idx in order]
+
+    def partner_counts(self, lo, hi, number):
+        row = self.cum_pairs[hi + 1, number] - self.cum_pairs[lo, number]
+        return {other: int(row[other]) for other in range(1, 46) if other != number}
+
+    def timeseries(self, lo, hi, window_size=52, sample_rate=10):
+        """Sum and trailing moving average per sampled draw; the average may look back before lo."""
+        positions = np.arange(lo, hi + 1, sample_rate)
+        sums = self.cum_sum[positions + 1] - self.cum_sum[positions]
+        starts = positions + 1 - window_size
+        full = starts >= 0
+        averages = (self.cum_sum[positions + 1] - self.cum_sum[np.maximum(starts, 0)]) / window_size
+        return [
+            {
+                "name": f"{int(self.draw_numbers[pos])}회",
+                "sum": int(total),
+                "moving_average": round(float(avg), 2) if ok else None,
+            }
+            for pos, total, avg, ok in zip(positions, sums, averages, full)
+        ]
+
+
+class FeatureHistograms:
+    """
+    Per-window summaries of the pattern features (patterns.py) from cumulative
+    histograms: value counts of every scalar feature, and the column totals and
+    per-pattern counts of every distribution feature. summarize(lo, hi) equals
+    the engine's summarize() of those draws without touching them.
+    """
+
+    def __init__(self, engine, values):
+        self.engine = engine
+        self.names = list(values)
+        self.histograms = {}  # scalar name -> (smallest value, cumulative value counts)
+        self.totals = {}  # distribution name -> cumulative column totals
+        self.patterns = {}  # distribution name -> (pattern labels, cumulative pattern counts)
+        for name, column in values.items():
+            if engine.features[name].is_distribution:
+                self.totals[name] = cumulate(column)
+                keys, inverse = np.unique(column, axis=0, return_inverse=True)
+                labels = ["-".join(map(str, row)) for row in keys.tolist()]
+                self.patterns[name] = (labels, cumulate(np.eye(len(keys), dtype=np.int32)[inverse.reshape(-1)]))
+            else:
+                offset = int(column.min(initial=0))
+                self.histograms[name] = (offset, cumulate(np.eye(int(column.max(initial=0)) - offset + 1, dtype=np.int32)[column - offset]))
+
+    def _top_patterns(self, name, lo, hi, top):
+        labels, cum = self.patterns[name]
+        counts = cum[hi + 1] - cum[lo]
+        candidates = np.flatnonzero(counts)
+        if len(candidates) > top:
+            cutoff = np.partition(counts[candidates], -top)[-top]
+            candidates = candidates[counts[candidates] >= cutoff]
+        # Ties in first-seen order, as Counter.most_common() breaks them.
+        order = sorted(candidates.tolist(), key=lambda i: (-counts[i], first_seen(cum[:, i], lo)))[:top]
+        return {labels[i]: int(counts[i]) for i in order}
+
+    def summarize(self, lo, hi, top):
+        n = hi - lo + 1
+        summary = {}
+        for name in self.names:
+            feature = self.engine.features[name]
+            if feature.is_distribution:
+                totals = self.totals[name][hi + 1] - self.totals[name][lo]
+                summary[name] = {
+                    "description": feature.description,
+                    "labels": feature.labels,
+                    "totals": dict(zip(feature.labels, totals.tolist())),
+                    "mean": dict(zip(feature.labels, np.round(totals / n, 3).tolist())),
+                    "top_patterns": self._top_patterns(name, lo, hi, top),
+                }
+            else:
+                offset, cum = self.histograms[name]
+                counts = cum[hi + 1] - cum[lo]
+                present = np.flatnonzero(counts)
+                values = present + offset
+                summary[name] = {
+                    "description": feature.description,
+                    "distribution": {str(value): int(counts[i]) for value, i in zip(values.tolist(), present.tolist())},
+                    "mean": round(int((values * counts[present]).sum()) / n, 3),
+                    "min": int(values[0]),
+                    "max": int(values[-1]),
+                }
+        return summary
@@ -0,0 +1,343 @@
+"""
+Opt-in request profiling that can be switched on at runtime.
+
+While enabled:
+  - `section(name)` times named sections (loader steps, generators, component
+    builds) into per-name totals and into the profile of the current request.
+  - ProfilingMiddleware profiles a `sample_rate` fraction of requests with a
+    statistical profiler: a background thread samples every thread each
+    INTERVAL_MS and credits a stack to the request it is working for. On the
+    event loop that is the request whose middleware frame is on the stack (so
+    concurrent requests don't mix); worker threads are credited while they run
+    a `bind()`-wrapped call or a `section()` for the request.
+  - Profiled requests slower than `slow_ms` are kept in a ring of the last
+    RING_SIZE, retrievable as folded stacks ("frame;frame;frame count" lines),
+    which flamegraph.pl, speedscope and inferno read directly.
+
+While disabled, `section()` returns a shared no-op context manager and the
+middleware passes requests straight through, so the hooks cost one global
+lookup. State is per process; with several uvicorn workers each keeps its own.
+"""
+import os
+import sys
+import time
+import random
+import itertools
+import threading
+import contextvars
+from collections import Counter, deque
+from datetime import datetime
+
+RING_SIZE = int(os.environ.get("LOTTO_PROFILE_RING", 50))
+INTERVAL_MS = float(os.environ.get("LOTTO_PROFILE_INTERVAL_MS", 2))
+MAX_STACK_DEPTH = 128
+# Requests to these paths are never profiled (the debug endpoints themselves).
+EXCLUDED_PREFIXES = ("/api/debug/",)
+
+_enabled = os.environ.get("LOTTO_PROFILING", "0") == "1"
+_sample_rate = float(os.environ.get("LOTTO_PROFILE_SAMPLE_RATE", 0.01))
+_slow_ms = float(os.environ.get("LOTTO_PROFILE_SLOW_MS", 200))
+
+_current = contextvars.ContextVar("lotto_profile", default=None)
+_ids = itertools.count(1)
+_ring = deque(maxlen=RING_SIZE)
+_section_stats = {}  # name -> [count, total_ms, max_ms, last_ms]
+_lock = threading.Lock()
+
+
+def is_enabled():
+    return _enabled
+
+
+def configure(enabled=None, sample_rate=None, slow_ms=None):
+    global _enabled, _sample_rate, _slow_ms
+    if sample_rate is not None:
+        _sample_rate = min(max(float(sample_rate), 0.0), 1.0)
+    if slow_ms is not None:
+        _slow_ms = max(float(slow_ms), 0.0)
+    if enabled is not None:
+        _enabled = bool(enabled)
+    return settings()
+
+
+def settings():
+    return {
+        "enabled": _enabled,
+        "sample_rate": _sample_rate,
+        "slow_ms": _slow_ms,
+        "interval_ms": INTERVAL_MS,
+        "ring_size": RING_SIZE,
+    }
+
+
+# --- Named sections ---
+class _NullSection:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SECTION = _NullSection()
+
+
+class _Section:
+    __slots__ = ("name", "started", "profile", "attached")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.profile = _current.get()
+        self.attached = self.profile is not None and _sampler.attach(self.profile)
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        finished = time.perf_counter()
+        elapsed_ms = (finished - self.started) * 1000
+        with _lock:
+            stats = _section_stats.get(self.name)
+            if stats is None:
+                _section_stats[self.name] = [1, elapsed_ms, elapsed_ms, elapsed_ms]
+            else:
+                stats[0] += 1
+                stats[1] += elapsed_ms
+                stats[2] = max(stats[2], elapsed_ms)
+                stats[3] = elapsed_ms
+        if self.attached:
+            _sampler.detach()
+        profile = self.profile
+        if profile is not None:
+            profile.sections.append((self.name, round((self.started - profile.started) * 1000, 3), round(elapsed_ms, 3)))
+        return False
+
+
+def section(name):
+    """Context manager timing `name`; a no-op unless profiling is enabled."""
+    if not _enabled:
+        return _NULL_SECTION
+    return _Section(name)
+
+
+def bind(func):
+    """
+    `func` bound to the current request's profile, for handing to a thread
+    pool: it runs in a copy of the request's context (so its sections are
+    recorded) and its thread is sampled for the request while it runs.
+    """
+    if _current.get() is None:
+        return func
+    context = contextvars.copy_context()
+
+    def run(*args, **kwargs):
+        return context.run(_run_attached, func, args, kwargs)
+
+    return run
+
+
+def _run_attached(func, args, kwargs):
+    attached = _sampler.attach(_current.get())
+    try:
+        return func(*args, **kwargs)
+    finally:
+        if attached:
+            _sampler.detach()
+
+
+def section_stats():
+    with _lock:
+        items = sorted(_section_stats.items())
+    return {
+        name: {"count": count, "total_ms": round(total, 3), "mean_ms": round(total / count, 3), "max_ms": round(peak, 3), "last_ms": round(last, 3)}
+        for name, (count, total, peak, last) in items
+    }
+
+
+# --- Statistical profiler ---
+def fold_stack(frame, owners=None):
+    """
+    Folded stack of `frame`, root first. With `owners` ({id(frame): profile}),
+    also returns the profile owning the innermost such frame on the stack.
+    """
+    names = []
+    owner = None
+    while frame is not None and len(names) < MAX_STACK_DEPTH:
+        code = frame.f_code
+        names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+        if owner is None and owners:
+            owner = owners.get(id(frame))
+        frame = frame.f_back
+    folded_stack = ";".join(reversed(names))
+    return folded_stack if owners is None else (folded_stack, owner)
+
+
+class RequestProfile:
+    def __init__(self, scope):
+        self.id = next(_ids)
+        self.method = scope.get("method")
+        self.path = scope.get("path")
+        self.query = scope.get("query_string", b"").decode("latin-1")
+        self.thread_id = threading.get_ident()
+        self.frame = None  # the middleware's frame serving this request, set by ProfilingMiddleware
+        self.started_at = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        self.started = time.perf_counter()
+        self.elapsed_ms = None
+        self.status = None
+        self.sections = []
+        self.stacks = Counter()
+
+    def summary(self):
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "query": self.query,
+            "status": self.status,
+            "started_at": self.started_at,
+            "elapsed_ms": self.elapsed_ms,
+            "samples": sum(self.stacks.values()),
+            "sections": [{"name": name, "offset_ms": offset, "elapsed_ms": elapsed} for name, offset, elapsed in self.sections],
+        }
+
+
+class _Sampler:
+    """Samples the threads working for in-flight profiled requests; runs only while there is one."""
+
+    def __init__(self):
+        self._profiles = {}
+        self._attached = {}  # thread id -> [profile, depth] for threads working off the event loop
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def add(self, profile):
+        with self._lock:
+            self._profiles[profile.id] = profile
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="profiling-sampler", daemon=True)
+                self._thread.start()
+
+    def remove(self, profile):
+        with self._lock:
+            self._profiles.pop(profile.id, None)
+
+    def attach(self, profile):
+        """
+        Credits the calling thread's samples to `profile` until the matching
+        detach(). Returns False, attaching nothing, on the thread serving the
+        request, whose samples are attributed through the middleware frame.
+        """
+        thread_id = threading.get_ident()
+        if thread_id == profile.thread_id:
+            return False
+        with self._lock:
+            entry = self._attached.get(thread_id)
+            if entry is None:
+                self._attached[thread_id] = [profile, 1]
+            else:
+                entry[1] += 1
+        return True
+
+    def detach(self):
+        thread_id = threading.get_ident()
+        with self._lock:
+            entry = self._attached[thread_id]
+            entry[1] -= 1
+            if entry[1] == 0:
+                del self._attached[thread_id]
+
+    def _run(self):
+        interval = INTERVAL_MS / 1000
+        while True:
+            with self._lock:
+                if not self._profiles:
+                    self._thread = None
+                    return
+                owners = {id(profile.frame): profile for profile in self._profiles.values() if profile.frame is not None}
+                attached = {thread_id: entry[0] for thread_id, entry in self._attached.items() if entry[0].id in self._profiles}
+            me = threading.get_ident()
+            frames = sys._current_frames()
+            for thread_id, frame in frames.items():
+                if thread_id == me:
+                    continue
+                profile = attached.get(thread_id)
+                if profile is not None:
+                    profile.stacks[fold_stack(frame)] += 1
+                elif owners:
+                    stack, profile = fold_stack(frame, owners)
+                    if profile is not None:
+                        profile.stacks[stack] += 1
+            del frames
+            time.sleep(interval)
+
+
+_sampler = _Sampler()
+
+
+class ProfilingMiddleware:
+    """ASGI middleware profiling a sample of requests (pass-through while disabled)."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if not _enabled or scope["type"] != "http" or random.random() >= _sample_rate or scope["path"].startswith(EXCLUDED_PREFIXES):
+            await self.app(scope, receive, send)
+            return
+
+        profile = RequestProfile(scope)
+
+        async def send_and_record_status(message):
+            if message["type"] == "http.response.start":
+                profile.status = message["status"]
+            await send(message)
+
+        profile.frame = sys._getframe()
+        token = _current.set(profile)
+        _sampler.add(profile)
+        try:
+            await self.app(scope, receive, send_and_record_status)
+        finally:
+            _sampler.remove(profile)
+            _current.reset(token)
+            profile.frame = None
+            profile.elapsed_ms = round((time.perf_counter() - profile.started) * 1000, 3)
+            if profile.elapsed_ms >= _slow_ms:
+                with _lock:
+                    _ring.append(profile)
+
+
+# --- Slow-request ring ---
+def slow_profiles():
+    with _lock:
+        return [profile.summary() for profile in reversed(_ring)]
+
+
+def find_profile(profile_id):
+    with _lock:
+        for profile in _ring:
+            if profile.id == profile_id:
+                return profile
+    return None
+
+
+def folded(profiles):
+    """Folded-stack text merging the samples of `profiles`, one "stack count" line per stack."""
+    stacks = Counter()
+    for profile in profiles:
+        stacks.update(profile.stacks)
+    return "".join(f"{stack} {count}\n" for stack, count in sorted(stacks.items()))
+
+
+def all_profiles():
+    with _lock:
+        return list(_ring)
+
+
+def clear():
+    with _lock:
+        _ring.clear()
+        _section_stats.clear()
@@ -0,0 +1,361 @@
+"""
+Randomness test battery over the draw history.
+
+Every test is evaluated for a whole batch of draw windows at once: the
+per-draw quantities are accumulated into prefix arrays when the battery is
+built, so the counts of any window are one subtraction and each test is a few
+array operations over all windows together. Windows are positions in the
+loaded history (gaps in the CSV are not counted as draws).
+
+Tests, with H0 = "each draw is a uniform 6-of-45 sample independent of the
+others":
+  number_uniformity    chi-square of per-number counts (corrected for sampling
+                       6 numbers without replacement)
+  position_uniformity  chi-square of each sorted position against its
+                       order-statistic distribution, adjacent values pooled
+                       to an expected count of at least 5
+  odd_even_runs,       Wald-Wolfowitz runs test on the per-draw sequence of
+  high_low_runs        "more odd (low) than even (high)" vs "fewer", ties dropped
+  sum_serial_correlation  lag autocorrelations of draw sums and Ljung-Box Q
+  gap                  chi-square of gaps between appearances of the same
+                       number against the geometric expectation, truncated to
+                       gaps that fit inside the window
+  pair_independence    chi-square of the 990 pair counts against the
+                       hypergeometric rate 1/66; pair counts that share a
+                       number are correlated, so the statistic is referred to
+                       a scaled chi-square with matching mean and variance
+
+p-values use the Wilson-Hilferty approximation for chi-square and the normal
+distribution for the z statistics.
+"""
+import math
+from itertools import combinations
+
+import numpy as np
+
+DEFAULT_WINDOW = 100
+DEFAULT_STEP = 25
+MIN_WINDOW = 20
+MAX_WINDOWS = 100  # per battery() call; each window is evaluated for every test
+ALPHA = 0.01
+SERIAL_LAGS = 5
+MIN_EXPECTED = 5
+
+P_NUMBER = 6 / 45
+P_PAIR = 1 / 66  # C(43, 4) / C(45, 6)
+PAIRS = list(combinations(range(1, 46), 2))
+
+
+def _pair_dispersion():
+    """
+    Variance inflation of the pair statistic: tr(C^2) / (990 * var^2) for the
+    covariance C of the 990 per-draw pair indicators (pairs sharing one number
+    are positively correlated, disjoint pairs slightly negatively).
+    """
+    variance = P_PAIR * (1 - P_PAIR)
+    shared = (6 * 5 * 4) / (45 * 44 * 43) - P_PAIR ** 2
+    disjoint = (6 * 5 * 4 * 3) / (45 * 44 * 43 * 42) - P_PAIR ** 2
+    neighbours = 2 * 43
+    return (variance ** 2 + neighbours * shared ** 2 + (len(PAIRS) - 1 - neighbours) * disjoint ** 2) / variance ** 2
+
+
+PAIR_DISPERSION = _pair_dispersion()  # ~1.6
+_PAIR_A = np.array([a for a, _ in PAIRS])
+_PAIR_B = np.array([b for _, b in PAIRS])
+
+_erfc = np.vectorize(math.erfc, otypes=[float])
+
+
+def chi2_sf(statistic, df):
+    """Upper tail of the chi-square distribution (Wilson-Hilferty approximation)."""
+    statistic, df = np.asarray(statistic, dtype=float), np.asarray(df, dtype=float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        z = ((statistic / df) ** (1 / 3) - (1 - 2 / (9 * df))) / np.sqrt(2 / (9 * df))
+    return normal_sf(z)
+
+
+def normal_sf(z):
+    return 0.5 * _erfc(np.asarray(z, dtype=float) / math.sqrt(2))
+
+
+def position_probabilities():
+    """(6, 46) P(r-th smallest of a 6-of-45 draw == x)."""
+    total = math.comb(45, 6)
+    return np.array([
+        [math.comb(x - 1, r) * math.comb(45 - x, 5 - r) / total if x else 0.0 for x in range(46)]
+        for r in range(6)
+    ])
+
+
+def pooled_bins(expected):
+    """
+    Start indices of adjacent-value bins whose expected counts reach
+    MIN_EXPECTED (a short final bin is merged into the one before it).
+    """
+    starts, running = [0], 0.0
+    for i, value in enumerate(expected):
+        if running >= MIN_EXPECTED:
+            starts.append(i)
+            running = 0.0
+        running += value
+    if running < MIN_EXPECTED and len(starts) > 1:
+        starts.pop()
+    return np.array(starts)
+
+
+def _cumulate(values):
+    out = np.zeros((len(values) + 1,) + values.shape[1:], dtype=np.int64 if values.dtype.kind != "f" else np.float64)
+    np.cumsum(values, axis=0, out=out[1:])
+    return out
+
+
+def _round(values, digits=4):
+    return [None if value is None or not np.isfinite(value) else round(float(value), digits) for value in values]
+
+
+class RandomnessTests:
+    def __init__(self, table):
+        n = len(table)
+        self.size = n
+        self.draw_numbers = table.draw_numbers
+        self._cache = {}
+
+        onehot = table.onehot()
+        self.cum_counts = _cumulate(onehot[:, 1:])
+
+        position_onehot = np.zeros((n, 6, 46), dtype=np.int32)
+        position_onehot[np.arange(n)[:, None], np.arange(6), table.numbers] = 1
+        self.cum_positions = _cumulate(position_onehot)
+        self.position_probs = position_probabilities()
+
+        self.runs = {
+            "odd_even_runs": self._runs_prefix(table.odd_counts),
+            "high_low_runs": self._runs_prefix(table.low_counts),
+        }
+
+        sums = table.sums.astype(np.float64)
+        self.cum_sums = _cumulate(sums)
+        self.cum_sums_sq = _cumulate(sums * sums)
+        self.cum_lag_products = {lag: _cumulate(sums[:-lag] * sums[lag:]) for lag in range(1, SERIAL_LAGS + 1) if n > lag}
+
+        # Gap events: consecutive appearances (start, end) of the same number.
+        rows, cols = np.nonzero(onehot.T[1:])  # grouped by number, positions ascending
+        same_number = rows[1:] == rows[:-1]
+        self.gap_starts = cols[:-1][same_number]
+        self.gap_ends = cols[1:][same_number]
+
+        self.cum_pairs = _cumulate((onehot[:, _PAIR_A] & onehot[:, _PAIR_B]).astype(np.int32))
+
+    @staticmethod
+    def _runs_prefix(counts):
+        """Prefix arrays for the runs test on sign(count - 3), ties dropped."""
+        sign = np.sign(counts - 3)
+        kept = sign != 0
+        sequence = sign[kept]
+        changes = np.zeros(len(sequence), dtype=np.int64)
+        changes[1:] = sequence[1:] != sequence[:-1]
+        return {
+            "kept": _cumulate(kept.astype(np.int64)),
+            "above": _cumulate((sign > 0).astype(np.int64)),
+            "changes": _cumulate(changes),
+        }
+
+    # --- Tests over a batch of windows (lo, hi arrays of equal-width windows) ---
+    def _number_uniformity(self, lo, hi, width):
+        counts = self.cum_counts[hi + 1] - self.cum_counts[lo]
+        expected = width * P_NUMBER
+        statistic = ((counts - expected) ** 2).sum(axis=1) / expected * (44 / 39)
+        return {"statistic": statistic, "df": np.full(len(lo), 44), "p_value": chi2_sf(statistic, 44)}
+
+    def _position_uniformity(self, lo, hi, width):
+        counts = self.cum_positions[hi + 1] - self.cum_positions[lo]  # (W, 6, 46)
+        results = []
+        for r in range(6):
+            expected = self.position_probs[r] * width
+            starts = pooled_bins(expected)
+            df = len(starts) - 1
+            if df < 1:
+                results.append({"statistic": np.full(len(lo), np.nan), "df": np.zeros(len(lo)), "p_value": np.full(len(lo), np.nan)})
+                continue
+            observed = np.add.reduceat(counts[:, r, :], starts, axis=1)
+            pooled_expected = np.add.reduceat(expected, starts)
+            statistic = ((observed - pooled_expected) ** 2 / pooled_expected).sum(axis=1)
+            results.append({"statistic": statistic, "df": np.full(len(lo), df), "p_value": chi2_sf(statistic, df)})
+        return results
+
+    def _runs_test(self, prefix, lo, hi):
+        kept = prefix["kept"]
+        a, b = kept[lo], kept[hi + 1]  # window covers kept positions a..b-1
+        total = b - a
+        above = prefix["above"][hi + 1] - prefix["above"][lo]
+        below = total - above
+        changes = prefix["changes"]
+        runs = np.where(total > 0, 1 + changes[np.maximum(b, a + 1)] - changes[np.minimum(a + 1, b)], 0)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            expected = 2 * above * below / total + 1
+            variance = 2 * above * below * (2 * above * below - total) / (total ** 2 * (total - 1))
+            z = (runs - expected) / np.sqrt(variance)
+        return {"runs": runs, "expected_runs": expected, "z": z, "p_value": 2 * normal_sf(np.abs(z))}
+
+    def _serial_correlation(self, lo, hi, width):
+        total = self.cum_sums[hi + 1] - self.cum_sums[lo]
+        mean = total / width
+        denominator = self.cum_sums_sq[hi + 1] - self.cum_sums_sq[lo] - width * mean ** 2
+        autocorrelations, q = [], np.zeros(len(lo))
+        for lag, cum_products in self.cum_lag_products.items():
+            if lag >= width:
+                break
+            products = cum_products[hi + 1 - lag] - cum_products[lo]
+            head = self.cum_sums[hi + 1 - lag] - self.cum_sums[lo]
+            tail = self.cum_sums[hi + 1] - self.cum_sums[lo + lag]
+            numerator = products - mean * (head + tail) + (width - lag) * mean ** 2
+            with np.errstate(divide="ignore", invalid="ignore"):
+                r = numerator / denominator
+            autocorrelations.append(r)
+            q += r ** 2 / (width - lag)
+        q *= width * (width + 2)
+        df = len(autocorrelations)
+        return {"autocorrelation": autocorrelations, "ljung_box": q, "df": np.full(len(lo), df), "p_value": chi2_sf(q, df)}
+
+    def _gap_test(self, lo, hi, width):
+        lengths = np.arange(1, width)
+        # Expected gaps of length L fully inside a window of `width` draws.
+        expected = 45 * (width - lengths) * P_NUMBER ** 2 * (1 - P_NUMBER) ** (lengths - 1)
+        starts = pooled_bins(expected)
+        df = len(starts) - 1
+        inside = (self.gap_starts[None, :] >= lo[:, None]) & (self.gap_ends[None, :] <= hi[:, None])
+        gap_lengths = self.gap_ends - self.gap_starts
+        bin_of_gap = np.searchsorted(starts, gap_lengths - 1, side="right") - 1
+        observed = np.zeros((len(lo), len(starts)))
+        for k in range(len(starts)):
+            observed[:, k] = (inside & (bin_of_gap == k)[None, :]).sum(axis=1)
+        pooled_expected = np.add.reduceat(expected, starts)
+        statistic = ((observed - pooled_expected) ** 2 / pooled_expected).sum(axis=1)
+        return {"statistic": statistic, "df": np.full(len(lo), df), "p_value": chi2_sf(statistic, df), "gaps": inside.sum(axis=1)}
+
+    def _pair_independence(self, lo, hi, width):
+        counts = self.cum_pairs[hi + 1] - self.cum_pairs[lo]
+        expected = width * P_PAIR
+        residuals = (counts - expected) / math.sqrt(expected * (1 - P_PAIR))
+        statistic = (residuals ** 2).sum(axis=1)
+        strongest = np.abs(residuals).argmax(axis=1)
+        df = len(PAIRS) / PAIR_DISPERSION
+        return {
+            "statistic": statistic,
+            "df": np.full(len(lo), df),
+            "p_value": chi2_sf(statistic / PAIR_DISPERSION, df),
+            "strongest_pair": strongest,
+            "strongest_count": counts[np.arange(len(lo)), strongest],
+            "strongest_z": residuals[np.arange(len(lo)), strongest],
+            "expected": np.full(len(lo), expected),
+        }
+
+    def _evaluate(self, lo, hi, width):
+        return {
+            "number_uniformity": self._number_uniformity(lo, hi, width),
+            "position_uniformity": self._position_uniformity(lo, hi, width),
+            "odd_even_runs": self._runs_test(self.runs["odd_even_runs"], lo, hi),
+            "high_low_runs": self._runs_test(self.runs["high_low_runs"], lo, hi),
+            "sum_serial_correlation": self._serial_correlation(lo, hi, width),
+            "gap": self._gap_test(lo, hi, width),
+            "pair_independence": self._pair_independence(lo, hi, width),
+        }
+
+    # --- Report ---
+    def _describe(self, lo, hi):
+        return {"from_draw": int(self.draw_numbers[lo]), "to_draw": int(self.draw_numbers[hi]), "draws": int(hi - lo + 1)}
+
+    @staticmethod
+    def _p_values(results, i):
+        return {
+            name: [_round([position["p_value"][i]])[0] for position in result] if isinstance(result, list) else _round([result["p_value"][i]])[0]
+            for name, result in results.items()
+        }
+
+    def _full_report(self, results):
+        def chi2(result, **extra):
+            return {"statistic": _round([result["statistic"][0]], 3)[0], "df": _round([result["df"][0]], 1)[0], "p_value": _round([result["p_value"][0]])[0], **extra}
+
+        pairs = results["pair_independence"]
+        serial = results["sum_serial_correlation"]
+        gap = results["gap"]
+        return {
+            "number_uniformity": chi2(results["number_uniformity"]),
+            "position_uniformity": [{"position": r + 1, **chi2(result)} for r, result in enumerate(results["position_uniformity"])],
+            **{
+                name: {
+                    "runs": int(results[name]["runs"][0]),
+                    "expected_runs": _round([results[name]["expected_runs"][0]], 2)[0],
+                    "z": _round([results[name]["z"][0]], 3)[0],
+                    "p_value": _round([results[name]["p_value"][0]])[0],
+                }
+                for name in ("odd_even_runs", "high_low_runs")
+            },
+            "sum_serial_correlation": {
+                "autocorrelation": {str(lag + 1): _round([r[0]])[0] for lag, r in enumerate(serial["autocorrelation"])},
+                "ljung_box": _round([serial["ljung_box"][0]], 3)[0],
+                "df": int(serial["df"][0]),
+                "p_value": _round([serial["p_value"][0]])[0],
+            },
+            "gap": chi2(gap, gaps=int(gap["gaps"][0])),
+            "pair_independence": chi2(pairs, strongest_pair={
+                "pair": "{} - {}".format(*PAIRS[pairs["strongest_pair"][0]]),
+                "count": int(pairs["strongest_count"][0]),
+                "expected": round(float(pairs["expected"][0]), 2),
+                "z": round(float(pairs["strongest_z"][0]), 3),
+            }),
+        }
+
+    def window_starts(self, window=DEFAULT_WINDOW, step=DEFAULT_STEP):
+        """First positions of the sliding windows battery() evaluates (the last one ends at the latest draw)."""
+        n = self.size
+        if n < window:
+            return np.array([], dtype=np.int64)
+        lo = np.arange(0, n - window + 1, step)
+        if lo[-1] != n - window:
+            lo = np.append(lo, n - window)
+        return lo
+
+    def battery(self, window=DEFAULT_WINDOW, step=DEFAULT_STEP, alpha=ALPHA):
+        """
+        Full-history results plus per-window p-values for sliding windows of
+        `window` draws every `step` draws (the last window always ends at the
+        latest draw). Window results below alpha / number of windows are
+        listed under "drift".
+        """
+        key = (window, step, alpha)
+        if key in self._cache:
+            return self._cache[key]
+
+        n = self.size
+        full = self._evaluate(np.array([0]), np.array([n - 1]), n)
+        report = {
+            "full": {**self._describe(0, n - 1), "tests": self._full_report(full)},
+            "window": window,
+            "step": step,
+            "alpha": alpha,
+            "windows": [],
+            "drift": [],
+        }
+
+        lo = self.window_starts(window, step)
+        if len(lo):
+            hi = lo + window - 1
+            results = self._evaluate(lo, hi, window)
+            threshold = alpha / len(lo)
+            for i in range(len(lo)):
+                p_values = self._p_values(results, i)
+                report["windows"].append({**self._describe(lo[i], hi[i]), "p_values": p_values})
+                for name, p_value in p_values.items():
+                    for position, value in enumerate(p_value if isinstance(p_value, list) else [p_value], start=1):
+                        if value is not None and value < threshold:
+                            report["drift"].append({
+                                "test": name if not isinstance(p_value, list) else f"{name}[{position}]",
+                                **self._describe(lo[i], hi[i]),
+                                "p_value": value,
+                            })
+
+        if len(self._cache) >= 32:
+            self._cache.clear()
+        self._cache[key] = report
+        return report
@@ -0,0 +1,364 @@
+"""
+Draw-day refresh: the weekly draw schedule, polling of the results source and
+the stage timings of a refresh.
+
+Lotto 6/45 is drawn every Saturday at DRAW_TIME (KST), so the next draw is due
+one week after the last one in the published data. From then on the source is
+polled with adaptive backoff until the draw appears: POLL_MIN_S after the
+first miss, growing by POLL_FACTOR per miss (twice as fast when the source
+fails) up to POLL_MAX_S while the draw is recent, and up to POLL_SLOW_MAX_S
+once it is more than POLL_FAST_WINDOW_S overdue. Every draw the source has
+beyond the CSV is then appended to it (atomically) and the backend's refresh
+pipeline publishes them.
+
+The source is the dhlottery JSON endpoint at DHLOTTERY_API_URL, the setting
+update_lotto_data.py reads too, so a local stand-in such as
+loadtest.DhlotteryStub can replace it.
+
+Freshness is the time from the scheduled draw to its publish on the
+dashboard, kept for recent draws, and the lag of a due draw that is not
+published yet.
+"""
+import os
+import re
+import csv
+import io
+import json
+import time
+import random
+import threading
+import urllib.request
+from collections import deque
+from contextlib import contextmanager
+from datetime import date, datetime, time as day_time, timedelta, timezone
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process lock, appends are still atomic
+    fcntl = None
+
+import profiling
+
+SOURCE_URL = os.environ.get("DHLOTTERY_API_URL", "https://www.dhlottery.co.kr/common.do")
+# Off by default: each process polls on its own and appends to its own CSV, so turn it on only
+# for a single long-lived instance that owns the data (not autoscaled, CPU not throttled).
+SCHEDULER_ENABLED = os.environ.get("LOTTO_REFRESH_SCHEDULER", "0") == "1"
+KST = timezone(timedelta(hours=9))
+DRAW_TIME = os.environ.get("LOTTO_DRAW_TIME", "20:35")
+DRAW_INTERVAL = timedelta(weeks=1)
+POLL_MIN_S = float(os.environ.get("LOTTO_POLL_MIN_S", 5))
+POLL_MAX_S = float(os.environ.get("LOTTO_POLL_MAX_S", 30))
+POLL_SLOW_MAX_S = float(os.environ.get("LOTTO_POLL_SLOW_MAX_S", 900))
+POLL_FAST_WINDOW_S = 3 * 3600
+POLL_FACTOR = 1.5
+POLL_JITTER = 0.1
+IDLE_CHECK_S = 3600  # the schedule is re-read at least this often while waiting
+FETCH_TIMEOUT_S = 10
+RECENT_UPDATES = 10
+
+CSV_HEADER = [
+    "추첨일", "회차", "당첨번호", "보너스번호", "1등_총당첨금액", "1등_당첨게임수", "1등_1게임당당첨금액",
+    "2등_총당첨금액", "2등_당첨게임수", "2등_1게임당당첨금액", "3등_총당첨금액", "3등_당첨게임수", "3등_1게임당당첨금액",
+    "4등_총당첨금액", "4등_당첨게임수", "4등_1게임당당첨금액", "5등_총당첨금액", "5등_당첨게임수", "5등_1게임당당첨금액",
+    "자동/반자동/수동", "총판매금액",
+]
+_DRAW_FIELD = re.compile(r"\(\s*\d{4}\s*-\s*\d{1,2}\s*-\s*\d{1,2}\s*\)\s*,\s*(\d+)\s*회")
+
+
+def timestamp(seconds):
+    return datetime.fromtimestamp(seconds, KST).isoformat(timespec="seconds") if seconds is not None else None
+
+
+# --- Schedule ---
+def draw_time(draw_date):
+    """Scheduled datetime (KST) of the draw held on `draw_date` ('YYYY-MM-DD')."""
+    hour, minute = (int(part) for part in DRAW_TIME.split(":"))
+    return datetime.combine(date.fromisoformat(draw_date), day_time(hour, minute), tzinfo=KST)
+
+
+def next_draw_due(last_date):
+    """When the draw after the one on `last_date` is due; now when there is no data yet."""
+    if not last_date:
+        return datetime.now(KST)
+    return draw_time(last_date) + DRAW_INTERVAL
+
+
+class Backoff:
+    """Delays between polls for a draw that is due but not published yet."""
+
+    def __init__(self):
+        self.delay = None
+
+    def reset(self):
+        self.delay = None
+
+    def next(self, overdue_s, failed=False):
+        cap = POLL_MAX_S if overdue_s <= POLL_FAST_WINDOW_S else POLL_SLOW_MAX_S
+        factor = POLL_FACTOR * 2 if failed else POLL_FACTOR
+        self.delay = POLL_MIN_S if self.delay is None else min(cap, self.delay * factor)
+        return self.delay * random.uniform(1 - POLL_JITTER, 1 + POLL_JITTER)
+
+
+# --- Source and CSV ---
+class DhlotterySource:
+    """Results of single draws from the dhlottery JSON endpoint (or a stand-in at `url`)."""
+
+    def __init__(self, url=SOURCE_URL, timeout=FETCH_TIMEOUT_S):
+        self.url = url
+        self.timeout = timeout
+
+    def fetch(self, draw_number):
+        """The draw's JSON, or None while it is not published. Raises OSError or ValueError if the source fails."""
+        with urllib.request.urlopen(f"{self.url}?method=getLottoNumber&drwNo={draw_number}", timeout=self.timeout) as response:
+            data = json.loads(response.read().decode("utf-8"))
+        if data.get("returnValue") != "success":
+            return None
+        return data
+
+
+def format_row(data):
+    """CSV row of one draw under CSV_HEADER (the API has no 2nd-5th prize or auto/manual figures)."""
+    return [
+        f"({data.get('drwNoDate', '')})",
+        f"{data.get('drwNo', '')}회",
+        ", ".join(str(data.get(f"drwtNo{i}")) for i in range(1, 7)),
+        str(data.get("bnusNo", "")),
+        f"{data.get('firstAccumamnt', 0):,}원",
+        data.get("firstPrzwnerCo", 0),
+        f"{data.get('firstWinamnt', 0):,}원",
+        *[""] * 13,
+        f"{data.get('totSellamnt', 0):,}원",
+    ]
+
+
+@contextmanager
+def _file_lock(path):
+    if fcntl is None:
+        yield
+        return
+    with open(f"{path}.lock", "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def last_csv_draw(text):
+    numbers = [int(number) for number in _DRAW_FIELD.findall(text)]
+    return max(numbers) if numbers else 0
+
+
+def append_draws(path, draws):
+    """
+    Appends the draws (source JSON) that the CSV doesn't have yet and returns
+    their numbers. The file is written to a temporary file and swapped in, so
+    the loader never reads a partial row, and a lock file keeps processes
+    (e.g. several uvicorn workers) from writing the same draw twice.
+    """
+    with _file_lock(path):
+        try:
+            with open(path, "r", encoding="utf-8", newline="") as f:
+                text = f.read()
+        except FileNotFoundError:
+            text = ""
+        known = last_csv_draw(text)
+        new = [data for data in draws if int(data["drwNo"]) > known]
+        if not new:
+            return []
+
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        if not text:
+            writer.writerow(CSV_HEADER)
+        elif not text.endswith("\n"):
+            text += "\r\n"  # a missing newline would fuse the next row onto the last one
+        for data in new:
+            writer.writerow(format_row(data))
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8", newline="") as f:
+            f.write(text + buffer.getvalue())
+        os.replace(tmp_path, path)
+    return [int(data["drwNo"]) for data in new]
+
+
+# --- Refresh stages ---
+class StageTimer:
+    """Wall time of the named stages of one refresh run."""
+
+    def __init__(self):
+        self.started_at = time.time()
+        self.started = time.perf_counter()
+        self.stages = {}
+
+    @contextmanager
+    def stage(self, name):
+        started = time.perf_counter()
+        with profiling.section(f"refresh.{name}"):
+            yield
+        self.stages[name] = round((time.perf_counter() - started) * 1000, 1)
+
+    def report(self, previous_version, dataset_version):
+        return {
+            "previous_version": previous_version,
+            "dataset_version": dataset_version,
+            "changed": dataset_version != previous_version,
+            "started_at": timestamp(self.started_at),
+            "total_ms": round((time.perf_counter() - self.started) * 1000, 1),
+            "stages": self.stages,
+        }
+
+
+# --- Scheduler ---
+class RefreshScheduler:
+    """
+    Background thread that waits for the next draw, polls the source for it
+    and hands new draws to `publish`.
+
+    `latest()` returns (draw number, 'YYYY-MM-DD') of the last published draw,
+    (0, None) before the first load; `publish()` runs the backend's refresh
+    pipeline and returns its report.
+    """
+
+    def __init__(self, csv_path, latest, publish, source=None):
+        self.csv_path = csv_path
+        self.latest = latest
+        self.publish = publish
+        self.source = source or DhlotterySource()
+        self.backoff = Backoff()
+        self.state = "stopped"
+        self.polls = 0
+        self.failures = 0
+        self.last_poll_at = None
+        self.next_check_at = None
+        self.last_error = None
+        self.recent = deque(maxlen=RECENT_UPDATES)
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._poll_lock = threading.Lock()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._stop.clear()
+            self.state = "starting"
+            self._thread = threading.Thread(target=self._run, name="refresh-scheduler", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+        self.state = "stopped"
+
+    def poll_now(self):
+        """Makes the running scheduler poll right away, even before the draw is due."""
+        self._wake.set()
+
+    def _sleep(self, seconds):
+        self.next_check_at = time.time() + seconds
+        self._wake.wait(seconds)
+
+    def _run(self):
+        while not self._stop.is_set():
+            _, last_date = self.latest()
+            due = next_draw_due(last_date)
+            now = datetime.now(KST)
+            if now < due and not self._wake.is_set():
+                self.state = "waiting"
+                self._sleep(min((due - now).total_seconds(), IDLE_CHECK_S))
+                continue
+            self._wake.clear()
+            self.state = "polling"
+            try:
+                result = self.poll_once()
+            except Exception as e:
+                print(f"CRITICAL: Draw refresh failed. Error: {e}")
+                self.last_error = f"{type(e).__name__}: {e}"
+                result = {"published": False, "failed": True}
+            if result["published"]:
+                self.backoff.reset()
+            else:
+                overdue = (datetime.now(KST) - due).total_seconds()
+                self._sleep(self.backoff.next(overdue, failed=result["failed"]))
+
+    def poll_once(self):
+        """
+        Fetches every draw after the last published one and publishes them.
+        Returns {"published", "failed", "draws", "report"}.
+        """
+        with self._poll_lock, profiling.section("refresh.poll"):
+            last_draw, _ = self.latest()
+            self.polls += 1
+            self.last_poll_at = time.time()
+            draws, failed = [], False
+            try:
+                while True:
+                    data = self.source.fetch(last_draw + len(draws) + 1)
+                    if data is None:
+                        break
+                    draws.append(data)
+            except (OSError, ValueError) as e:
+                print(f"Error while polling draw {last_draw + len(draws) + 1}: {e}")
+                self.failures += 1
+                self.last_error = f"{type(e).__name__}: {e}"
+                failed = True
+            if not draws:
+                return {"published": False, "failed": failed, "draws": [], "report": None}
+
+            detected_at = time.time()
+            written = append_draws(self.csv_path, draws)
+            report = self.publish()
+            published_at = time.time()
+            published_draw, _ = self.latest()
+            if published_draw <= last_draw:
+                self.failures += 1
+                self.last_error = f"draws {written or [int(data['drwNo']) for data in draws]} were fetched but not published"
+                print(f"CRITICAL: Draw refresh did not publish new draws: {self.last_error}")
+                return {"published": False, "failed": True, "draws": written, "report": report}
+
+            newest = draws[-1]
+            drawn_at = draw_time(newest["drwNoDate"]).timestamp()
+            self.recent.append({
+                "draw": int(newest["drwNo"]),
+                "draws": len(draws),
+                "drawn_at": timestamp(drawn_at),
+                "detected_at": timestamp(detected_at),
+                "published_at": timestamp(published_at),
+                "draw_to_detect_s": round(detected_at - drawn_at, 1),
+                "detect_to_publish_s": round(published_at - detected_at, 3),
+                "draw_to_publish_s": round(published_at - drawn_at, 1),
+                "stages": report["stages"] if report else None,
+            })
+            self.last_error = None
+            return {"published": True, "failed": False, "draws": written, "report": report}
+
+    def freshness(self):
+        last_draw, last_date = self.latest()
+        due = next_draw_due(last_date) if last_date else None
+        lag = (datetime.now(KST) - due).total_seconds() if due is not None else None
+        return {
+            "latest_draw": last_draw or None,
+            "latest_draw_at": draw_time(last_date).isoformat() if last_date else None,
+            "next_draw_due": due.isoformat(timespec="seconds") if due is not None else None,
+            # How long a draw that should be out has been missing from the dashboard.
+            "lag_s": round(max(lag, 0), 1) if lag is not None else None,
+            "last_update": self.recent[-1] if self.recent else None,
+        }
+
+    def status(self):
+        return {
+            "state": self.state,
+            "source": self.source.url if isinstance(self.source, DhlotterySource) else type(self.source).__name__,
+            "draw_time": f"{DRAW_TIME} KST",
+            "polls": self.polls,
+            "failures": self.failures,
+            "last_poll_at": timestamp(self.last_poll_at),
+            "next_check_at": timestamp(self.next_check_at) if self.state in ("waiting", "polling") else None,
+            "poll_delay_s": round(self.backoff.delay, 1) if self.backoff.delay is not None else None,
+            "last_error": self.last_error,
+            "freshness": self.freshness(),
+            "recent_updates": list(self.recent),
+        }
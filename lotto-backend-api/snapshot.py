@@ -0,0 +1,85 @@
+"""
+Versioned static snapshot of everything the dashboard renders.
+
+The Next.js app prerenders its pages from this snapshot (served at
+/api/snapshot, or written to a file at build time), so visitors never wait on
+the backend for data that only changes once a week. When the dataset version
+changes, the frontend is asked to revalidate through FRONTEND_REVALIDATE_URL.
+
+Usage (build time):
+    python snapshot.py --out ../lotto-analyzer-web/data/dashboard-snapshot.json
+"""
+import os
+import json
+import argparse
+import threading
+import urllib.request
+from datetime import datetime
+
+FRONTEND_REVALIDATE_URL = os.environ.get("FRONTEND_REVALIDATE_URL")
+REVALIDATE_SECRET = os.environ.get("REVALIDATE_SECRET", "")
+
+SNAPSHOT_SCHEMA_VERSION = 2
+
+
+def build_snapshot(dataset_version, last_update, sections):
+    """`sections` maps dashboard section names to their JSON payloads."""
+    return {
+        "schema_version": SNAPSHOT_SCHEMA_VERSION,
+        "dataset_version": dataset_version,
+        "generated_at": datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        "last_update": last_update,
+        **sections,
+    }
+
+
+def write_snapshot(snapshot, path):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(snapshot, f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(tmp_path, path)
+
+
+def notify_frontend(dataset_version):
+    """Asks the Next.js app to revalidate its prerendered pages (no-op when not configured)."""
+    if not FRONTEND_REVALIDATE_URL:
+        return None
+
+    def post():
+        request = urllib.request.Request(
+            FRONTEND_REVALIDATE_URL,
+            data=json.dumps({"dataset_version": dataset_version}).encode(),
+            headers={"Content-Type": "application/json", "x-revalidate-secret": REVALIDATE_SECRET},
+            method="POST",
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=10) as response:
+                print(f"Requested frontend revalidation for dataset {dataset_version}: HTTP {response.status}")
+        except Exception as e:
+            print(f"Error while requesting frontend revalidation: {e}")
+
+    thread = threading.Thread(target=post, daemon=True)
+    thread.start()
+    return thread
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write the dashboard snapshot JSON.")
+    parser.add_argument("--out", required=True, help="Output file path")
+    parser.add_argument("--csv", help="lotto_history.csv to read (default: backend setting)")
+    args = parser.parse_args()
+
+    import main as backend
+
+    if args.csv:
+        backend.LOTTO_HISTORY_FILE = args.csv
+    backend.load_and_analyze_data()
+    if not len(backend.draw_table):
+        raise SystemExit("No draws were loaded; snapshot not written.")
+    write_snapshot(backend.analysis.get("snapshot"), args.out)
+    print(f"Wrote dashboard snapshot {backend.dataset_version} to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
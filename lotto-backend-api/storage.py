@@ -0,0 +1,216 @@
+import os
+import sqlite3
+import threading
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet export is skipped when pyarrow is not installed
+    pa = None
+    pq = None
+
+# --- Export targets ---
+DRAWS_DB_FILE = os.environ.get("LOTTO_DRAWS_DB", "lotto_draws.sqlite")
+DRAWS_PARQUET_FILE = os.environ.get("LOTTO_DRAWS_PARQUET", "lotto_draws.parquet")
+
+PRIZE_TIERS = range(1, 6)
+
+# (column name, SQLite type, Arrow type name)
+DRAW_COLUMNS = (
+    [("draw_no", "INTEGER PRIMARY KEY", "int32"), ("draw_date", "TEXT", "string")]
+    + [(f"n{i}", "INTEGER NOT NULL", "int8") for i in range(1, 7)]
+    + [
+        ("bonus", "INTEGER", "int8"),
+        ("sum", "INTEGER NOT NULL", "int16"),
+        ("odd_count", "INTEGER NOT NULL", "int8"),
+        ("low_count", "INTEGER NOT NULL", "int8"),
+    ]
+    + [
+        column
+        for tier in PRIZE_TIERS
+        for column in (
+            (f"prize{tier}_total", "INTEGER", "int64"),
+            (f"prize{tier}_winners", "INTEGER", "int64"),
+            (f"prize{tier}_each", "INTEGER", "int64"),
+        )
+    ]
+    + [("total_sales", "INTEGER", "int64")]
+)
+DRAW_COLUMN_NAMES = [name for name, _, _ in DRAW_COLUMNS]
+
+# Columns that /api/query/draws may sort by.
+SORTABLE_COLUMNS = {"draw_no", "draw_date", "sum", "odd_count", "low_count", "bonus", "prize1_each", "prize1_winners", "total_sales"}
+
+_connection = None
+_connection_path = None
+_connection_lock = threading.Lock()
+
+
+def compute_dataset_version(table):
+    """Short content hash of the cleaned draws; changes whenever any draw changes."""
+    return table.content_hash()[:12]
+
+
+# --- Export ---
+def export_sqlite(table, dataset_version, path=DRAWS_DB_FILE):
+    """
+    Writes the draws into an indexed SQLite database. The file is built next to
+    the target and swapped in with os.replace so readers never see a partial file.
+    """
+    tmp_path = f"{path}.tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+
+    conn = sqlite3.connect(tmp_path)
+    try:
+        column_defs = ", ".join(f"{name} {sql_type}" for name, sql_type, _ in DRAW_COLUMNS)
+        conn.execute(f"CREATE TABLE draws ({column_defs})")
+        # One row per (draw, number) so contains-number filters are index lookups.
+        conn.execute("CREATE TABLE draw_numbers (number INTEGER NOT NULL, draw_no INTEGER NOT NULL, PRIMARY KEY (number, draw_no)) WITHOUT ROWID")
+        conn.execute("CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT)")
+
+        placeholders = ", ".join("?" for _ in DRAW_COLUMN_NAMES)
+        conn.executemany(
+            f"INSERT INTO draws ({', '.join(DRAW_COLUMN_NAMES)}) VALUES ({placeholders})",
+            zip(*(table.column(name) for name in DRAW_COLUMN_NAMES)),
+        )
+        conn.executemany(
+            "INSERT INTO draw_numbers (number, draw_no) VALUES (?, ?)",
+            ((num, draw_no) for draw_no, nums in zip(table.column("draw_no"), table.numbers.tolist()) for num in nums),
+        )
+        for column in ("draw_date", "sum", "odd_count", "low_count", "bonus"):
+            conn.execute(f"CREATE INDEX idx_draws_{column} ON draws ({column})")
+        conn.execute("INSERT INTO meta (key, value) VALUES ('dataset_version', ?), ('draw_count', ?)", (dataset_version, str(len(table))))
+        conn.commit()
+        conn.execute("ANALYZE")
+    except Exception:
+        conn.close()
+        os.remove(tmp_path)
+        raise
+    conn.close()
+    os.replace(tmp_path, path)
+
+
+def export_parquet(table, path=DRAWS_PARQUET_FILE):
+    """Writes the draws as a Parquet file. Returns False when pyarrow is unavailable."""
+    if pa is None:
+        print("WARNING: pyarrow is not installed. Skipping Parquet export.")
+        return False
+
+    schema = pa.schema([(name, getattr(pa, arrow_type)()) for name, _, arrow_type in DRAW_COLUMNS])
+    columns = {name: table.column(name) for name in DRAW_COLUMN_NAMES}
+    arrow_table = pa.Table.from_pydict(columns, schema=schema)
+    tmp_path = f"{path}.tmp"
+    pq.write_table(arrow_table, tmp_path, compression="zstd")
+    os.replace(tmp_path, path)
+    return True
+
+
+def staged_path(path, dataset_version):
+    return f"{path}.{dataset_version}"
+
+
+def export_draws(table, dataset_version):
+    """
+    Writes both exports next to their targets under version-suffixed names,
+    leaving the served files and connection alone until activate().
+    """
+    export_sqlite(table, dataset_version, staged_path(DRAWS_DB_FILE, dataset_version))
+    export_parquet(table, staged_path(DRAWS_PARQUET_FILE, dataset_version))
+
+
+def activate(dataset_version):
+    """
+    Moves the exports of `dataset_version` over the served files and switches
+    queries to a connection on the new database. Returns False when nothing was
+    exported for that version.
+    """
+    global _connection, _connection_path
+
+    staged_db = staged_path(DRAWS_DB_FILE, dataset_version)
+    if not os.path.exists(staged_db):
+        return False
+    with _connection_lock:
+        os.replace(staged_db, DRAWS_DB_FILE)
+        staged_parquet = staged_path(DRAWS_PARQUET_FILE, dataset_version)
+        if os.path.exists(staged_parquet):
+            os.replace(staged_parquet, DRAWS_PARQUET_FILE)
+        # Not closed: a query still running on the old connection keeps reading
+        # the replaced file, which goes away with its last reference.
+        _connection = None
+        _get_connection(DRAWS_DB_FILE)
+    return True
+
+
+def discard(dataset_version):
+    """Deletes the exports of `dataset_version` that will not be activated."""
+    for path in (DRAWS_DB_FILE, DRAWS_PARQUET_FILE):
+        staged = staged_path(path, dataset_version)
+        if os.path.exists(staged):
+            os.remove(staged)
+
+
+# --- Query ---
+def _get_connection(path=DRAWS_DB_FILE):
+    global _connection, _connection_path
+    conn = _connection
+    if conn is None or _connection_path != path:
+        if not os.path.exists(path):
+            raise FileNotFoundError(path)
+        # The event loop and threadpool may both query; the connection is read-only.
+        conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        _connection, _connection_path = conn, path
+    return conn
+
+
+def query_draws(
+    date_from=None, date_to=None,
+    draw_from=None, draw_to=None,
+    sum_min=None, sum_max=None,
+    odd_count=None, low_count=None,
+    contains=None,
+    sort_by="draw_no", order="desc",
+    limit=50, offset=0,
+    path=DRAWS_DB_FILE,
+):
+    """
+    Runs a filtered, sorted and paginated query against the exported SQLite
+    database. Returns {"total": int, "draws": [dict, ...]}.
+    """
+    if sort_by not in SORTABLE_COLUMNS:
+        raise ValueError(f"정렬할 수 없는 컬럼입니다: {sort_by}")
+    if order not in ("asc", "desc"):
+        raise ValueError(f"order는 asc 또는 desc여야 합니다: {order}")
+
+    clauses, params = [], []
+    for column, op, value in (
+        ("draw_date", ">=", date_from), ("draw_date", "<=", date_to),
+        ("draw_no", ">=", draw_from), ("draw_no", "<=", draw_to),
+        ("sum", ">=", sum_min), ("sum", "<=", sum_max),
+        ("odd_count", "=", odd_count), ("low_count", "=", low_count),
+    ):
+        if value is not None:
+            clauses.append(f"{column} {op} ?")
+            params.append(value)
+
+    if contains:
+        numbers = sorted(set(contains))
+        if any(not 1 <= n <= 45 for n in numbers):
+            raise ValueError("번호는 1에서 45 사이여야 합니다.")
+        marks = ", ".join("?" for _ in numbers)
+        clauses.append(
+            f"draw_no IN (SELECT draw_no FROM draw_numbers WHERE number IN ({marks}) "
+            f"GROUP BY draw_no HAVING COUNT(*) = ?)"
+        )
+        params.extend(numbers)
+        params.append(len(numbers))
+
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    conn = _get_connection(path)
+    total = conn.execute(f"SELECT COUNT(*) FROM draws {where}", params).fetchone()[0]
+    rows = conn.execute(
+        f"SELECT * FROM draws {where} ORDER BY {sort_by} {order}, draw_no {order} LIMIT ? OFFSET ?",
+        params + [limit, offset],
+    ).fetchall()
+    return {"total": total, "draws": [dict(row) for row in rows]}
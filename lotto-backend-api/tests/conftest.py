@@ -0,0 +1,34 @@
+import os
+import shutil
+import sys
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+REPO_CSV = os.path.join(os.path.dirname(BACKEND_DIR), "lotto_history.csv")
+
+sys.path.insert(0, BACKEND_DIR)
+# Module-level settings are read at import time; keep tests off the network.
+os.environ.setdefault("LOTTO_REFRESH_SCHEDULER", "0")
+
+
+@pytest.fixture(scope="session")
+def data_dir(tmp_path_factory):
+    """Working directory holding a copy of the repository's draw history."""
+    path = tmp_path_factory.mktemp("data")
+    shutil.copy(REPO_CSV, path / "lotto_history.csv")
+    return path
+
+
+@pytest.fixture(scope="session")
+def client(data_dir):
+    from fastapi.testclient import TestClient
+
+    cwd = os.getcwd()
+    os.chdir(data_dir)
+    try:
+        import main
+        with TestClient(main.app) as test_client:
+            yield test_client
+    finally:
+        os.chdir(cwd)
@@ -0,0 +1,65 @@
+import json
+
+import main
+import patterns
+
+
+def test_patterns_count_draws_on_both_paths(client):
+    full = client.get("/api/analysis/patterns").json()
+    windowed = client.get("/api/analysis/patterns", params={"from_draw": 1}).json()
+    assert full["total_draws"] == windowed["total_draws"] == windowed["range"]["draws"]
+    assert full["consecutive_stats"] == windowed["consecutive_stats"]
+
+
+def test_timeseries_labels_are_draw_numbers(client):
+    full = client.get("/api/analysis/timeseries").json()
+    windowed = client.get("/api/analysis/timeseries", params={"from_draw": 1}).json()
+    assert [row["name"] for row in full] == [row["name"] for row in windowed]
+    draws = client.get("/api/query/draws", params={"limit": 1000}).json()["draws"]
+    known = {f"{row['draw_no']}회" for row in draws}
+    assert {row["name"] for row in full} <= known
+
+
+def test_malformed_dates_are_rejected(client):
+    for url, params in (
+        ("/api/analysis/patterns", {"since": "2025-13-01"}),
+        ("/api/analysis/frequency", {"since": "last week"}),
+        ("/api/query/draws", {"date_from": "2025/01/01"}),
+        ("/api/query/draws", {"date_to": "yesterday"}),
+    ):
+        response = client.get(url, params=params)
+        assert response.status_code == 400, (url, params, response.status_code)
+
+
+def test_valid_dates_are_normalized(client):
+    response = client.get("/api/query/draws", params={"date_from": "2025-1-4", "limit": 1000})
+    assert response.status_code == 200
+    assert all(row["draw_date"] >= "2025-01-04" for row in response.json()["draws"])
+
+
+def test_windowed_rankings_break_ties_like_full_history(client):
+    full = client.get("/api/analysis/frequency").json()
+    windowed = client.get("/api/analysis/frequency", params={"from_draw": 1}).json()
+    assert {key: windowed[key] for key in full} == full
+    full_pairs = client.get("/api/analysis/cooccurrence").json()
+    assert client.get("/api/analysis/cooccurrence", params={"from_draw": 1}).json() == full_pairs
+    # The small history leaves plenty of tied counts for the order to matter.
+    counts = [row["count"] for row in full_pairs]
+    assert len(set(counts)) < len(counts)
+    for number in (1, 27, 45):
+        params = {"number": number}
+        assert client.get("/api/analysis/cooccurrence", params={**params, "from_draw": 1}).json() == \
+            client.get("/api/analysis/cooccurrence", params=params).json()
+
+
+def test_windowed_pattern_features_match_a_scan_of_the_window(client):
+    values = main.analysis.get("pattern_features")
+    histograms = main.analysis.get("pattern_histograms")
+    size = len(values["sum"])
+    for lo, hi in ((0, size - 1), (0, 9), (size // 3, size // 2), (size - 1, size - 1)):
+        scanned = patterns.FEATURES.summarize({name: column[lo:hi + 1] for name, column in values.items()})
+        # Compared serialized: the order of top_patterns is part of the answer.
+        assert json.dumps(histograms.summarize(lo, hi, patterns.TOP_PATTERNS)) == json.dumps(scanned), (lo, hi)
+    full = client.get("/api/analysis/patterns").json()
+    windowed = client.get("/api/analysis/patterns", params={"from_draw": 1}).json()
+    assert json.dumps(windowed["features"]) == json.dumps(full["features"])
@@ -0,0 +1,122 @@
+import itertools
+import time
+
+import numpy as np
+import pytest
+
+import exclusions
+from exclusions import HistoryFilter, IssuedTickets
+
+
+class Table:
+    """The slice of DrawTable HistoryFilter reads."""
+
+    def __init__(self, rows):
+        self.numbers = np.array(rows, dtype=np.int64).reshape(-1, 6)
+
+    def __len__(self):
+        return len(self.numbers)
+
+
+def test_history_filter_excludes_winners_and_near_matches():
+    history = HistoryFilter(Table([[1, 2, 3, 4, 5, 6], [10, 20, 30, 40, 41, 42]]), near_matches=5)
+    assert not history.allows([6, 5, 4, 3, 2, 1])
+    assert not history.allows([1, 2, 3, 4, 5, 7])
+    assert history.allows([1, 2, 3, 4, 7, 8])
+    assert history.first_allowed([1, 2, 3, 4, 5, 6, 7, 8, 9]) == [1, 2, 3, 4, 7, 8]
+    assert history.fallbacks == 0
+
+
+@pytest.mark.parametrize("near_matches", [0, 1, 2, 3, 6, 7])
+def test_near_matches_range(near_matches):
+    with pytest.raises(ValueError):
+        HistoryFilter(Table([[1, 2, 3, 4, 5, 6]]), near_matches=near_matches)
+
+
+def test_exhausted_scan_falls_back_to_top_ranked():
+    history = HistoryFilter(Table([[1, 2, 3, 4, 5, 6]]), near_matches=4, max_candidates=500)
+    # Every 4-subset is "seen", so no ticket is allowed.
+    history.near = {exclusions.pack(subset) for subset in itertools.combinations(range(1, 46), 4)}
+    ranked = list(range(45, 0, -1))
+    started = time.perf_counter()
+    assert history.first_allowed(ranked) == [40, 41, 42, 43, 44, 45]
+    assert time.perf_counter() - started < 1
+    assert history.fallbacks == 1
+    assert history.stats()["fallbacks"] == 1
+
+
+def test_short_ranking_falls_back_without_error():
+    history = HistoryFilter(Table([[1, 2, 3, 4, 5, 6]]))
+    assert history.first_allowed([6, 5, 4, 3, 2, 1]) == [1, 2, 3, 4, 5, 6]
+    assert history.fallbacks == 1
+
+
+def test_snapshot_carries_no_tickets(client):
+    sum_based = client.get("/api/snapshot").json()["sum_based"]
+    assert set(sum_based) == {"top_5_frequent_sums", "fixed_sum_ranges"}
+    assert all(set(item) == {"sum", "count"} for item in sum_based["top_5_frequent_sums"])
+    assert sum_based["fixed_sum_ranges"]["low_sum"] == {"range": "60-90"}
+
+    first = client.get("/api/recommendations/sum-based").json()
+    second = client.get("/api/recommendations/sum-based").json()
+    tickets = [
+        tuple(rec["recommendation"])
+        for payload in (first, second)
+        for rec in list(payload["fixed_sum_recommendations"].values()) + payload["top_5_frequent_sums"]
+        if isinstance(rec["recommendation"], list)
+    ]
+    assert len(tickets) == len(set(tickets)) > 0
+
+
+def random_keys(count, seed):
+    rng = np.random.default_rng(seed)
+    return [exclusions.pack(row) for row in (np.argsort(rng.random((count, 45)), axis=1)[:, :6] + 1).tolist()]
+
+
+def test_bloom_has_no_false_negatives_and_bounded_false_positives():
+    bloom = exclusions.BloomFilter(5000, error_rate=0.01)
+    added = set(random_keys(5000, seed=1))
+    for key in added:
+        bloom.add(key)
+    assert all(key in bloom for key in added)
+    probes = [key for key in random_keys(20000, seed=2) if key not in added]
+    false_positive_rate = sum(key in bloom for key in probes) / len(probes)
+    assert false_positive_rate < 0.02
+
+
+def test_claim_once():
+    issued = IssuedTickets(scope="global", capacity=100)
+    assert issued.claim([1, 2, 3, 4, 5, 6])
+    assert not issued.claim([6, 5, 4, 3, 2, 1])
+    assert issued.claim([1, 2, 3, 4, 5, 7])
+    assert issued.stats()["issued"] == 2 and issued.stats()["rejected"] == 1
+
+
+def test_claims_are_per_client_in_client_scope():
+    issued = IssuedTickets(scope="client", client_capacity=100, max_clients=2)
+    ticket = [3, 9, 17, 24, 38, 41]
+    assert issued.claim(ticket, "a")
+    assert issued.claim(ticket, "b")
+    assert not issued.claim(ticket, "a")
+    assert issued.claim(ticket, "c")  # evicts "b", the least recently used client
+    assert issued.claim(ticket, "b")
+    assert issued.stats()["clients"] == 2
+
+
+def test_generation_rollover_keeps_the_last_capacity_tickets():
+    capacity = 200
+    issued = IssuedTickets(scope="global", capacity=capacity, error_rate=0.001)
+    keys = list(dict.fromkeys(random_keys(5 * capacity, seed=3)))
+    tickets = [exclusions.unpack(key) for key in keys[:3 * capacity]]
+    for ticket in tickets:
+        assert issued.claim(ticket)
+    generations = issued._global
+    assert generations.current.count == capacity and generations.previous.count == capacity
+    # The last `capacity` tickets are always remembered; the oldest generation is gone.
+    assert all(not issued.claim(ticket) for ticket in tickets[-capacity:])
+    forgotten = sum(issued.claim(ticket) for ticket in tickets[:capacity])
+    assert forgotten >= capacity * 0.95
+    bytes_before = issued.stats()["bytes"]
+    for key in keys[3 * capacity:]:
+        issued.claim(exclusions.unpack(key))
+    assert issued.stats()["bytes"] == bytes_before
@@ -0,0 +1,104 @@
+import ingest
+
+HEADER = (
+    "추첨일,회차,당첨번호,보너스번호,"
+    + ",".join(csv_name for _, csv_name in ingest.MONEY_COLUMNS[:-1])
+    + ",자동/반자동/수동,총판매금액"
+)
+MONEY = ',"1,000원",1,"1,000원"' * 5 + ',,"9,000원"'
+
+
+def row(draw_no, numbers="1, 2, 3, 4, 5, 6", bonus=7, day=None, money=MONEY):
+    day = day or f"(2025-01-{draw_no:02d})"
+    return f'{day},{draw_no}회,"{numbers}",{bonus}{money}'
+
+
+def ingest_lines(tmp_path, lines, newline="\n"):
+    path = tmp_path / "history.csv"
+    path.write_bytes((newline.join([HEADER] + lines) + newline).encode("utf-8"))
+    table, report = ingest.ingest_csv(str(path))
+    return table, report.to_dict()
+
+
+def test_clean_file(tmp_path):
+    table, report = ingest_lines(tmp_path, [row(1), row(2), row(3)])
+    assert table.draw_numbers.tolist() == [1, 2, 3]
+    assert (report["lines"], report["records"], report["accepted"]) == (4, 3, 3)
+    assert report["fixed_count"] == report["rejected_count"] == report["missing_count"] == 0
+
+
+def test_crlf_line_endings(tmp_path):
+    table, report = ingest_lines(tmp_path, [row(1), row(2), row(3)], newline="\r\n")
+    assert table.draw_numbers.tolist() == [1, 2, 3]
+    assert report["accepted"] == 3
+    assert report["fixed_count"] == report["rejected_count"] == 0
+    assert table.money["total_sales"][0] == 9000
+
+
+def test_fused_line_with_quoted_tail(tmp_path):
+    table, report = ingest_lines(tmp_path, [row(1), row(2) + row(3), row(4)])
+    assert table.draw_numbers.tolist() == [1, 2, 3, 4]
+    assert report["lines"] == 4
+    assert (report["records"], report["accepted"], report["rejected_count"]) == (4, 4, 0)
+    assert report["fixed_count"] == 2
+    assert all(fix["fixes"] == ["split_fused_line"] for fix in report["fixed"])
+
+
+def test_fused_line_with_unquoted_tail(tmp_path):
+    unquoted = row(2, money=",0원,0,0원" * 5 + ",,9000")
+    table, report = ingest_lines(tmp_path, [row(1), unquoted + row(3)], newline="\r\n")
+    assert table.draw_numbers.tolist() == [1, 2, 3]
+    assert (report["records"], report["accepted"], report["fixed_count"]) == (3, 3, 2)
+    assert table.money["total_sales"][1] == 9000
+
+
+def test_record_split_over_two_lines(tmp_path):
+    first, rest = row(2).split('"1, 2, 3')
+    table, report = ingest_lines(tmp_path, [row(1), first + '"1, 2, 3', rest, row(3)])
+    assert table.draw_numbers.tolist() == [1, 2, 3]
+    assert (report["records"], report["accepted"], report["fixed_count"]) == (3, 3, 1)
+    assert "joined_split_line" in report["fixed"][0]["fixes"]
+
+
+def test_truncated_rows(tmp_path):
+    padded = row(2, money=',"1,000원",1')
+    table, report = ingest_lines(tmp_path, [row(1), padded, "(2025-01-03),3회", row(4), "(2025-01-05),5회"])
+    assert table.draw_numbers.tolist() == [1, 2, 4]
+    assert report["fixed"] == [{"line": 3, "draw_no": 2, "fixes": ["padded_missing_columns"]}]
+    assert [(r["line"], r["reason"]) for r in report["rejected"]] == [(4, "truncated_record"), (6, "truncated_record")]
+    assert (report["records"], report["accepted"], report["rejected_count"]) == (5, 3, 2)
+    assert report["missing_draws"] == [[3, 3]]
+    assert report["rows_with_empty_money_columns"] == 1
+
+
+def test_bad_numbers_are_rejected(tmp_path):
+    lines = [
+        row(1),
+        row(2, numbers="1, 2, 3, 4, 5, 46"),
+        row(3, numbers="1, 1, 2, 3, 4, 5"),
+        row(4, numbers="1, 2, 3, 4, 5"),
+        row(5, numbers="1, 2, x, 4, 5, 6"),
+        row(6, bonus=6),
+        row(7, bonus=0),
+        row(8, day="(2025-02-30)"),
+        row(9).replace("9회", "제9회"),
+        row(10, day="(2025- 1- 10)"),
+    ]
+    table, report = ingest_lines(tmp_path, lines)
+    assert table.draw_numbers.tolist() == [1, 10]
+    reasons = [(r["draw_no"], r["reason"]) for r in report["rejected"]]
+    assert reasons == [
+        (2, "invalid_numbers"), (3, "invalid_numbers"), (4, "invalid_numbers"), (5, "invalid_numbers"),
+        (6, "invalid_bonus"), (7, "invalid_bonus"), (8, "invalid_date"), (None, "invalid_draw_number"),
+    ]
+    assert (report["records"], report["accepted"], report["rejected_count"]) == (10, 2, 8)
+    assert report["normalized_dates"] == 1
+    assert report["missing_draws"] == [[2, 9]]
+
+
+def test_duplicates(tmp_path):
+    lines = [row(1), row(2), row(2), row(2, numbers="7, 8, 9, 10, 11, 12", bonus=13)]
+    table, report = ingest_lines(tmp_path, lines)
+    assert table.draw_numbers.tolist() == [1, 2]
+    assert report["fixed"] == [{"line": 4, "draw_no": 2, "fixes": ["dropped_duplicate"]}]
+    assert [(r["draw_no"], r["reason"]) for r in report["rejected"]] == [(2, "conflicting_duplicate")]
@@ -0,0 +1,126 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from starlette.concurrency import run_in_threadpool
+
+import profiling
+
+SPIN_S = 0.15
+
+
+def spin_in_worker():
+    deadline = time.perf_counter() + SPIN_S
+    while time.perf_counter() < deadline:
+        pass
+    return "done"
+
+
+def burn(seconds):
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+
+# The loop endpoints burn CPU in slices longer than the GIL switch interval,
+# yielding between slices so that two concurrent requests interleave.
+async def spin_on_loop_a():
+    deadline = time.perf_counter() + SPIN_S
+    while time.perf_counter() < deadline:
+        burn(0.01)
+        await asyncio.sleep(0)
+
+
+async def spin_on_loop_b():
+    deadline = time.perf_counter() + SPIN_S
+    while time.perf_counter() < deadline:
+        burn(0.01)
+        await asyncio.sleep(0)
+
+
+def build_app():
+    app = FastAPI()
+    app.add_middleware(profiling.ProfilingMiddleware)
+
+    @app.get("/threadpool")
+    async def threadpool():
+        return await run_in_threadpool(profiling.bind(spin_in_worker))
+
+    @app.get("/sectioned")
+    async def sectioned():
+        def work():
+            with profiling.section("test.work"):
+                return spin_in_worker()
+        return await run_in_threadpool(profiling.bind(work))
+
+    @app.get("/loop/a")
+    async def loop_a():
+        await spin_on_loop_a()
+
+    @app.get("/loop/b")
+    async def loop_b():
+        await spin_on_loop_b()
+
+    return app
+
+
+@pytest.fixture
+def profiled():
+    before = profiling.settings()
+    profiling.clear()
+    profiling.configure(enabled=True, sample_rate=1.0, slow_ms=0)
+    yield
+    profiling.configure(enabled=before["enabled"], sample_rate=before["sample_rate"], slow_ms=before["slow_ms"])
+    profiling.clear()
+
+
+def profile_for(path):
+    matches = [profile for profile in profiling.all_profiles() if profile.path == path]
+    assert len(matches) == 1, [profile.path for profile in profiling.all_profiles()]
+    return matches[0]
+
+
+def frames_of(profile):
+    return {frame.split(" (")[0] for stack in profile.stacks for frame in stack.split(";")}
+
+
+def test_threadpool_frames_are_sampled(profiled):
+    with TestClient(build_app()) as client:
+        assert client.get("/threadpool").json() == "done"
+    profile = profile_for("/threadpool")
+    assert "spin_in_worker" in frames_of(profile)
+    worker_samples = sum(count for stack, count in profile.stacks.items() if "spin_in_worker" in stack)
+    assert worker_samples >= sum(profile.stacks.values()) // 2
+
+
+def test_sections_in_threadpool_reach_the_request(profiled):
+    with TestClient(build_app()) as client:
+        client.get("/sectioned")
+    profile = profile_for("/sectioned")
+    assert [name for name, _, _ in profile.sections] == ["test.work"]
+    assert "spin_in_worker" in frames_of(profile)
+    assert not profiling._sampler._attached
+
+
+def test_concurrent_requests_keep_their_own_stacks(profiled):
+    async def run():
+        transport = httpx.ASGITransport(app=build_app())
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            await asyncio.gather(client.get("/loop/a"), client.get("/loop/b"))
+
+    asyncio.run(run())
+    frames_a = frames_of(profile_for("/loop/a"))
+    frames_b = frames_of(profile_for("/loop/b"))
+    assert "spin_on_loop_a" in frames_a and "spin_on_loop_b" not in frames_a
+    assert "spin_on_loop_b" in frames_b and "spin_on_loop_a" not in frames_b
+
+
+def test_constrained_endpoint_records_solver_sections(client, profiled):
+    response = client.get("/api/recommendations/constrained", params={"min_sum": 100, "max_sum": 140, "count": 3})
+    assert response.status_code == 200
+    profile = profile_for("/api/recommendations/constrained")
+    assert "solver.count" in [name for name, _, _ in profile.sections]
+    assert profile.frame is None
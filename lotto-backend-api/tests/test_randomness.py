@@ -0,0 +1,26 @@
+import main
+import randomness
+
+
+def test_window_starts_end_at_the_latest_draw(client):
+    tests = main.analysis.get("randomness")
+    starts = tests.window_starts(30, 20)
+    assert starts[0] == 0 and starts[-1] == tests.size - 30
+    assert (starts[1:] > starts[:-1]).all()
+    assert len(tests.window_starts(tests.size + 1, 1)) == 0
+
+
+def test_custom_windows_are_evaluated(client):
+    response = client.get("/api/analysis/randomness", params={"window": 30, "step": 20})
+    assert response.status_code == 200
+    body = response.json()
+    assert (body["window"], body["step"]) == (30, 20)
+    assert len(body["windows"]) == len(main.analysis.get("randomness").window_starts(30, 20))
+
+
+def test_too_many_windows_are_rejected(client):
+    size = main.analysis.get("randomness").size
+    window = randomness.MIN_WINDOW
+    assert size - window + 1 > randomness.MAX_WINDOWS
+    response = client.get("/api/analysis/randomness", params={"window": window, "step": 1})
+    assert response.status_code == 400
@@ -0,0 +1,99 @@
+import os
+import shutil
+
+import pytest
+
+import main
+import storage
+
+
+@pytest.fixture
+def history(client, data_dir):
+    """The served CSV; restored (and republished) after the test."""
+    path = data_dir / "lotto_history.csv"
+    backup = data_dir / "lotto_history.csv.bak"
+    shutil.copy(path, backup)
+    yield path
+    os.replace(backup, path)
+    main.refresh_data()
+
+
+def drop_last_draw(path):
+    lines = path.read_text(encoding="utf-8-sig").splitlines(keepends=True)
+    path.write_text("".join(lines[:-1]), encoding="utf-8")
+
+
+def served_draw_count(client):
+    response = client.get("/api/query/draws", params={"limit": 1})
+    assert response.status_code == 200
+    return response.json()["total"]
+
+
+def test_storage_export_is_staged_until_publish(client, history, data_dir, monkeypatch):
+    before = served_draw_count(client)
+    served_file = data_dir / storage.DRAWS_DB_FILE
+    served_inode = served_file.stat().st_ino
+    seen_while_staging = []
+    export_draws = storage.export_draws
+
+    def export_and_check(table, version):
+        export_draws(table, version)
+        # Staged: the served file and connection are untouched and still answer for the old version.
+        seen_while_staging.append((served_file.stat().st_ino, served_draw_count(client), main.dataset_version != version))
+
+    monkeypatch.setattr(storage, "export_draws", export_and_check)
+    drop_last_draw(history)
+    report = main.refresh_data()
+
+    assert report["changed"]
+    assert seen_while_staging == [(served_inode, before, True)]
+    assert served_draw_count(client) == before - 1
+    assert served_file.stat().st_ino != served_inode
+    assert not [name for name in os.listdir(data_dir) if name.startswith(f"{storage.DRAWS_DB_FILE}.")]
+
+
+@pytest.fixture
+def notified(monkeypatch):
+    versions = []
+    monkeypatch.setattr(main.snapshot, "notify_frontend", versions.append)
+    return versions
+
+
+def test_new_data_notifies_the_frontend_once(history, notified):
+    drop_last_draw(history)
+    report = main.refresh_data()
+    assert report["changed"]
+    assert notified == [main.dataset_version]
+
+
+def test_unchanged_data_does_not_notify(client, notified):
+    report = main.refresh_data()
+    assert not report["changed"]
+    assert notified == []
+
+
+def test_first_load_does_not_notify(client, notified, monkeypatch):
+    monkeypatch.setattr(main, "dataset_version", None)
+    monkeypatch.setattr(main, "draw_table", main.ingest.DrawTable.empty())
+    report = main.refresh_data()
+    assert report["changed"]
+    assert notified == []
+
+
+def test_superseded_lazy_export_is_discarded(client, data_dir, monkeypatch):
+    # Waits for a warm-up still exporting this version, which would share its temporary file.
+    main.analysis.get("storage_export")
+    served_file = data_dir / storage.DRAWS_DB_FILE
+    served_inode = served_file.stat().st_ino
+    export_draws = storage.export_draws
+
+    def export_then_supersede(table, version):
+        export_draws(table, version)
+        # A newer dataset is published while the lazy export for the served one runs.
+        monkeypatch.setattr(main, "dataset_version", "newer")
+
+    monkeypatch.setattr(storage, "export_draws", export_then_supersede)
+    main.build_storage_export(main.draw_table, main.dataset_version)
+
+    assert served_file.stat().st_ino == served_inode
+    assert not [name for name in os.listdir(data_dir) if name.startswith((f"{storage.DRAWS_DB_FILE}.", f"{storage.DRAWS_PARQUET_FILE}."))]
@@ -0,0 +1,142 @@
+from itertools import chain, combinations
+
+import numpy as np
+import pytest
+
+import ticket_solver
+from ticket_solver import TicketPool, TicketSolver, TicketSpec
+
+TOTAL_TICKETS = 8145060
+
+SPECS = {
+    "unconstrained": TicketSpec(),
+    "sum_odd_low": TicketSpec.from_ranges(min_sum=100, max_sum=140, min_odd=2, max_odd=4, max_low=3),
+    "include_exclude_no_consecutive": TicketSpec(include={7, 30}, exclude={8, 9, 31}, no_consecutive=True),
+    "span_low": TicketSpec.from_ranges(min_span=10, max_span=20, min_low=1),
+    "tight_sum_span": TicketSpec.from_ranges(min_sum=60, max_sum=70, max_span=15, min_odd=5),
+    "empty_sum": TicketSpec(max_sum=20),
+    "empty_consecutive": TicketSpec(include={1, 2}, no_consecutive=True),
+    "empty_span": TicketSpec(include={1, 45}, max_span=30),
+    "lowest_only": TicketSpec(max_sum=21),
+    "highest_only": TicketSpec(min_sum=255),
+    "included_six": TicketSpec(include={3, 9, 17, 24, 38, 41}),
+}
+
+
+@pytest.fixture(scope="module")
+def combos():
+    """Every ticket as rows of a (8145060, 6) array, each row ascending."""
+    flat = np.fromiter(chain.from_iterable(combinations(range(1, 46), 6)), dtype=np.int8, count=TOTAL_TICKETS * 6)
+    return flat.reshape(-1, 6)
+
+
+def member_table(numbers):
+    table = np.zeros(46, dtype=np.int8)
+    table[list(numbers)] = 1
+    return table
+
+
+def brute_force_mask(combos, spec):
+    sums = combos.sum(axis=1, dtype=np.int32)
+    mask = (sums >= spec.min_sum) & (sums <= spec.max_sum)
+    for _, members, lo, hi in spec.subsets:
+        inside = member_table(members)[combos].sum(axis=1)
+        mask &= (inside >= lo) & (inside <= hi)
+    if spec.include:
+        mask &= member_table(spec.include)[combos].sum(axis=1) == len(spec.include)
+    if spec.exclude:
+        mask &= ~member_table(spec.exclude)[combos].any(axis=1)
+    if spec.no_consecutive:
+        mask &= ~(np.diff(combos, axis=1) == 1).any(axis=1)
+    span = combos[:, -1] - combos[:, 0]
+    if spec.min_span is not None:
+        mask &= span >= spec.min_span
+    if spec.max_span is not None:
+        mask &= span <= spec.max_span
+    return mask
+
+
+@pytest.mark.parametrize("name", sorted(SPECS))
+def test_count_matches_brute_force(combos, name):
+    spec = SPECS[name]
+    assert TicketSolver().count(spec) == int(brute_force_mask(combos, spec).sum())
+
+
+def test_known_counts():
+    solver = TicketSolver()
+    assert solver.count(SPECS["unconstrained"]) == TOTAL_TICKETS
+    for name in ("empty_sum", "empty_consecutive", "empty_span"):
+        assert solver.count(SPECS[name]) == 0
+    for name in ("lowest_only", "highest_only", "included_six"):
+        assert solver.count(SPECS[name]) == 1
+
+
+@pytest.mark.parametrize("name", sorted(SPECS))
+def test_samples_satisfy_spec(name):
+    spec = SPECS[name]
+    solver = TicketSolver()
+    tickets = solver.sample(spec, 40, rng=np.random.default_rng(7))
+    assert len(tickets) == min(40, solver.count(spec))
+    assert len({tuple(ticket) for ticket in tickets}) == len(tickets)
+    assert all(spec.accepts(ticket) for ticket in tickets)
+    assert all(len(ticket) == 6 and all(1 <= num <= 45 for num in ticket) for ticket in tickets)
+
+
+def test_single_solution_specs_return_it():
+    solver = TicketSolver()
+    assert [sorted(t) for t in solver.sample(SPECS["lowest_only"], 5)] == [[1, 2, 3, 4, 5, 6]]
+    assert [sorted(t) for t in solver.sample(SPECS["highest_only"], 5)] == [[40, 41, 42, 43, 44, 45]]
+    assert [sorted(t) for t in solver.sample(SPECS["included_six"], 1)] == [[3, 9, 17, 24, 38, 41]]
+
+
+def test_weighted_samples_avoid_zero_weights():
+    weights = np.ones(46)
+    weights[[5, 12, 27]] = 0
+    spec = SPECS["sum_odd_low"]
+    tickets = TicketSolver().sample(spec, 60, weights=weights, rng=np.random.default_rng(3))
+    assert len(tickets) == 60
+    assert all(spec.accepts(ticket) and not {5, 12, 27} & set(ticket) for ticket in tickets)
+
+
+def test_uniform_sampling_covers_a_small_spec():
+    # 1..10 with sum <= 25: a handful of tickets, all of which should show up.
+    spec = TicketSpec(max_sum=25, exclude=range(11, 46))
+    solver = TicketSolver()
+    expected = solver.count(spec)
+    seen = {tuple(sorted(t)) for _ in range(5) for t in solver.sample(spec, expected)}
+    assert len(seen) == expected
+
+
+def test_spec_validation():
+    with pytest.raises(ValueError):
+        TicketSpec(min_sum=150, max_sum=100)
+    with pytest.raises(ValueError):
+        TicketSpec(include={0})
+    with pytest.raises(ValueError):
+        TicketSpec(include={3}, exclude={3})
+
+
+def test_pool_serves_only_pooled_specs():
+    solver = TicketSolver()
+    pool = TicketPool(solver, batch=16)
+    spec = SPECS["sum_odd_low"]
+    assert pool.take(spec, 3) is None
+    assert pool.fill(spec) == 16
+    tickets = pool.take(spec, 20)
+    assert len(tickets) == 20
+    assert all(spec.accepts(ticket) for ticket in tickets)
+    assert pool.take(SPECS["empty_sum"], 1) is None
+    assert pool.stats()["specs"] == 1
+
+
+def test_empty_pool_spec_stays_empty():
+    pool = TicketPool(TicketSolver(), batch=ticket_solver.POOL_BATCH)
+    assert pool.fill(SPECS["empty_sum"]) == 0
+    assert pool.take(SPECS["empty_sum"], 2) == []
+
+
+def test_sum_range_endpoint(client):
+    response = client.get("/api/recommendations/sum-range", params={"min_sum": 100, "max_sum": 110})
+    assert response.status_code == 200
+    numbers = response.json()["recommendation"]
+    assert len(set(numbers)) == 6 and 100 <= sum(numbers) <= 110
@@ -0,0 +1,149 @@
+import threading
+
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+import wire
+
+
+@pytest.mark.parametrize("accept, expected", [
+    (None, wire.JSON),
+    ("*/*", wire.JSON),
+    ("text/html,application/xhtml+xml,*/*;q=0.8", wire.JSON),
+    ("application/vnd.lotto.columnar+json", wire.COLUMNAR_JSON),
+    ("application/json;q=0.5, application/vnd.lotto.columnar+json", wire.COLUMNAR_JSON),
+    ("application/json, application/vnd.lotto.columnar+json;q=0.5", wire.JSON),
+    ("application/vnd.lotto.columnar+json;q=0, */*", wire.JSON),
+    ("Application/VND.lotto.columnar+JSON; q=1.0", wire.COLUMNAR_JSON),
+    ("application/vnd.lotto.columnar+json;q=nope", wire.JSON),
+])
+def test_negotiate_format(accept, expected):
+    assert wire.negotiate_format(accept) == expected
+
+
+@pytest.mark.skipif(wire.msgpack is None, reason="msgpack not installed")
+@pytest.mark.parametrize("accept, expected", [
+    ("application/json, application/msgpack", wire.MSGPACK),
+    ("application/x-msgpack", wire.MSGPACK),
+    ("application/msgpack;q=0, application/json", wire.JSON),
+    ("application/msgpack;q=0.5, application/json", wire.JSON),
+    ("application/json;q=0, */*", wire.MSGPACK),
+    ("application/msgpack;q=0, application/vnd.lotto.columnar+json;q=0.9", wire.COLUMNAR_JSON),
+])
+def test_negotiate_msgpack(accept, expected):
+    assert wire.negotiate_format(accept) == expected
+
+
+@pytest.mark.parametrize("accept_encoding, expected", [
+    (None, "identity"),
+    ("", "identity"),
+    ("gzip", "gzip"),
+    ("gzip;q=0", "identity"),
+    ("gzip;q=0.5, identity", "identity"),
+    ("identity;q=0, gzip;q=0.1", "gzip"),
+    ("*;q=0", "identity"),
+    ("deflate", "identity"),
+])
+def test_negotiate_encoding(accept_encoding, expected):
+    assert wire.negotiate_encoding(accept_encoding) == expected
+
+
+@pytest.mark.skipif(wire.brotli is None, reason="brotli not installed")
+@pytest.mark.parametrize("accept_encoding, expected", [
+    ("gzip, deflate, br", "br"),
+    ("*", "br"),
+    ("br;q=0, gzip", "gzip"),
+    ("br;q=0.2, gzip;q=0.8", "gzip"),
+    ("br;q=0, *", "gzip"),
+])
+def test_negotiate_brotli(accept_encoding, expected):
+    assert wire.negotiate_encoding(accept_encoding) == expected
+
+
+@pytest.mark.parametrize("if_none_match, matches", [
+    (None, False),
+    ('"v1-abc"', True),
+    ('W/"v1-abc"', True),
+    ('"v0-xyz", W/"v1-abc"', True),
+    ('"v0-xyz" , "v1-abc"', True),
+    ("*", True),
+    ('"v1-abcd"', False),
+    ('"v0-xyz"', False),
+])
+def test_etag_matches(if_none_match, matches):
+    assert wire.etag_matches(if_none_match, '"v1-abc"') is matches
+
+
+def test_conditional_requests(client):
+    first = client.get("/api/analysis/frequency", headers={"Accept-Encoding": "identity"})
+    etag = first.headers["etag"]
+    assert first.headers["cache-control"] == "public, no-cache"
+    for header in (etag, f"W/{etag}", f'"stale", {etag}', "*"):
+        response = client.get("/api/analysis/frequency", headers={"If-None-Match": header, "Accept-Encoding": "identity"})
+        assert response.status_code == 304, header
+        assert response.content == b""
+    stale = client.get("/api/analysis/frequency", headers={"If-None-Match": '"stale"', "Accept-Encoding": "identity"})
+    assert stale.status_code == 200
+    assert stale.json() == first.json()
+
+
+def test_refused_coding_is_not_sent(client):
+    response = client.get("/api/analysis/frequency", headers={"Accept-Encoding": "gzip;q=0"})
+    assert "content-encoding" not in response.headers
+
+
+def big_payload(seed):
+    return [{"draw_no": i, "numbers": [(i * seed + k) % 45 + 1 for k in range(6)]} for i in range(400)]
+
+
+def test_request_encodings_are_capped_by_bytes(monkeypatch):
+    responses = wire.EncodedResponses()
+    responses.reset("v1")
+    responses.preencode("/fixed", big_payload(1))
+    fixed = responses.stats()["bytes"]
+    one = len(responses.encode("/query?a=0", lambda: big_payload(2), wire.JSON, "identity")[0])
+    monkeypatch.setattr(wire, "MAX_BYTES", one * 3)
+    for i in range(1, 10):
+        responses.encode(f"/query?a={i}", lambda: big_payload(2), wire.JSON, "identity")
+    assert responses.stats()["bytes"] - fixed <= wire.MAX_BYTES
+    assert responses.cached("/query?a=0", wire.JSON, "identity") is None
+    assert responses.cached("/query?a=9", wire.JSON, "identity") is not None
+    # Pre-encoded variants are never evicted.
+    assert responses.cached("/fixed", wire.JSON, "gzip") is not None
+
+
+def test_preencoded_bodies_use_the_highest_levels():
+    payload = big_payload(7)
+    responses = wire.EncodedResponses()
+    responses.reset("v1")
+    responses.preencode("/fixed", payload)
+    plain = wire.serialize(payload, wire.JSON)
+    body, _, encoding = responses.cached("/fixed", wire.JSON, "gzip")
+    assert encoding == "gzip" and body == wire.compress(plain, "gzip", wire.PREENCODE_LEVELS)
+    body, _, _ = responses.encode("/query", lambda: payload, wire.JSON, "gzip")
+    assert body == wire.compress(plain, "gzip", wire.REQUEST_LEVELS)
+
+
+def test_payloads_are_encoded_off_the_event_loop():
+    responses = wire.EncodedResponses()
+    responses.reset("v1")
+    threads = {}
+    app = FastAPI()
+
+    @app.get("/query")
+    async def query(request: Request):
+        threads["loop"] = threading.get_ident()
+
+        def build():
+            threads["build"] = threading.get_ident()
+            return big_payload(3)
+        return await responses.respond(request, "/query", build)
+
+    with TestClient(app) as client:
+        response = client.get("/query", headers={"Accept-Encoding": "gzip"})
+        assert response.json() == big_payload(3)
+        assert threads["build"] != threads["loop"]
+        threads.clear()
+        assert client.get("/query", headers={"Accept-Encoding": "gzip"}).status_code == 200
+        assert "build" not in threads
@@ -0,0 +1,373 @@
+"""
+Exact counting and sampling of tickets under combined constraints.
+
+A TicketSpec combines a sum range, ranges on how many numbers fall in given
+subsets (odd numbers, low numbers 1-22, ...), numbers that must be included or
+excluded, "no consecutive numbers" and a span (max - min) range. Instead of
+drawing random tickets until one qualifies, the solver runs a counting DP over
+the numbers 1..45 in order. The state is
+
+    (picked so far, running sum, count per subset, last number picked?, span reached?)
+
+with only the dimensions the spec constrains, and states that already violate
+an upper bound are dropped. The accepted final states give the exact number of
+qualifying tickets; walking the stored layers backwards samples among them
+uniformly, or proportionally to the product of per-number weights.
+
+Span constraints are solved per minimum number a: the DP only visits
+a..a+max_span, a is forced and the "span reached" flag records a pick at or
+beyond a+min_span. The cost is bounded by the state size: 7 * (max_sum+1) *
+prod(subset max+1) * 4 cells per number at most, independent of how
+restrictive the spec is.
+"""
+import threading
+from collections import OrderedDict, deque
+
+import numpy as np
+
+NUMBERS = range(1, 46)
+PICKS = 6
+MAX_SUM = sum(range(40, 46))
+LOW_MAX = 22
+ODD = frozenset(range(1, 46, 2))
+LOW = frozenset(range(1, LOW_MAX + 1))
+CACHE_SIZE = 256
+SAMPLE_ROUNDS = 20
+POOL_BATCH = 256
+
+
+class TicketSpec:
+    """
+    Constraints on a 6-number ticket. `subsets` is a list of (name, members, min, max)
+    count constraints; odd/low helpers are available through from_ranges().
+    """
+
+    def __init__(self, min_sum=None, max_sum=None, subsets=(), include=(), exclude=(),
+                 no_consecutive=False, min_span=None, max_span=None):
+        if min_sum is not None and max_sum is not None and min_sum > max_sum:
+            raise ValueError("min_sum은 max_sum보다 클 수 없습니다.")
+        # min_sum above MAX_SUM stays above max_sum: the spec is valid, it just has no tickets.
+        self.min_sum = min(max(min_sum or 0, 0), MAX_SUM + 1)
+        self.max_sum = min(MAX_SUM if max_sum is None else max(max_sum, 0), MAX_SUM)
+        self.subsets = [(name, frozenset(members), max(lo, 0), min(hi, PICKS)) for name, members, lo, hi in subsets]
+        self.include = frozenset(include)
+        self.exclude = frozenset(exclude)
+        self.no_consecutive = bool(no_consecutive)
+        self.min_span = min_span
+        self.max_span = max_span
+        self.validate()
+        # Drop bounds every ticket meets, so they add no DP dimensions.
+        self.subsets = [subset for subset in self.subsets if subset[2] > 0 or subset[3] < PICKS]
+        if self.min_span is not None and self.min_span <= PICKS - 1:
+            self.min_span = None
+        if self.max_span is not None and self.max_span >= 44:
+            self.max_span = None
+
+    @classmethod
+    def from_ranges(cls, min_odd=None, max_odd=None, min_low=None, max_low=None, **kwargs):
+        subsets = []
+        if min_odd is not None or max_odd is not None:
+            subsets.append(("odd", ODD, min_odd or 0, PICKS if max_odd is None else max_odd))
+        if min_low is not None or max_low is not None:
+            subsets.append(("low", LOW, min_low or 0, PICKS if max_low is None else max_low))
+        return cls(subsets=subsets, **kwargs)
+
+    def validate(self):
+        """Raises ValueError for specs that are malformed (not merely infeasible)."""
+        if any(not 1 <= num <= 45 for num in self.include | self.exclude):
+            raise ValueError("번호는 1에서 45 사이여야 합니다.")
+        if self.include & self.exclude:
+            raise ValueError("같은 번호를 포함과 제외에 동시에 지정할 수 없습니다.")
+        if len(self.include) > PICKS:
+            raise ValueError("포함 번호는 최대 6개까지 지정할 수 있습니다.")
+        if any(lo > hi for _, _, lo, hi in self.subsets):
+            raise ValueError("최소 개수는 최대 개수보다 클 수 없습니다.")
+        if self.min_span is not None and self.max_span is not None and self.min_span > self.max_span:
+            raise ValueError("min_span은 max_span보다 클 수 없습니다.")
+
+    @property
+    def has_span(self):
+        return self.min_span is not None or self.max_span is not None
+
+    def key(self):
+        return (
+            self.min_sum, self.max_sum,
+            tuple((name, tuple(sorted(members)), lo, hi) for name, members, lo, hi in self.subsets),
+            tuple(sorted(self.include)), tuple(sorted(self.exclude)),
+            self.no_consecutive, self.min_span, self.max_span,
+        )
+
+    def to_dict(self):
+        return {
+            "min_sum": self.min_sum,
+            "max_sum": self.max_sum,
+            "counts": {name: {"min": lo, "max": hi} for name, _, lo, hi in self.subsets},
+            "include": sorted(self.include),
+            "exclude": sorted(self.exclude),
+            "no_consecutive": self.no_consecutive,
+            "min_span": self.min_span,
+            "max_span": self.max_span,
+        }
+
+    def accepts(self, ticket):
+        """Direct check of one ticket (used to verify samples)."""
+        ticket = sorted(ticket)
+        if len(set(ticket)) != PICKS or not self.min_sum <= sum(ticket) <= self.max_sum:
+            return False
+        if not self.include <= set(ticket) or self.exclude & set(ticket):
+            return False
+        if any(not lo <= len(members.intersection(ticket)) <= hi for _, members, lo, hi in self.subsets):
+            return False
+        if self.no_consecutive and any(b - a == 1 for a, b in zip(ticket, ticket[1:])):
+            return False
+        span = ticket[-1] - ticket[0]
+        return (self.min_span is None or span >= self.min_span) and (self.max_span is None or span <= self.max_span)
+
+
+def _shift_slices(shape, offsets):
+    """(destination, source) slices moving an array of `shape` by non-negative `offsets`; None if nothing stays inside."""
+    dst_index, src_index = [], []
+    for size, offset in zip(shape, offsets):
+        if offset >= size:
+            return None
+        dst_index.append(slice(offset, size))
+        src_index.append(slice(0, size - offset))
+    return tuple(dst_index), tuple(src_index)
+
+
+class _Run:
+    """
+    One DP pass over `numbers` (the first is forced in span runs). States are laid
+    out as (last picked?, span reached?) + core, so every flag combination is one
+    contiguous block.
+    """
+
+    def __init__(self, spec, numbers, weights, reach_from=None, keep_layers=False):
+        self.spec = spec
+        self.numbers = numbers
+        self.weights = weights
+        self.reach_from = reach_from
+        self.forced = numbers[0] if reach_from is not None else None
+        self.tracks_sum = spec.min_sum > 0 or spec.max_sum < MAX_SUM
+        self.sum_size = spec.max_sum + 1 if self.tracks_sum else 1
+        self.core_shape = (PICKS + 1, self.sum_size) + tuple(hi + 1 for _, _, _, hi in spec.subsets)
+        self.prev_size = 2 if spec.no_consecutive else 1
+        self.reach_size = 2 if reach_from is not None else 1
+        self.layers = [] if keep_layers else None
+
+        state = np.zeros((self.prev_size, self.reach_size) + self.core_shape)
+        state[(0,) * state.ndim] = 1.0
+        for number in numbers:
+            if keep_layers:
+                self.layers.append(state.astype(np.float32))
+            state = self._step(state, number)
+        self.final = state
+
+    def offsets(self, number):
+        return (1, number if self.tracks_sum else 0) + tuple(int(number in members) for _, members, _, _ in self.spec.subsets)
+
+    def reaches(self, number):
+        return self.reach_from is not None and number >= self.reach_from
+
+    def allowed(self, number):
+        """(may skip, may pick) for this number."""
+        if number in self.spec.include or number == self.forced:
+            return False, True
+        if number in self.spec.exclude:
+            return True, False
+        return True, True
+
+    def _step(self, state, number):
+        may_skip, may_pick = self.allowed(number)
+        new = np.zeros_like(state)
+        if may_skip:
+            new[0] = state[0]
+            if self.prev_size == 2:
+                new[0] += state[1]
+        slices = _shift_slices(self.core_shape, self.offsets(number)) if may_pick else None
+        if slices is not None:
+            dst, src = slices
+            weight = self.weights[number]
+            picked_to = self.prev_size - 1
+            for reach in range(self.reach_size):
+                # With no_consecutive only states whose last number was skipped can pick.
+                moved = state[(0, reach) + src]
+                if weight != 1:
+                    moved = moved * weight
+                reach_to = 1 if self.reaches(number) else reach
+                new[(picked_to, reach_to) + dst] += moved
+        return new
+
+    def accepted_index(self):
+        index = (slice(None), slice(self.reach_size - 1, None), PICKS)
+        index += (slice(self.spec.min_sum if self.tracks_sum else 0, None),)
+        return index + tuple(slice(lo, None) for _, _, lo, _ in self.spec.subsets)
+
+    def total(self):
+        return float(self.final[self.accepted_index()].sum())
+
+    def sample(self, rng, size=1):
+        """
+        `size` tickets drawn proportionally to the accepted final weights
+        (requires keep_layers). All tickets walk the layers back together: at
+        every number each one picks among at most four predecessor states.
+        """
+        accepted = np.zeros_like(self.final)
+        index = self.accepted_index()
+        accepted[index] = self.final[index]
+        flat = accepted.ravel()
+        states = np.unravel_index(rng.choice(flat.size, size=size, p=flat / flat.sum()), accepted.shape)
+        prev, reach, core = states[0], states[1], np.stack(states[2:])
+        rows = np.arange(size)
+        picked = np.zeros((size, 46), dtype=bool)
+
+        for position in range(len(self.numbers) - 1, -1, -1):
+            number = self.numbers[position]
+            before = self.layers[position]
+            may_skip, may_pick = self.allowed(number)
+            # Candidates: skipped from prev 0 / prev 1, picked from reach 0 / reach 1.
+            candidate_weights = np.zeros((4, size))
+            if may_skip:
+                skippable = prev == 0
+                for prev_before in range(self.prev_size):
+                    candidate_weights[prev_before] = np.where(skippable, before[(prev_before, reach) + tuple(core)], 0)
+            if may_pick:
+                offsets = np.array(self.offsets(number))[:, None]
+                core_before = core - offsets
+                pickable = (prev == self.prev_size - 1) & (core_before >= 0).all(axis=0)
+                core_index = tuple(np.maximum(core_before, 0))
+                for reach_before in range(self.reach_size):
+                    if self.reaches(number):
+                        allowed = pickable & (reach == 1)
+                    else:
+                        allowed = pickable & (reach == reach_before)
+                    weight = before[(0, reach_before) + core_index] * self.weights[number]
+                    candidate_weights[2 + reach_before] = np.where(allowed, weight, 0)
+            cumulative = candidate_weights.cumsum(axis=0)
+            choice = (cumulative <= rng.random(size) * cumulative[-1]).sum(axis=0)
+            took = choice >= 2
+            picked[rows[took], number] = True
+            prev = np.where(took, 0, choice)
+            reach = np.where(took, choice - 2, reach)
+            if took.any():
+                core = np.where(took, core_before, core)
+        return [np.nonzero(row)[0].tolist() for row in picked]
+
+
+class TicketSolver:
+    """Counts and samples tickets for TicketSpecs; per-run totals are cached per spec and weights."""
+
+    def __init__(self, cache_size=CACHE_SIZE):
+        self._totals_cache = OrderedDict()
+        self._cache_size = cache_size
+        self._lock = threading.Lock()
+
+    def _plan(self, spec):
+        """[(numbers, reach_from)] runs covering every ticket exactly once."""
+        if not spec.has_span:
+            return [(list(NUMBERS), None)]
+        min_span = spec.min_span or 0
+        max_span = 44 if spec.max_span is None else spec.max_span
+        plans = []
+        for first in NUMBERS:
+            if first in spec.exclude or any(num < first or num > first + max_span for num in spec.include):
+                continue
+            numbers = list(range(first, min(45, first + max_span) + 1))
+            if len(numbers) >= PICKS and first + min_span <= 45:
+                plans.append((numbers, first + min_span))
+        return plans
+
+    def _totals(self, spec, weights):
+        """Accepted weight of every planned run, cached per (spec, weights)."""
+        key = (spec.key(), weights.tobytes())
+        with self._lock:
+            if key in self._totals_cache:
+                self._totals_cache.move_to_end(key)
+                return self._totals_cache[key]
+        totals = [_Run(spec, numbers, weights, reach_from).total() for numbers, reach_from in self._plan(spec)]
+        with self._lock:
+            self._totals_cache[key] = totals
+            if len(self._totals_cache) > self._cache_size:
+                self._totals_cache.popitem(last=False)
+        return totals
+
+    def count(self, spec):
+        """Exact number of tickets satisfying `spec`."""
+        return int(round(sum(self._totals(spec, _uniform_weights()))))
+
+    def sample(self, spec, size=1, weights=None, rng=None, distinct=True):
+        """
+        Up to `size` tickets drawn uniformly among the qualifying ones, or with
+        probability proportional to the product of `weights[number]` (46 entries).
+        With `distinct` no ticket is returned twice.
+        """
+        rng = rng or np.random.default_rng()
+        weights = _uniform_weights() if weights is None else np.asarray(weights, dtype=float)
+        plans = self._plan(spec)
+        totals = np.array(self._totals(spec, weights))
+        if not len(totals) or totals.sum() <= 0:
+            return []
+        limit = min(size, self.count(spec)) if distinct else size
+        tickets, seen = [], set()
+        for _ in range(SAMPLE_ROUNDS):
+            missing = limit - len(tickets)
+            if missing <= 0:
+                break
+            # Runs are built one at a time, so only one set of layers is alive.
+            per_plan = np.bincount(rng.choice(len(plans), size=missing, p=totals / totals.sum()), minlength=len(plans))
+            for index in np.nonzero(per_plan)[0]:
+                numbers, reach_from = plans[index]
+                run = _Run(spec, numbers, weights, reach_from, keep_layers=True)
+                for ticket in run.sample(rng, per_plan[index]):
+                    if distinct and tuple(ticket) in seen:
+                        continue
+                    seen.add(tuple(ticket))
+                    tickets.append(ticket)
+        return tickets
+
+
+def _uniform_weights():
+    return np.ones(46)
+
+
+class TicketPool:
+    """
+    Tickets sampled ahead of time for a fixed set of specs, so a request takes
+    from a pool instead of running the sampler. Pools are filled in batches of
+    `batch` (one DP build each) and refilled when a take finds them short.
+    Weighted pools use the `weights` given here, so a new set of weights (a new
+    dataset version) needs a new TicketPool.
+    """
+
+    def __init__(self, solver, weights=None, batch=POOL_BATCH):
+        self.solver = solver
+        self.weights = weights
+        self.batch = batch
+        self._pools = {}
+        self._lock = threading.Lock()
+
+    def fill(self, spec, weighted=False):
+        """Adds a batch for `spec`; from then on take() serves it."""
+        tickets = self.solver.sample(spec, self.batch, weights=self.weights if weighted else None)
+        with self._lock:
+            self._pools.setdefault((spec.key(), weighted), deque()).extend(tickets)
+        return len(tickets)
+
+    def take(self, spec, size=1, weighted=False):
+        """Up to `size` pooled tickets, or None if `spec` is not pooled."""
+        pool = self._pools.get((spec.key(), weighted))
+        if pool is None:
+            return None
+        if len(pool) < size:
+            self.fill(spec, weighted)
+        tickets = []
+        while pool and len(tickets) < size:
+            try:
+                tickets.append(pool.popleft())
+            except IndexError:
+                break
+        return tickets
+
+    def stats(self):
+        with self._lock:
+            return {"specs": len(self._pools), "tickets": sum(len(pool) for pool in self._pools.values())}
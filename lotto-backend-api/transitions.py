@@ -0,0 +1,103 @@
+"""
+Draw-to-draw transition analysis.
+
+For every lag k the count matrix T_k[i, j] is the number of draw pairs (t, t+k)
+where i appeared in draw t and j in draw t+k. It is one matrix product of
+shifted one-hot draw matrices. Pairs are only counted when both draws exist in
+the history, so gaps in the CSV do not create fake transitions.
+"""
+import numpy as np
+
+MAX_LAG = 10
+BASE_RATE = 6 / 45
+
+
+class TransitionAnalysis:
+    def __init__(self, table, max_lag=MAX_LAG):
+        n = len(table)
+        self.draw_numbers = table.draw_numbers
+        onehot = table.onehot(np.float64)
+        self.latest_numbers = table.numbers[-1].tolist() if n else []
+        self.latest_draw = int(self.draw_numbers[-1]) if n else None
+
+        self.max_lag = max_lag
+        self.counts = {}       # lag -> (46, 46) transition counts
+        self.origins = {}      # lag -> (46,) draws with number i that have a successor at this lag
+        self.carry_over = {}   # lag -> histogram of shared numbers, index 0..6
+        self.pairs = {}        # lag -> number of (t, t+k) draw pairs
+        for lag in range(1, max_lag + 1):
+            if n <= lag:
+                break
+            # Only shift within genuinely consecutive draw numbers.
+            valid = (self.draw_numbers[lag:] - self.draw_numbers[:-lag]) == lag
+            before = onehot[:-lag][valid]
+            after = onehot[lag:][valid]
+            self.counts[lag] = before.T @ after
+            self.origins[lag] = before.sum(axis=0)
+            shared = (before * after).sum(axis=1).astype(np.int64)
+            self.carry_over[lag] = np.bincount(shared, minlength=7)
+            self.pairs[lag] = int(valid.sum())
+
+    def conditional(self, lag=1):
+        """(46, 46) table of P(j in draw t+lag | i in draw t)."""
+        origins = self.origins[lag][:, None]
+        return np.divide(self.counts[lag], origins, out=np.zeros_like(self.counts[lag]), where=origins > 0)
+
+    def carry_over_stats(self, lag=1):
+        hist = self.carry_over[lag]
+        pairs = self.pairs[lag]
+        mean = float((hist * np.arange(7)).sum() / pairs) if pairs else 0.0
+        return {
+            "lag": lag,
+            "pairs": pairs,
+            "mean_repeats": round(mean, 3),
+            "expected_repeats": round(6 * BASE_RATE, 3),
+            "distribution": {str(k): int(hist[k]) for k in range(7)},
+        }
+
+    def top_transitions(self, lag=1, top=20):
+        table = self.conditional(lag)
+        flat = table[1:, 1:].ravel()
+        order = np.argsort(-flat, kind="stable")[:top]
+        return [
+            {
+                "from": int(idx // 45) + 1,
+                "to": int(idx % 45) + 1,
+                "count": int(self.counts[lag][idx // 45 + 1, idx % 45 + 1]),
+                "probability": round(float(flat[idx]), 4),
+                "lift": round(float(flat[idx]) / BASE_RATE, 3),
+            }
+            for idx in order
+        ]
+
+    def next_given(self, number, lag=1):
+        row = self.conditional(lag)[number]
+        return [
+            {"number": j, "probability": round(float(row[j]), 4), "lift": round(float(row[j]) / BASE_RATE, 3)}
+            for j in sorted(range(1, 46), key=lambda j: -row[j])
+        ]
+
+    def recommend(self, given=None, lags=(1,), count=6, pick=None):
+        """
+        Scores each number by its average conditional probability of following
+        the given numbers (default: the latest draw), averaged over `lags`.
+        `pick` chooses the ticket from the numbers ranked best first (default: the top `count`).
+        """
+        given = list(given) if given else self.latest_numbers
+        scores = np.zeros(46)
+        used = [lag for lag in lags if lag in self.counts]
+        for lag in used:
+            scores += self.conditional(lag)[given].mean(axis=0)
+        if used:
+            scores /= len(used)
+        scores[0] = -1
+        ranked = np.argsort(-scores, kind="stable")[:45]
+        picks = pick(ranked) if pick else ranked[:count]
+        return {
+            "given_draw": self.latest_draw if given == self.latest_numbers else None,
+            "given_numbers": sorted(int(num) for num in given),
+            "lags": used,
+            "recommendation": sorted(int(num) for num in picks),
+            "scores": {int(num): round(float(scores[num]), 4) for num in picks},
+        }
+
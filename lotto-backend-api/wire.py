@@ -0,0 +1,275 @@
+"""
+Content negotiation for analysis responses, encoded once per dataset version.
+
+Representations (Accept header):
+  application/json                         the usual arrays of objects
+  application/vnd.lotto.columnar+json      every list of same-keyed objects
+                                           becomes one object of value arrays
+  application/msgpack (or x-msgpack)       MessagePack of the columnar form
+
+Content codings (Accept-Encoding): br, gzip, identity.
+
+Each (response key, representation, coding) is serialized and compressed at
+most once per dataset version and served from memory afterwards. The fixed
+responses are pre-encoded at the highest levels during warm-up and kept for
+the whole version. Every other key (a query, a window) is encoded on its first
+request at a fast level, in the threadpool so the event loop never compresses,
+and kept in an LRU capped at MAX_BYTES. brotli and msgpack are optional:
+without them those variants are simply not offered.
+"""
+import gzip
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+
+from fastapi import Request, Response
+from starlette.concurrency import run_in_threadpool
+
+import profiling
+
+try:
+    import brotli
+except ImportError:  # br is not offered when Brotli is not installed
+    brotli = None
+
+try:
+    import msgpack
+except ImportError:  # MessagePack is not offered when msgpack is not installed
+    msgpack = None
+
+JSON = "application/json"
+COLUMNAR_JSON = "application/vnd.lotto.columnar+json"
+MSGPACK = "application/msgpack"
+
+MAX_BYTES = 32 * 1024 * 1024  # encoded bodies of non-preencoded keys, per dataset version
+MIN_COMPRESS_BYTES = 512
+# (gzip level, brotli quality): pre-encoded responses, then those encoded on request.
+PREENCODE_LEVELS = (9, 11)
+REQUEST_LEVELS = (5, 4)
+
+
+def columnar(payload):
+    """Turns every list of dicts sharing the same keys into a dict of lists (recursively)."""
+    if isinstance(payload, dict):
+        return {key: columnar(value) for key, value in payload.items()}
+    if isinstance(payload, list):
+        if payload and all(isinstance(item, dict) for item in payload):
+            keys = list(payload[0])
+            if all(list(item) == keys for item in payload):
+                return {key: columnar([item[key] for item in payload]) for key in keys}
+        return [columnar(item) for item in payload]
+    return payload
+
+
+def parse_quality_list(header):
+    """
+    'a;q=0.5, b' -> [('a', 0.5), ('b', 1.0)], lowercased. Items whose q is
+    not a number in 0..1 are dropped.
+    """
+    items = []
+    for part in (header or "").lower().split(","):
+        token, _, params = part.partition(";")
+        token = token.strip()
+        if not token:
+            continue
+        quality = 1.0
+        for param in params.split(";"):
+            name, _, value = param.partition("=")
+            if name.strip() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = -1.0
+        if 0.0 <= quality <= 1.0:
+            items.append((token, quality))
+    return items
+
+
+def negotiate_format(accept):
+    """
+    JSON unless the client names an alternative representation with at least
+    the quality it gives JSON (directly or through application/* or */*), or
+    refuses JSON with q=0 while a wildcard still admits an alternative.
+    """
+    if not accept:
+        return JSON
+    qualities = dict(reversed(parse_quality_list(accept)))
+    wildcard = qualities.get("application/*", qualities.get("*/*", 0.0))
+    json_quality = qualities.get(JSON, wildcard)
+    named = {COLUMNAR_JSON: qualities.get(COLUMNAR_JSON)}
+    if msgpack is not None:
+        aliases = [qualities[name] for name in ("application/msgpack", "application/x-msgpack") if name in qualities]
+        named[MSGPACK] = max(aliases) if aliases else None
+    # Ties between alternatives go to msgpack, the more compact one.
+    media_type = max(named, key=lambda name: (named[name] if named[name] is not None else wildcard, name == MSGPACK))
+    quality = named[media_type]
+    if quality is not None and quality > 0 and quality >= json_quality:
+        return media_type
+    if json_quality == 0 and wildcard > 0:
+        return media_type
+    return JSON
+
+
+def negotiate_encoding(accept_encoding):
+    """
+    Highest-quality coding we can produce, preferring br over gzip on ties.
+    Codings not listed take the quality of '*'; identity is used when nothing
+    compressed is acceptable or the client ranks identity strictly higher.
+    """
+    qualities = dict(reversed(parse_quality_list(accept_encoding)))
+    default = qualities.get("*", 0.0)
+    codings = (["br"] if brotli is not None else []) + ["gzip"]
+    encoding = max(codings, key=lambda coding: qualities.get(coding, default))
+    quality = qualities.get(encoding, default)
+    if quality > 0 and quality >= qualities.get("identity", 0.0):
+        return encoding
+    return "identity"
+
+
+def etag_matches(if_none_match, etag):
+    """Weak comparison of `etag` against an If-None-Match list (or '*')."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == opaque:
+            return True
+    return False
+
+
+def serialize(payload, media_type):
+    if media_type == MSGPACK:
+        return msgpack.packb(columnar(payload), use_bin_type=True)
+    if media_type == COLUMNAR_JSON:
+        payload = columnar(payload)
+    return json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def compress(body, encoding, levels=REQUEST_LEVELS):
+    gzip_level, brotli_quality = levels
+    if encoding == "br":
+        return brotli.compress(body, quality=brotli_quality)
+    if encoding == "gzip":
+        return gzip.compress(body, compresslevel=gzip_level, mtime=0)
+    return body
+
+
+class EncodedResponses:
+    """Per-dataset-version store of serialized and compressed response bodies."""
+
+    def __init__(self):
+        self.version = None
+        # (key, media_type, encoding) -> (body, etag, encoding)
+        self._preencoded = {}
+        self._bodies = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def reset(self, version):
+        with self._lock:
+            self.version = version
+            self._preencoded = {}
+            self._bodies = OrderedDict()
+            self._bytes = 0
+
+    def cached(self, key, media_type, encoding):
+        """The encoded variant if it is already stored, else None."""
+        entry_key = (key, media_type, encoding)
+        with self._lock:
+            cached = self._preencoded.get(entry_key)
+            if cached is None:
+                cached = self._bodies.get(entry_key)
+                if cached is None:
+                    return None
+                self._bodies.move_to_end(entry_key)
+            self.hits += 1
+            return cached
+
+    def encode(self, key, payload_factory, media_type, encoding, preencode=False):
+        """
+        Returns (body, etag, encoding) for one variant. The payload is built,
+        serialized and compressed only the first time the variant is asked for;
+        `preencode` compresses at the highest levels and keeps the result for
+        the whole version.
+        """
+        if not preencode:
+            cached = self.cached(key, media_type, encoding)
+            if cached is not None:
+                return cached
+        entry_key = (key, media_type, encoding)
+        version = self.version
+
+        body = serialize(payload_factory(), media_type)
+        if len(body) < MIN_COMPRESS_BYTES:
+            encoding = "identity"
+        body = compress(body, encoding, PREENCODE_LEVELS if preencode else REQUEST_LEVELS)
+        tag = hashlib.sha1(f"{key}|{media_type}|{encoding}".encode()).hexdigest()[:8]
+        entry = (body, f'"{version}-{tag}"', encoding)
+
+        with self._lock:
+            self.misses += 1
+            if self.version != version:
+                return entry
+            replaced = self._bodies.pop(entry_key, None)
+            if replaced is not None:
+                self._bytes -= len(replaced[0])
+            if preencode:
+                self._preencoded[entry_key] = entry
+            elif len(body) <= MAX_BYTES:
+                self._bodies[entry_key] = entry
+                self._bytes += len(body)
+                while self._bytes > MAX_BYTES:
+                    _, (evicted, _, _) = self._bodies.popitem(last=False)
+                    self._bytes -= len(evicted)
+        return entry
+
+    def preencode(self, key, payload):
+        """Encodes every representation/coding of a payload (e.g. during warm-up)."""
+        media_types = [JSON, COLUMNAR_JSON] + ([MSGPACK] if msgpack is not None else [])
+        encodings = ["identity", "gzip"] + (["br"] if brotli is not None else [])
+        for media_type in media_types:
+            for encoding in encodings:
+                self.encode(key, lambda: payload, media_type, encoding, preencode=True)
+
+    async def respond(self, request: Request, key, payload_factory, cache_control="public, no-cache"):
+        """
+        Response for `key` negotiated from the request headers. payload_factory
+        is only called when the variant is not encoded yet, and then in the
+        threadpool together with the encoding. Caches must revalidate every
+        use: the ETag changes as soon as a new draw is published, and a
+        revalidation is a bodyless 304.
+        """
+        media_type = negotiate_format(request.headers.get("accept"))
+        encoding = negotiate_encoding(request.headers.get("accept-encoding"))
+        entry = self.cached(key, media_type, encoding)
+        if entry is None:
+            entry = await run_in_threadpool(profiling.bind(self.encode), key, payload_factory, media_type, encoding)
+        body, etag, encoding = entry
+
+        headers = {"ETag": etag, "Cache-Control": cache_control, "Vary": "Accept, Accept-Encoding"}
+        if encoding != "identity":
+            headers["Content-Encoding"] = encoding
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            return Response(status_code=304, headers=headers)
+        return Response(content=body, media_type=media_type, headers=headers)
+
+    def stats(self):
+        with self._lock:
+            bodies = list(self._preencoded.values()) + list(self._bodies.values())
+        return {
+            "dataset_version": self.version,
+            "entries": len(bodies),
+            "preencoded": len(self._preencoded),
+            "bytes": sum(len(body) for body, _, _ in bodies),
+            "max_bytes": MAX_BYTES,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
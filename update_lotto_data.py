@@ -4,6 +4,9 @@ import requests
 import os
 from datetime import datetime
 
+# Overridable so the updater can be pointed at a local stand-in (see lotto-backend-api/loadtest.py).
+LOTTO_API_URL = os.environ.get("DHLOTTERY_API_URL", "https://www.dhlottery.co.kr/common.do")
+
 def get_latest_draw_number_from_api():
     """
     Fetches the latest draw number from the dhlottery API.
@@ -29,7 +32,7 @@ def get_latest_draw_number_from_api():
     draw_number = latest_local_draw + 1
     
     while True:
-        url = f"https://www.dhlottery.co.kr/common.do?method=getLottoNumber&drwNo={draw_number}"
+        url = f"{LOTTO_API_URL}?method=getLottoNumber&drwNo={draw_number}"
         try:
             response = requests.get(url)
             response.raise_for_status()
@@ -49,7 +52,7 @@ def get_lotto_data(draw_number):
     """
     Fetches lotto data for a specific draw number.
     """
-    url = f"https://www.dhlottery.co.kr/common.do?method=getLottoNumber&drwNo={draw_number}"
+    url = f"{LOTTO_API_URL}?method=getLottoNumber&drwNo={draw_number}"
     try:
         response = requests.get(url)
         response.raise_for_status()